@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Administración de usuarios del SIGQ desde la línea de comandos
+Uso: python admin_cli.py [--db ruta] <comando> [opciones]
+
+Comandos:
+  list                      Lista los usuarios
+  import ARCHIVO.csv        Alta masiva (columnas: username, full_name, email, role, password)
+  reset USUARIO [...]       Restablece contraseñas (una dada o generadas)
+  export [-o ARCHIVO.csv]   Exporta los usuarios (sin hashes)
+  rotate-legacy             Reemplaza los hashes SHA-256 heredados por contraseñas temporales bcrypt
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+
+from database import FMREDatabase
+from passwords import generate_password, hash_many, is_legacy_hash
+from utils import validate_password
+
+ROLES = ('operator', 'admin')
+EXPORT_COLUMNS = ['id', 'username', 'full_name', 'role', 'email', 'created_at', 'last_login']
+
+
+def read_users_csv(path, default_role='operator'):
+    """Lee y valida un CSV de usuarios; retorna (usuarios, errores)
+
+    Los errores incluyen el número de línea; si hay alguno no se importa nada.
+    """
+    users = []
+    errors = []
+    seen = set()
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        missing = {'username', 'full_name'} - set(reader.fieldnames or [])
+        if missing:
+            return [], [f"Faltan columnas: {', '.join(sorted(missing))}"]
+        for line, row in enumerate(reader, start=2):
+            username = (row.get('username') or '').strip()
+            full_name = (row.get('full_name') or '').strip()
+            email = (row.get('email') or '').strip() or None
+            role = (row.get('role') or '').strip().lower() or default_role
+            password = row.get('password') or ''
+            if not username or not full_name:
+                errors.append(f"Línea {line}: username y full_name son obligatorios")
+                continue
+            if username in seen:
+                errors.append(f"Línea {line}: usuario '{username}' repetido en el archivo")
+                continue
+            seen.add(username)
+            if role not in ROLES:
+                errors.append(f"Línea {line}: rol '{role}' inválido (use {' o '.join(ROLES)})")
+            if email and '@' not in email:
+                errors.append(f"Línea {line}: email '{email}' inválido")
+            if password:
+                is_valid, message = validate_password(password)
+                if not is_valid:
+                    errors.append(f"Línea {line}: {message}")
+            users.append({'username': username, 'full_name': full_name, 'email': email,
+                          'role': role, 'password': password})
+    return users, errors
+
+
+def write_credentials(path, credentials):
+    """Guarda usuario/contraseña en un CSV legible solo por el propietario"""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['username', 'password'])
+        writer.writerows(credentials)
+    print(f"🔑 {len(credentials)} contraseñas guardadas en {path} (entréguelas y elimine el archivo)")
+
+
+def enqueue_welcome_emails(db, users):
+    """Encola el email de bienvenida de los usuarios con correo (lo entrega la bandeja de salida)"""
+    from email_service import EmailService
+
+    email_service = EmailService(db)
+    messages = [email_service.welcome_message(user, user['password']) for user in users if user.get('email')]
+    if messages:
+        db.enqueue_emails(messages, kind='welcome')
+    return len(messages)
+
+
+def cmd_list(db, args):
+    users = db.get_all_users()
+    if not users:
+        print("❌ No se encontraron usuarios")
+        return 0
+    print(f"\n👥 {len(users)} usuarios:")
+    print("-" * 50)
+    for user in sorted(users, key=lambda user: user['username']):
+        print(f"• {user['username']} - {user['full_name']} ({user['role']})")
+    return 0
+
+
+def cmd_import(db, args):
+    start = time.perf_counter()
+    users, errors = read_users_csv(args.csv, args.role)
+    if errors:
+        print(f"❌ {len(errors)} errores en {args.csv}; no se importó ningún usuario:")
+        for error in errors:
+            print(f"   {error}")
+        return 1
+
+    existing = set(db.get_password_hashes())
+    skipped = [user['username'] for user in users if user['username'] in existing]
+    users = [user for user in users if user['username'] not in existing]
+    if skipped:
+        shown = ', '.join(skipped[:10]) + (' ...' if len(skipped) > 10 else '')
+        print(f"⚠️ {len(skipped)} usuarios ya existen y se omiten: {shown}")
+    if not users:
+        print("ℹ️ No hay usuarios nuevos para importar")
+        return 0
+
+    generated = []
+    for user in users:
+        if not user['password']:
+            user['password'] = generate_password()
+            generated.append((user['username'], user['password']))
+    if args.dry_run:
+        print(f"✅ {len(users)} usuarios válidos ({len(generated)} con contraseña generada); no se guardó nada")
+        return 0
+
+    hash_start = time.perf_counter()
+    for user, password_hash in zip(users, hash_many([user['password'] for user in users], args.workers, args.rounds)):
+        user['password_hash'] = password_hash
+    hash_seconds = time.perf_counter() - hash_start
+
+    created = set(db.bulk_create_users(users))
+    print(f"✅ {len(created)} usuarios creados en {time.perf_counter() - start:.1f}s "
+          f"(hashing {hash_seconds:.1f}s)")
+    generated = [(username, password) for username, password in generated if username in created]
+    if generated:
+        write_credentials(args.credentials or os.path.splitext(args.csv)[0] + '_credenciales.csv', generated)
+    if args.welcome:
+        queued = enqueue_welcome_emails(db, [user for user in users if user['username'] in created])
+        print(f"📧 {queued} emails de bienvenida en cola de envío")
+    return 0
+
+
+def cmd_reset(db, args):
+    existing = set(db.get_password_hashes())
+    usernames = list(dict.fromkeys(args.usernames))
+    unknown = [username for username in usernames if username not in existing]
+    if unknown:
+        print(f"❌ Usuarios no encontrados: {', '.join(unknown)}")
+        return 1
+    if args.password:
+        is_valid, message = validate_password(args.password)
+        if not is_valid:
+            print(f"❌ {message}")
+            return 1
+
+    passwords = {username: args.password or generate_password() for username in usernames}
+    hashes = hash_many(passwords.values(), args.workers)
+    updated = db.bulk_change_passwords(dict(zip(passwords, hashes)))
+    print(f"✅ Contraseña actualizada para {len(updated)} usuarios")
+    if not args.password:
+        if args.credentials:
+            write_credentials(args.credentials, [(username, passwords[username]) for username in updated])
+        else:
+            for username in updated:
+                print(f"🔑 {username}: {passwords[username]}")
+    return 0
+
+
+def cmd_export(db, args):
+    users = db.get_all_users()
+    output = open(args.output, 'w', newline='', encoding='utf-8') if args.output else sys.stdout
+    try:
+        writer = csv.DictWriter(output, fieldnames=EXPORT_COLUMNS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(users)
+    finally:
+        if args.output:
+            output.close()
+            print(f"✅ {len(users)} usuarios exportados a {args.output}")
+    return 0
+
+
+def cmd_rotate_legacy(db, args):
+    """Los hashes SHA-256 sin sal no se pueden convertir sin la contraseña: se reemplazan por
+    contraseñas temporales (y opcionalmente se envía un enlace de recuperación)"""
+    legacy = {username: password_hash for username, password_hash in db.get_password_hashes().items()
+              if is_legacy_hash(password_hash)}
+    if not legacy:
+        print("✅ No hay hashes SHA-256 heredados")
+        return 0
+    print(f"🔄 {len(legacy)} usuarios con hash SHA-256 heredado")
+    if args.dry_run:
+        for username in sorted(legacy):
+            print(f"• {username}")
+        return 0
+
+    passwords = {username: generate_password() for username in legacy}
+    hashes = dict(zip(passwords, hash_many(passwords.values(), args.workers)))
+    # Solo si el hash no cambió mientras tanto (p. ej. el usuario inició sesión y se rehízo)
+    rotated = [username for username in legacy
+               if db.update_password_hash(username, legacy[username], hashes[username])]
+    print(f"✅ {len(rotated)} hashes reemplazados por bcrypt")
+    if rotated:
+        write_credentials(args.credentials, [(username, passwords[username]) for username in rotated])
+
+    if args.notify:
+        from email_service import EmailService
+
+        email_service = EmailService(db)
+        messages = []
+        for username in rotated:
+            user = db.get_user(username)
+            if user and user.get('email'):
+                messages.append(email_service.password_reset_message(user, db.create_reset_token(username)))
+        if messages:
+            db.enqueue_emails(messages, kind='password_reset')
+        print(f"📧 {len(messages)} enlaces de recuperación en cola de envío")
+    return 0
+
+
+COMMANDS = {
+    'list': cmd_list,
+    'import': cmd_import,
+    'reset': cmd_reset,
+    'export': cmd_export,
+    'rotate-legacy': cmd_rotate_legacy,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Administración de usuarios del SIGQ")
+    parser.add_argument('--db', default="fmre_reports.db", help="Ruta de la base de datos")
+    subparsers = parser.add_subparsers(dest='command')
+
+    subparsers.add_parser('list', help="Lista los usuarios")
+
+    import_users = subparsers.add_parser('import', help="Alta masiva desde CSV en una sola transacción")
+    import_users.add_argument('csv', help="CSV con username, full_name y opcionalmente email, role, password")
+    import_users.add_argument('--role', default='operator', choices=ROLES, help="Rol si el CSV no lo indica")
+    import_users.add_argument('--workers', type=int, default=None, help="Procesos para el hashing (por defecto, núcleos)")
+    import_users.add_argument('--rounds', type=int, default=None,
+                              help="Costo bcrypt (por defecto BCRYPT_ROUNDS; si es menor se sube al iniciar sesión)")
+    import_users.add_argument('--credentials', help="CSV de salida con las contraseñas generadas")
+    import_users.add_argument('--welcome', action='store_true', help="Encolar el email de bienvenida")
+    import_users.add_argument('--dry-run', action='store_true', help="Solo validar el archivo")
+
+    reset = subparsers.add_parser('reset', help="Restablece contraseñas de uno o varios usuarios")
+    reset.add_argument('usernames', nargs='+')
+    reset.add_argument('--password', help="Misma contraseña para todos (por defecto se genera una por usuario)")
+    reset.add_argument('--workers', type=int, default=None)
+    reset.add_argument('--credentials', help="CSV de salida con las contraseñas generadas")
+
+    export = subparsers.add_parser('export', help="Exporta los usuarios a CSV (sin hashes)")
+    export.add_argument('-o', '--output', help="Archivo de salida (por defecto, salida estándar)")
+
+    rotate = subparsers.add_parser('rotate-legacy', help="Reemplaza los hashes SHA-256 heredados")
+    rotate.add_argument('--workers', type=int, default=None)
+    rotate.add_argument('--credentials', default='credenciales_temporales.csv',
+                        help="CSV de salida con las contraseñas temporales")
+    rotate.add_argument('--notify', action='store_true', help="Encolar un enlace de recuperación a cada usuario con email")
+    rotate.add_argument('--dry-run', action='store_true', help="Solo listar los usuarios afectados")
+
+    args = parser.parse_args()
+    if args.command not in COMMANDS:
+        parser.print_help()
+        return 1
+    if args.command != 'import' and not os.path.exists(args.db):
+        print(f"❌ Error: Base de datos no encontrada en {args.db}")
+        return 1
+    return COMMANDS[args.command](FMREDatabase(args.db), args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,20 +2,27 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 import io
 
-from database import FMREDatabase
 from utils import (
     validate_all_fields, format_call_sign, format_name, format_qth,
     get_mexican_states, format_timestamp, get_signal_quality_text,
     get_zonas, get_sistemas, validate_call_sign, validate_operator_name, 
     validate_ciudad, validate_estado, validate_signal_report, get_estados_list,
-    validate_call_sign_zone_consistency, detect_inconsistent_data
+    validate_call_sign_zone_consistency, detect_inconsistent_data, validate_hf_fields
 )
-from exports import FMREExporter
-from auth import AuthManager
-from email_service import EmailService
+from exports import available_compressions
+from export_query import ExportQuery, REPORT_COLUMNS, PDF_COLUMNS
+from export_prep import EXCEL_COLUMN_ORDER
+from asset_registry import get_asset_registry
+from dashboard_charts import build_dashboard, build_propagation_figure
+from ranking import RankingPeriod, RANKING_DIMENSIONS, PERIOD_KINDS
+from live_monitor import LiveSessionMonitor
+from geo import NET_CONTROL_GRID
+from bootstrap import bootstrap
+from backups import create_backup, apply_retention, list_backups, verify_backup
+from sql_console import ReadOnlyConsole, QueryTimeout, SQL_CONSOLE_TIMEOUT, SQL_CONSOLE_MAX_ROWS
 import secrets
 import string
 
@@ -38,7 +45,7 @@ def show_db_admin():
     
     with tab1:
         st.subheader("🔍 Ejecutar Consultas SQL Directas")
-        st.info("💡 Ejecuta consultas SQL personalizadas en la base de datos. Solo consultas SELECT son seguras para exploración.")
+        st.info(f"💡 Consola de solo lectura: cada consulta se interrumpe a los {SQL_CONSOLE_TIMEOUT:g} s y devuelve a lo más las filas indicadas. Para modificar datos usa las demás pestañas.")
         
         # Consultas predefinidas útiles
         st.markdown("**Consultas Predefinidas:**")
@@ -61,60 +68,60 @@ def show_db_admin():
             "Consulta SQL:",
             value=st.session_state.get('sql_query', ''),
             height=150,
-            help="Ingresa tu consulta SQL. Recomendado: usar LIMIT para consultas grandes."
+            help="Una sola consulta SELECT, WITH, EXPLAIN o PRAGMA de consulta."
         )
         
+        col_rows, col_plan = st.columns(2)
+        with col_rows:
+            max_rows = st.number_input("Máximo de filas:", min_value=10, max_value=SQL_CONSOLE_MAX_ROWS,
+                                       value=min(1000, SQL_CONSOLE_MAX_ROWS), step=100)
+        with col_plan:
+            show_plan = st.checkbox("Mostrar plan de ejecución (EXPLAIN QUERY PLAN)", value=True)
+        
         col_execute, col_clear = st.columns(2)
         
         with col_execute:
             if st.button("▶️ Ejecutar Consulta", type="primary"):
                 if sql_query.strip():
                     try:
-                        # Ejecutar la consulta
-                        import sqlite3
-                        conn = sqlite3.connect(db.db_path)
+                        # Conexión de solo lectura con tiempo límite: no bloquea el registro de reportes
+                        result = ReadOnlyConsole(db.db_path).run(sql_query, max_rows=int(max_rows))
+                        result_df = result['data']
                         
-                        # Verificar si es una consulta de solo lectura (SELECT)
-                        query_upper = sql_query.upper().strip()
-                        if query_upper.startswith('SELECT') or query_upper.startswith('WITH'):
-                            # Consulta de solo lectura
-                            result_df = pd.read_sql_query(sql_query, conn)
-                            conn.close()
-                            
-                            st.success(f"✅ Consulta ejecutada exitosamente. {len(result_df)} filas devueltas.")
-                            
-                            if not result_df.empty:
-                                st.dataframe(result_df, use_container_width=True)
-                                
-                                # Opción para descargar resultados
-                                csv = result_df.to_csv(index=False)
-                                from datetime import datetime as dt
-                                st.download_button(
-                                    label="📥 Descargar resultados como CSV",
-                                    data=csv,
-                                    file_name=f"query_results_{dt.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                                    mime="text/csv"
-                                )
-                            else:
-                                st.info("La consulta no devolvió resultados.")
+                        st.success(f"✅ Consulta ejecutada en {result['seconds'] * 1000:.0f} ms. {len(result_df)} filas devueltas.")
+                        if result['truncated']:
+                            st.warning(f"⚠️ El resultado se limitó a {len(result_df)} filas. Usa LIMIT o filtros para acotarlo.")
                         
-                        else:
-                            # Consulta de modificación - requiere confirmación adicional
-                            st.warning("⚠️ Esta consulta puede modificar datos. ¿Estás seguro?")
+                        if show_plan and result['plan']:
+                            with st.expander("🧭 Plan de ejecución", expanded=False):
+                                st.code(result['plan'], language=None)
+                        
+                        if not result_df.empty:
+                            st.dataframe(result_df, use_container_width=True)
                             
-                            if st.button("⚠️ SÍ, EJECUTAR CONSULTA DE MODIFICACIÓN", type="secondary"):
-                                cursor = conn.cursor()
-                                cursor.execute(sql_query)
-                                rows_affected = cursor.rowcount
-                                conn.commit()
-                                conn.close()
-                                
-                                st.success(f"✅ Consulta ejecutada. {rows_affected} filas afectadas.")
-                            else:
-                                conn.close()
+                            # Opción para descargar resultados
+                            csv = result_df.to_csv(index=False)
+                            from datetime import datetime as dt
+                            st.download_button(
+                                label="📥 Descargar resultados como CSV",
+                                data=csv,
+                                file_name=f"query_results_{dt.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                                mime="text/csv"
+                            )
+                        else:
+                            st.info("La consulta no devolvió resultados.")
                     
+                    except QueryTimeout as e:
+                        st.error(f"⏱️ {str(e)}. Revisa el plan de ejecución o agrega filtros.")
+                        try:
+                            st.code(ReadOnlyConsole(db.db_path).explain(sql_query), language=None)
+                        except Exception:
+                            pass
                     except Exception as e:
-                        st.error(f"❌ Error al ejecutar consulta: {str(e)}")
+                        if 'readonly' in str(e) or 'not authorized' in str(e):
+                            st.error("❌ La consola es de solo lectura: no se permiten modificaciones, ATTACH ni PRAGMAs de configuración.")
+                        else:
+                            st.error(f"❌ Error al ejecutar consulta: {str(e)}")
                 else:
                     st.warning("⚠️ Ingresa una consulta SQL válida.")
         
@@ -401,31 +408,48 @@ def show_db_admin():
             
             if st.button("📥 Crear respaldo completo"):
                 try:
-                    import shutil
-                    from datetime import datetime
-                    
-                    backup_filename = f"backup_sigq_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
-                    backup_path = f"backups/{backup_filename}"
-                    
-                    # Crear directorio de backups si no existe
-                    os.makedirs("backups", exist_ok=True)
-                    
-                    # Copiar base de datos
-                    shutil.copy2(db.db_path, backup_path)
-                    
-                    st.success(f"✅ Respaldo creado: {backup_path}")
-                    
-                    # Ofrecer descarga del respaldo
-                    with open(backup_path, "rb") as f:
-                        st.download_button(
-                            label="📥 Descargar respaldo",
-                            data=f.read(),
-                            file_name=backup_filename,
-                            mime="application/octet-stream"
-                        )
-                        
+                    # Copia consistente con la API de respaldo de SQLite, verificada y comprimida
+                    backup = create_backup(db.db_path)
+                    removed = apply_retention()
+                    st.success(f"✅ Respaldo creado: {backup['path']} "
+                               f"({backup['database_size'] / 1024:.0f} KB → {backup['size'] / 1024:.0f} KB, "
+                               f"{backup['seconds']:.1f}s, quick_check: {backup['quick_check']})")
+                    if removed:
+                        st.info(f"🗑️ {len(removed)} respaldos antiguos eliminados por la política de retención")
                 except Exception as e:
                     st.error(f"❌ Error: {str(e)}")
+            
+            existing_backups = list_backups()
+            if existing_backups:
+                selected_backup = st.selectbox(
+                    "Respaldos disponibles:",
+                    existing_backups,
+                    format_func=lambda backup: f"{backup['created']:%d/%m/%Y %H:%M} ({backup['size'] / 1024:.0f} KB)"
+                )
+                backup_path = selected_backup['path']
+                
+                def read_selected_backup():
+                    # Solo se lee al pulsar el botón, no en cada recarga de la página
+                    with open(backup_path, "rb") as f:
+                        return f.read()
+                
+                st.download_button(
+                    label="📥 Descargar respaldo",
+                    data=read_selected_backup,
+                    file_name=selected_backup['filename'],
+                    mime="application/gzip" if selected_backup['filename'].endswith('.gz') else "application/octet-stream",
+                    on_click="ignore"
+                )
+                if st.button("🔍 Verificar respaldo"):
+                    check = verify_backup(selected_backup['path'])
+                    if check == 'ok':
+                        st.success("✅ PRAGMA quick_check: ok")
+                    else:
+                        st.error(f"❌ PRAGMA quick_check: {check}")
+
+def rank_medal(rank):
+    """Medalla para un lugar del ranking (los empates comparten medalla)"""
+    return {1: "🥇", 2: "🥈", 3: "🥉"}.get(int(rank), "🏅")
 
 def show_motivational_dashboard():
     """Muestra el dashboard de rankings y reconocimientos"""
@@ -436,7 +460,7 @@ def show_motivational_dashboard():
     motivational_stats = db.get_motivational_stats()
     
     # Pestañas para organizar las estadísticas
-    tab1, tab2, tab3, tab4 = st.tabs(["🥇 Estaciones Top", "🌍 Zonas Activas", "📡 Sistemas Populares", "📊 Resumen General"])
+    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["🥇 Estaciones Top", "🌍 Zonas Activas", "📡 Sistemas Populares", "📊 Resumen General", "🔎 Ranking por Periodo", "🔥 Rachas y Constancia"])
     
     with tab1:
         st.subheader("🎯 Estaciones Más Reportadas")
@@ -446,38 +470,22 @@ def show_motivational_dashboard():
         with col1:
             st.markdown("#### 📅 **Este Año**")
             if not motivational_stats['top_stations_year'].empty:
-                for idx, row in motivational_stats['top_stations_year'].head(5).iterrows():
-                    if idx == 0:
-                        st.markdown(f"🥇 **{row['call_sign']}** - {row['operator_name']}")
-                        st.markdown(f"   📊 {row['total_reports']} reportes")
-                    elif idx == 1:
-                        st.markdown(f"🥈 **{row['call_sign']}** - {row['operator_name']}")
-                        st.markdown(f"   📊 {row['total_reports']} reportes")
-                    elif idx == 2:
-                        st.markdown(f"🥉 **{row['call_sign']}** - {row['operator_name']}")
-                        st.markdown(f"   📊 {row['total_reports']} reportes")
-                    else:
-                        st.markdown(f"🏅 **{row['call_sign']}** - {row['operator_name']}")
-                        st.markdown(f"   📊 {row['total_reports']} reportes")
+                # Las estaciones empatadas comparten lugar (RANK) y medalla
+                top_stations = motivational_stats['top_stations_year']
+                for call_sign, operator_name, total_reports, rank in top_stations.head(5).itertuples(index=False):
+                    st.markdown(f"{rank_medal(rank)} **{call_sign}** - {operator_name}")
+                    st.markdown(f"   📊 {total_reports} reportes")
             else:
                 st.info("No hay datos suficientes para mostrar el ranking anual")
         
         with col2:
             st.markdown("#### 📆 **Este Mes**")
             if not motivational_stats['top_stations_month'].empty:
-                for idx, row in motivational_stats['top_stations_month'].head(5).iterrows():
-                    if idx == 0:
-                        st.markdown(f"🥇 **{row['call_sign']}** - {row['operator_name']}")
-                        st.markdown(f"   📊 {row['total_reports']} reportes")
-                    elif idx == 1:
-                        st.markdown(f"🥈 **{row['call_sign']}** - {row['operator_name']}")
-                        st.markdown(f"   📊 {row['total_reports']} reportes")
-                    elif idx == 2:
-                        st.markdown(f"🥉 **{row['call_sign']}** - {row['operator_name']}")
-                        st.markdown(f"   📊 {row['total_reports']} reportes")
-                    else:
-                        st.markdown(f"🏅 **{row['call_sign']}** - {row['operator_name']}")
-                        st.markdown(f"   📊 {row['total_reports']} reportes")
+                # Las estaciones empatadas comparten lugar (RANK) y medalla
+                top_stations = motivational_stats['top_stations_month']
+                for call_sign, operator_name, total_reports, rank in top_stations.head(5).itertuples(index=False):
+                    st.markdown(f"{rank_medal(rank)} **{call_sign}** - {operator_name}")
+                    st.markdown(f"   📊 {total_reports} reportes")
             else:
                 st.info("No hay datos suficientes para mostrar el ranking mensual")
     
@@ -560,6 +568,105 @@ def show_motivational_dashboard():
             else:
                 st.info("No hay estadísticas generales del mes")
     
+    with tab5:
+        st.subheader("🔎 Ranking por Periodo")
+        
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            period_kind = st.selectbox(
+                "Periodo:",
+                list(PERIOD_KINDS.keys()),
+                index=2,
+                format_func=lambda kind: PERIOD_KINDS[kind],
+                key="ranking_period_kind"
+            )
+        
+        with col2:
+            dimension = st.selectbox(
+                "Clasificar por:",
+                list(RANKING_DIMENSIONS.keys()),
+                format_func=lambda dim: RANKING_DIMENSIONS[dim],
+                key="ranking_dimension"
+            )
+        
+        with col3:
+            ranking_limit = st.number_input("Lugares:", min_value=1, max_value=100, value=10, key="ranking_limit")
+        
+        if period_kind == 'custom':
+            col_start, col_end = st.columns(2)
+            with col_start:
+                period_start = st.date_input("Desde:", value=date.today().replace(day=1), key="ranking_start")
+            with col_end:
+                period_end = st.date_input("Hasta:", value=date.today(), key="ranking_end")
+            period = RankingPeriod.custom(period_start, period_end) if period_start <= period_end else None
+        else:
+            period_day = st.date_input("Fecha de referencia:", value=date.today(), key="ranking_reference")
+            period = RankingPeriod.for_kind(period_kind, period_day)
+        
+        if period is None:
+            st.error("❌ La fecha inicial debe ser anterior a la final")
+        else:
+            st.markdown(f"#### 📅 **{period.label}**")
+            ranking_df = db.get_ranking(dimension, period, limit=int(ranking_limit))
+            if not ranking_df.empty:
+                display_ranking = ranking_df.copy()
+                display_ranking.insert(0, 'Lugar', [f"{rank_medal(rank)} {rank}" for rank in display_ranking['rank']])
+                display_ranking = display_ranking.drop(columns=['rank', 'dense_rank']).rename(columns={
+                    dimension: RANKING_DIMENSIONS[dimension],
+                    'operator_name': 'Operador',
+                    'unique_stations': 'Estaciones Únicas',
+                    'total_reports': 'Reportes'
+                })
+                st.dataframe(display_ranking, use_container_width=True, hide_index=True)
+            else:
+                st.info("No hay reportes en el periodo seleccionado")
+    
+    with tab6:
+        st.subheader("🔥 Rachas de Asistencia")
+        
+        # Matriz de participación en caché; solo se leen sesiones nuevas o modificadas
+        attendance = init_attendance()
+        attendance.refresh()
+        station_summary = attendance.station_summary()
+        
+        if not station_summary.empty:
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                st.markdown("#### 🔥 **Racha Actual**")
+                current = station_summary[station_summary['current_streak'] > 0].sort_values(
+                    ['current_streak', 'call_sign'], ascending=[False, True]).head(10)
+                if not current.empty:
+                    for call_sign, streak in zip(current['call_sign'], current['current_streak']):
+                        st.markdown(f"**{call_sign}** - {streak} boletines consecutivos")
+                else:
+                    st.info("Ninguna estación asistió a la sesión más reciente")
+            
+            with col2:
+                st.markdown("#### 🏆 **Racha Máxima**")
+                for call_sign, streak in zip(station_summary['call_sign'].head(10), station_summary['longest_streak'].head(10)):
+                    st.markdown(f"**{call_sign}** - {streak} boletines consecutivos")
+            
+            st.markdown("#### 📋 **Constancia por Estación**")
+            display_summary = station_summary.rename(columns={
+                'call_sign': 'Indicativo',
+                'sessions_attended': 'Sesiones',
+                'first_seen': 'Primera Sesión',
+                'last_seen': 'Última Sesión',
+                'current_streak': 'Racha Actual',
+                'longest_streak': 'Racha Máxima',
+                'attendance_rate': '% Asistencia'
+            })
+            st.dataframe(display_summary, use_container_width=True, hide_index=True)
+            
+            st.markdown("#### 📈 **Retención por Generación (año de primera sesión)**")
+            retention = attendance.cohort_retention()
+            st.dataframe(retention.rename(columns={'estaciones': 'Estaciones'}), use_container_width=True)
+            st.caption("Porcentaje de cada generación que participó al menos una vez en cada año")
+        else:
+            st.info("No hay datos suficientes para calcular rachas")
+    
     # Mensaje motivacional
     st.markdown("---")
     st.markdown("### 🎉 ¡Sigue Participando!")
@@ -573,11 +680,14 @@ def show_user_management():
         
     st.header("👥 Gestión de Usuarios")
     
-    # Inicializar servicio de email
+    # Servicio de email y bandeja de salida compartidos por el proceso
     if 'email_service' not in st.session_state:
-        st.session_state.email_service = EmailService()
+        st.session_state.email_service = bootstrap().email_service
     
     email_service = st.session_state.email_service
+    # Tomar la configuración SMTP guardada por otro administrador u otro proceso
+    email_service.reload_settings()
+    outbox = bootstrap().outbox
     
     # Tabs para organizar funcionalidades
     tab1, tab2, tab3, tab4 = st.tabs(["📋 Lista de Usuarios", "➕ Crear Usuario", "🔄 Recuperar Contraseña", "⚙️ Configuración Email"])
@@ -673,12 +783,11 @@ def show_user_management():
                                                 'role': edit_role
                                             }
                                             
-                                            if change_password:
-                                                import hashlib
-                                                update_data['password'] = hashlib.sha256(edit_password.encode()).hexdigest()
-                                            
                                             db.update_user(user['id'], **update_data)
                                             
+                                            if change_password:
+                                                db.change_password(user['username'], auth.hash_password(edit_password))
+                                            
                                             st.success("✅ Usuario actualizado exitosamente")
                                             st.info(f"**Usuario:** {user['username']}\n**Nombre:** {edit_full_name}\n**Email:** {edit_email}\n**Rol:** {edit_role}")
                                             
@@ -730,7 +839,7 @@ def show_user_management():
                                     - **Rol:** {new_role}
                                     """)
                                     
-                                    # Enviar email de bienvenida si está configurado
+                                    # Encolar email de bienvenida (lo entrega la bandeja de salida)
                                     try:
                                         user_data = {
                                             'username': new_username,
@@ -739,12 +848,13 @@ def show_user_management():
                                             'role': new_role
                                         }
                                         
-                                        if email_service.send_welcome_email(user_data, new_password):
-                                            st.success("📧 Email de bienvenida enviado")
+                                        outbox.enqueue(**email_service.welcome_message(user_data, new_password), kind='welcome')
+                                        if email_service.is_configured():
+                                            st.success("📧 Email de bienvenida en cola de envío")
                                         else:
-                                            st.warning("⚠️ Usuario creado pero no se pudo enviar el email de bienvenida")
+                                            st.warning("⚠️ Email de bienvenida en cola; se enviará cuando se configure SMTP")
                                     except Exception as e:
-                                        st.warning(f"⚠️ Usuario creado pero error al enviar email: {str(e)}")
+                                        st.warning(f"⚠️ Usuario creado pero error al encolar email: {str(e)}")
                                     
                                     # Esperar antes de recargar para mostrar mensajes
                                     import time
@@ -771,16 +881,14 @@ def show_user_management():
                         st.success(f"✅ Token de recuperación generado: **{token}**")
                         st.info("Este token expira en 1 hora y es de un solo uso.")
                         
-                        # Intentar enviar por email
-                        user = db.get_user_by_username(recovery_username)
+                        # Encolar el enlace por email (lo entrega la bandeja de salida)
+                        user = db.get_user(recovery_username)
                         if user and user.get('email'):
                             try:
-                                if email_service.send_password_recovery_email(user, token):
-                                    st.success("📧 Token enviado por email")
-                                else:
-                                    st.warning("⚠️ No se pudo enviar el email. Usa el token mostrado arriba.")
+                                outbox.enqueue(**email_service.password_reset_message(user, token), kind='password_reset')
+                                st.success("📧 Enlace de recuperación en cola de envío")
                             except Exception as e:
-                                st.warning(f"⚠️ Error al enviar email: {str(e)}")
+                                st.warning(f"⚠️ Error al encolar email: {str(e)}. Usa el token mostrado arriba.")
                     else:
                         st.error("❌ Usuario no encontrado")
                 except Exception as e:
@@ -814,6 +922,9 @@ def show_user_management():
     
     with tab4:
         st.subheader("⚙️ Configuración de Email SMTP")
+        st.caption("La configuración es del sistema: aplica a todas las sesiones y a la bandeja de salida.")
+        if email_service.updated_by:
+            st.caption(f"Última modificación por {email_service.updated_by}")
         
         with st.form("smtp_config_form"):
             smtp_server = st.text_input("Servidor SMTP:", value=email_service.smtp_server or "")
@@ -827,12 +938,12 @@ def show_user_management():
             
             if submit_smtp:
                 try:
+                    # Una contraseña vacía conserva la guardada
                     email_service.configure_smtp(
-                        smtp_server, smtp_port, smtp_username, 
-                        smtp_password if smtp_password else email_service.smtp_password,
-                        sender_email, sender_name
+                        smtp_server, smtp_port, smtp_username, smtp_password,
+                        sender_email, sender_name, updated_by=current_user['username']
                     )
-                    st.success("✅ Configuración SMTP guardada")
+                    st.success("✅ Configuración SMTP guardada para todo el sistema")
                 except Exception as e:
                     st.error(f"❌ Error al guardar configuración: {str(e)}")
         
@@ -842,6 +953,81 @@ def show_user_management():
                 st.success("✅ Conexión SMTP exitosa")
             else:
                 st.error("❌ Error en la conexión SMTP")
+        
+        # Estado de la bandeja de salida
+        st.markdown("---")
+        st.subheader("📤 Bandeja de Salida")
+        outbox_stats = db.get_outbox_stats()
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Pendientes", outbox_stats['pending'] + outbox_stats['sending'])
+        with col2:
+            st.metric("Enviados", outbox_stats['sent'])
+        with col3:
+            st.metric("Fallidos (dead)", outbox_stats['dead'])
+        with col4:
+            avg_latency = outbox_stats['avg_latency']
+            st.metric("Latencia promedio (24 h)", f"{avg_latency:.1f} s" if avg_latency is not None else "N/A")
+        
+        outbox_df = db.get_outbox(limit=50)
+        if not outbox_df.empty:
+            st.dataframe(outbox_df, use_container_width=True, hide_index=True)
+        
+        if outbox_stats['dead'] and st.button("🔁 Reintentar correos fallidos"):
+            requeued = db.retry_dead_emails()
+            outbox.wake()
+            st.success(f"✅ {requeued} correos regresados a la cola")
+            st.rerun()
+        
+        # Resumen de participación por correo tras cada boletín
+        st.markdown("---")
+        st.subheader("📨 Resumen por Participante")
+        
+        with st.expander("📇 Correos de participantes"):
+            contacts_df = db.get_participant_contacts()
+            edited_contacts = st.data_editor(
+                contacts_df,
+                num_rows="dynamic",
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    'call_sign': st.column_config.TextColumn("Indicativo", required=True),
+                    'email': st.column_config.TextColumn("Email", required=True),
+                    'name': st.column_config.TextColumn("Nombre"),
+                    'subscribed': st.column_config.CheckboxColumn("Suscrito", default=True),
+                },
+                key="participant_contacts_editor"
+            )
+            if st.button("💾 Guardar correos"):
+                edited_contacts = edited_contacts.dropna(subset=['call_sign', 'email'])
+                edited_contacts = edited_contacts.astype(object).where(edited_contacts.notna(), None)
+                invalid = edited_contacts[~edited_contacts['email'].str.contains('@', regex=False)]
+                if not invalid.empty:
+                    st.error(f"❌ Email inválido para: {', '.join(invalid['call_sign'])}")
+                else:
+                    removed = set(contacts_df['call_sign']) - set(edited_contacts['call_sign'].str.strip().str.upper())
+                    if removed:
+                        db.delete_participant_contacts(removed)
+                    saved = db.upsert_participant_contacts(edited_contacts.to_dict('records'))
+                    st.success(f"✅ {saved} correos guardados")
+                    st.rerun()
+        
+        summary_sessions = list(bootstrap().attendance.sessions[::-1])
+        if summary_sessions:
+            summary_session = st.selectbox("Sesión:", summary_sessions, key="summary_session")
+            summary_absent = st.checkbox(
+                "Incluir a quienes no reportaron en la sesión",
+                value=False,
+                help="Envía también el resumen a los suscritos que han participado antes pero no en esta sesión"
+            )
+            if st.button("📨 Enviar resúmenes de la sesión"):
+                try:
+                    queued = bootstrap().summary_mailer.send(summary_session, attended_only=not summary_absent)
+                    st.success(f"✅ {queued} resúmenes en cola de envío")
+                except Exception as e:
+                    st.error(f"❌ Error al generar resúmenes: {str(e)}")
+        else:
+            st.info("No hay sesiones con reportes")
 
 # Configuración de la página
 st.set_page_config(
@@ -918,27 +1104,47 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Inicializar base de datos y autenticación
-@st.cache_resource
+# Inicializar base de datos y autenticación: bootstrap() prepara todo una sola vez
+# por proceso; las sesiones nuevas solo obtienen los objetos compartidos
 def init_database():
-    return FMREDatabase()
+    return bootstrap().db
 
-@st.cache_resource
 def init_exporter():
-    return FMREExporter()
+    return bootstrap().exporter
+
+def init_attendance():
+    return bootstrap().attendance
+
+def init_propagation():
+    return bootstrap().propagation
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def load_dashboard(session_date_text, data_revision):
+    """Estadísticas y figuras del Dashboard para una sesión
+
+    data_revision solo forma parte de la llave del caché: cualquier cambio en los
+    reportes de la sesión la incrementa y fuerza a recalcular SQL y figuras.
+    """
+    database = init_database()
+    stats = database.get_statistics(session_date_text)
+    stats['checkin_rate'] = database.get_checkin_rate(session_date_text)
+    return build_dashboard(stats)
 
 def init_auth():
     if 'auth_manager' not in st.session_state:
-        db = init_database()
-        auth = AuthManager(db)
-        auth.create_default_admin()  # Crear admin por defecto
-        st.session_state.auth_manager = auth
+        # El admin por defecto se verifica en bootstrap()
+        st.session_state.auth_manager = bootstrap().auth
     return st.session_state.auth_manager
 
 db = init_database()
 exporter = init_exporter()
 auth = init_auth()
 
+# Enlace de recuperación de contraseña recibido por email
+if not auth.is_logged_in() and st.query_params.get("reset_token"):
+    auth.show_reset_password_form(st.query_params["reset_token"])
+    st.stop()
+
 # Verificar autenticación
 if not auth.is_logged_in():
     auth.show_login_form()
@@ -1143,6 +1349,45 @@ def show_profile_management():
                 auth.logout()
                 st.session_state.show_logout_button_2 = False
 
+LIVE_MONITOR_INTERVAL = 5  # segundos entre sondeos del monitor en vivo
+
+@st.fragment(run_every=LIVE_MONITOR_INTERVAL)
+def show_live_monitor(session_date):
+    """Tabla de la sesión que se actualiza sola agregando únicamente los reportes nuevos"""
+    monitor = st.session_state.get('live_monitor')
+    session_text = session_date.strftime('%Y-%m-%d')
+    if monitor is None or monitor.session_date != session_text:
+        monitor = LiveSessionMonitor(db, session_date)
+        st.session_state.live_monitor = monitor
+    
+    change = monitor.poll()
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        st.metric("Participantes Únicos", monitor.unique_participants)
+    
+    with col2:
+        st.metric("Total de Reportes", monitor.total_reports, delta=change or None)
+    
+    with col3:
+        avg_quality = monitor.average_quality
+        if avg_quality is None:
+            st.metric("Calidad Promedio", "N/A")
+        else:
+            quality_text = "Buena" if avg_quality > 2.5 else "Regular" if avg_quality > 1.5 else "Mala"
+            st.metric("Calidad Promedio", quality_text)
+    
+    if monitor.total_reports:
+        display_data = monitor.latest()[['call_sign', 'operator_name', 'qth', 'zona', 'sistema', 'signal_report', 'timestamp']].copy()
+        display_data['timestamp'] = display_data['timestamp'].astype(str).str.slice(11, 19)
+        display_data.columns = ['Indicativo', 'Operador', 'QTH', 'Zona', 'Sistema', 'Señal', 'Hora']
+        st.dataframe(display_data, use_container_width=True, hide_index=True)
+    else:
+        st.info("Esperando reportes de la sesión...")
+    
+    st.caption(f"🔄 Actualización cada {LIVE_MONITOR_INTERVAL} s · Última consulta: {datetime.now().strftime('%H:%M:%S')}")
+
 def registro_reportes():
     st.title("📋 Registro de Reportes")
     
@@ -1153,13 +1398,13 @@ def registro_reportes():
     user_hf_power = ""
     
     if current_user:
-        user_preferred_system = db.get_user_preferred_system(current_user['username']) or "ASL"
-        # Obtener configuración HF preferida del usuario
-        user_data = db.get_user_by_username(current_user['username'])
-        if user_data and len(user_data) > 6:  # Verificar que existan los campos HF
-            user_hf_frequency = user_data[7] or ""  # hf_frequency_pref
-            user_hf_mode = user_data[8] or ""       # hf_mode_pref  
-            user_hf_power = user_data[9] or ""      # hf_power_pref
+        # Perfil desde el caché de usuarios (sin consultas en cada rerun)
+        user_data = db.get_user(current_user['username'])
+        if user_data:
+            user_preferred_system = user_data['preferred_system'] or "ASL"
+            user_hf_frequency = user_data['hf_frequency_pref'] or ""
+            user_hf_mode = user_data['hf_mode_pref'] or ""
+            user_hf_power = user_data['hf_power_pref'] or ""
         
     # Configuración de Sistema Preferido
     st.subheader("⚙️ Configuración de Sistema Preferido")
@@ -1506,6 +1751,9 @@ def registro_reportes():
         if submitted:
             # Validar campos
             is_valid, errors = validate_all_fields(call_sign, operator_name, estado, ciudad, signal_report, zona, sistema)
+            hf_valid, hf_errors = validate_hf_fields(sistema, hf_frequency, "", hf_mode, hf_power)
+            is_valid = is_valid and hf_valid
+            errors = errors + hf_errors
             
             if is_valid:
                 # Verificar si hay inconsistencias que requieren confirmación
@@ -1521,6 +1769,9 @@ def registro_reportes():
                         'signal_report': signal_report,
                         'zona': zona,
                         'sistema': sistema,
+                        'hf_frequency': hf_frequency,
+                        'hf_mode': hf_mode,
+                        'hf_power': hf_power,
                         'observations': observations,
                         'warning_msg': warning_msg
                     }
@@ -1532,7 +1783,7 @@ def registro_reportes():
                         report_id = db.add_report(
                             call_sign, operator_name, estado, ciudad, 
                             signal_report, zona, sistema, 
-                            grid_locator="", hf_frequency="", hf_band="", hf_mode="", hf_power="", 
+                            grid_locator="", hf_frequency=hf_frequency, hf_band="", hf_mode=hf_mode, hf_power=hf_power, 
                             observations=observations
                         )
                         
@@ -1568,7 +1819,8 @@ def registro_reportes():
                             pending['call_sign'], pending['operator_name'], pending['estado'], 
                             pending['ciudad'], pending['signal_report'], pending['zona'], 
                             pending['sistema'], 
-                            grid_locator="", hf_frequency="", hf_band="", hf_mode="", hf_power="", 
+                            grid_locator="", hf_frequency=pending['hf_frequency'], hf_band="", 
+                            hf_mode=pending['hf_mode'], hf_power=pending['hf_power'], 
                             observations=pending['observations']
                         )
                         
@@ -1597,24 +1849,34 @@ def registro_reportes():
     # Mostrar reportes recientes de la sesión actual
     st.subheader(f"Reportes de la Sesión - {session_date.strftime('%d/%m/%Y')}")
     
-    recent_reports = db.get_all_reports(session_date)
+    # Monitor en vivo: reemplaza las métricas y la tabla; solo consulta los reportes nuevos en cada sondeo
+    live_monitor_enabled = st.toggle("📡 Monitor en vivo", key="live_monitor_enabled", help="Actualiza la tabla automáticamente con los nuevos reportes de la sesión")
+    if live_monitor_enabled:
+        show_live_monitor(session_date)
+        # El monitor ya tiene la sesión al día: se reutiliza sin volver a consultarla completa
+        recent_reports = st.session_state.live_monitor.latest().reset_index(drop=True)
+    else:
+        recent_reports = db.get_all_reports(session_date)
     
     if not recent_reports.empty:
-        # Métricas rápidas
-        col1, col2, col3 = st.columns(3)
+        if not live_monitor_enabled:
+            # Métricas rápidas
+            col1, col2, col3 = st.columns(3)
         
-        with col1:
-            unique_participants = recent_reports['call_sign'].nunique()
-            st.metric("Participantes Únicos", unique_participants)
+            with col1:
+                unique_participants = recent_reports['call_sign'].nunique()
+                st.metric("Participantes Únicos", unique_participants)
         
-        with col2:
-            total_reports = len(recent_reports)
-            st.metric("Total de Reportes", total_reports)
+            with col2:
+                total_reports = len(recent_reports)
+                st.metric("Total de Reportes", total_reports)
         
-        with col3:
-            avg_quality = recent_reports['signal_quality'].mean()
-            quality_text = "Buena" if avg_quality > 2.5 else "Regular" if avg_quality > 1.5 else "Mala"
-            st.metric("Calidad Promedio", quality_text)
+            with col3:
+                avg_quality = recent_reports['signal_quality'].mean()
+                quality_text = "Buena" if avg_quality > 2.5 else "Regular" if avg_quality > 1.5 else "Mala"
+                st.metric("Calidad Promedio", quality_text)
+        else:
+            st.caption("Con el monitor en vivo las acciones aplican a todos los reportes o a la selección previa; desactívalo para elegir reportes en la tabla.")
         
         # Mostrar reportes con checkboxes para selección
         st.write("**Reportes de esta sesión:**")
@@ -1655,81 +1917,82 @@ def registro_reportes():
         st.divider()
         
         
-        # Preparar datos para la tabla con checkboxes
-        display_data = recent_reports.copy()
-        
-        # Agregar columna de selección
-        display_data['Seleccionar'] = display_data['id'].apply(lambda x: x in st.session_state.selected_reports)
-        
-        # Formatear timestamp
-        display_data['Hora'] = pd.to_datetime(display_data['timestamp']).dt.strftime('%H:%M:%S')
-        
-        # Configurar columnas principales a mostrar
-        columns_to_show = ['Seleccionar', 'call_sign', 'operator_name', 'qth', 'zona', 'sistema', 'signal_report', 'Hora']
-        column_config = {
-            "Seleccionar": st.column_config.CheckboxColumn(
-                "✓",
-                help="Seleccionar para acciones masivas",
-                default=False,
-            ),
-            'call_sign': st.column_config.TextColumn("Indicativo", width="medium"),
-            'operator_name': st.column_config.TextColumn("Operador", width="medium"),
-            'qth': st.column_config.TextColumn("QTH", width="medium"),
-            'zona': st.column_config.TextColumn("Zona", width="small"),
-            'sistema': st.column_config.TextColumn("Sistema", width="medium"),
-            'signal_report': st.column_config.TextColumn("Señal", width="small"),
-            'Hora': st.column_config.TextColumn("Hora", width="small")
-        }
-        
-        # Mostrar tabla de solo lectura con selección para editar
-        st.markdown("### 📋 Reportes de la Sesión")
-        
-        # Preparar datos para mostrar en tabla
-        display_data = recent_reports.copy()
-        display_data['Hora'] = pd.to_datetime(display_data['timestamp']).dt.strftime('%H:%M:%S')
-        display_data['Seleccionar'] = display_data['id'].isin(st.session_state.selected_reports)
-        
-        # Configuración de columnas para tabla de solo lectura
-        column_config = {
-            'Seleccionar': st.column_config.CheckboxColumn(
-                "Sel",
-                help="Seleccionar para editar o acciones masivas",
-                default=False,
-                width="small"
-            ),
-            'call_sign': st.column_config.TextColumn("Indicativo", width="medium"),
-            'operator_name': st.column_config.TextColumn("Operador", width="medium"),
-            'qth': st.column_config.TextColumn("QTH", width="medium"),
-            'zona': st.column_config.TextColumn("Zona", width="small"),
-            'sistema': st.column_config.TextColumn("Sistema", width="medium"),
-            'signal_report': st.column_config.TextColumn("Señal", width="small"),
-            'Hora': st.column_config.TextColumn("Hora", width="small")
-        }
-        
-        # Mostrar tabla de solo lectura (solo para selección)
-        columns_to_show = ['Seleccionar', 'call_sign', 'operator_name', 'qth', 'zona', 'sistema', 'signal_report', 'Hora']
-        
-        selected_df = st.data_editor(
-            display_data[columns_to_show],
-            column_config=column_config,
-            width='stretch',
-            hide_index=True,
-            disabled=['call_sign', 'operator_name', 'qth', 'zona', 'sistema', 'signal_report', 'Hora'],  # Solo permitir editar checkboxes
-            key="session_reports_selection_table"
-        )
+        if not live_monitor_enabled:
+            # Preparar datos para la tabla con checkboxes
+            display_data = recent_reports.copy()
+        
+            # Agregar columna de selección
+            display_data['Seleccionar'] = display_data['id'].apply(lambda x: x in st.session_state.selected_reports)
+        
+            # Formatear timestamp
+            display_data['Hora'] = pd.to_datetime(display_data['timestamp']).dt.strftime('%H:%M:%S')
+        
+            # Configurar columnas principales a mostrar
+            columns_to_show = ['Seleccionar', 'call_sign', 'operator_name', 'qth', 'zona', 'sistema', 'signal_report', 'Hora']
+            column_config = {
+                "Seleccionar": st.column_config.CheckboxColumn(
+                    "✓",
+                    help="Seleccionar para acciones masivas",
+                    default=False,
+                ),
+                'call_sign': st.column_config.TextColumn("Indicativo", width="medium"),
+                'operator_name': st.column_config.TextColumn("Operador", width="medium"),
+                'qth': st.column_config.TextColumn("QTH", width="medium"),
+                'zona': st.column_config.TextColumn("Zona", width="small"),
+                'sistema': st.column_config.TextColumn("Sistema", width="medium"),
+                'signal_report': st.column_config.TextColumn("Señal", width="small"),
+                'Hora': st.column_config.TextColumn("Hora", width="small")
+            }
+        
+            # Mostrar tabla de solo lectura con selección para editar
+            st.markdown("### 📋 Reportes de la Sesión")
+        
+            # Preparar datos para mostrar en tabla
+            display_data = recent_reports.copy()
+            display_data['Hora'] = pd.to_datetime(display_data['timestamp']).dt.strftime('%H:%M:%S')
+            display_data['Seleccionar'] = display_data['id'].isin(st.session_state.selected_reports)
+        
+            # Configuración de columnas para tabla de solo lectura
+            column_config = {
+                'Seleccionar': st.column_config.CheckboxColumn(
+                    "Sel",
+                    help="Seleccionar para editar o acciones masivas",
+                    default=False,
+                    width="small"
+                ),
+                'call_sign': st.column_config.TextColumn("Indicativo", width="medium"),
+                'operator_name': st.column_config.TextColumn("Operador", width="medium"),
+                'qth': st.column_config.TextColumn("QTH", width="medium"),
+                'zona': st.column_config.TextColumn("Zona", width="small"),
+                'sistema': st.column_config.TextColumn("Sistema", width="medium"),
+                'signal_report': st.column_config.TextColumn("Señal", width="small"),
+                'Hora': st.column_config.TextColumn("Hora", width="small")
+            }
+        
+            # Mostrar tabla de solo lectura (solo para selección)
+            columns_to_show = ['Seleccionar', 'call_sign', 'operator_name', 'qth', 'zona', 'sistema', 'signal_report', 'Hora']
+        
+            selected_df = st.data_editor(
+                display_data[columns_to_show],
+                column_config=column_config,
+                width='stretch',
+                hide_index=True,
+                disabled=['call_sign', 'operator_name', 'qth', 'zona', 'sistema', 'signal_report', 'Hora'],  # Solo permitir editar checkboxes
+                key="session_reports_selection_table"
+            )
         
-        # Actualizar selecciones basadas en la tabla
-        if selected_df is not None:
-            new_selections = []
-            for idx, row in selected_df.iterrows():
-                if row['Seleccionar']:
-                    report_id = display_data.iloc[idx]['id']
-                    new_selections.append(report_id)
-            
-            # Actualizar session_state solo si hay cambios en selecciones
-            if set(new_selections) != set(st.session_state.selected_reports):
-                st.session_state.selected_reports = new_selections
-                st.rerun()
+            # Actualizar selecciones basadas en la tabla
+            if selected_df is not None:
+                new_selections = []
+                for idx, row in selected_df.iterrows():
+                    if row['Seleccionar']:
+                        report_id = display_data.iloc[idx]['id']
+                        new_selections.append(report_id)
+            
+                # Actualizar session_state solo si hay cambios en selecciones
+                if set(new_selections) != set(st.session_state.selected_reports):
+                    st.session_state.selected_reports = new_selections
+                    st.rerun()
         
         
         # Mostrar mensajes de éxito o error
@@ -2084,8 +2347,11 @@ if page == "🏠 Registro de Reportes":
 elif page == "📊 Dashboard":
     st.header("Dashboard de Estadísticas")
 
-    # Obtener estadísticas
-    stats = db.get_statistics(session_date.strftime('%Y-%m-%d'))
+    # Obtener métricas y figuras (en caché mientras no cambien los datos de la sesión)
+    session_date_text = session_date.strftime('%Y-%m-%d')
+    dashboard = load_dashboard(session_date_text, db.get_data_revision(session_date_text))
+    metrics = dashboard['metrics']
+    figures = dashboard['figures']
 
     # Métricas principales
     col1, col2, col3, col4 = st.columns(4)
@@ -2093,33 +2359,29 @@ elif page == "📊 Dashboard":
     with col1:
         st.metric(
             "Total Participantes",
-            stats['total_participants'],
+            metrics['total_participants'],
             help="Número de indicativos únicos"
         )
     
     with col2:
         st.metric(
             "Total Reportes",
-            stats['total_reports'],
+            metrics['total_reports'],
             help="Número total de reportes registrados"
         )
     
     with col3:
-        avg_per_participant = stats['total_reports'] / max(stats['total_participants'], 1)
         st.metric(
             "Promedio por Participante",
-            f"{avg_per_participant:.1f}",
+            f"{metrics['avg_per_participant']:.1f}",
             help="Reportes promedio por participante"
         )
     
     with col4:
-        if not stats['signal_quality'].empty:
-            good_signals = stats['signal_quality'][stats['signal_quality']['signal_quality'] == 3]['count'].sum()
-            total_signals = stats['signal_quality']['count'].sum()
-            good_percentage = (good_signals / max(total_signals, 1)) * 100
+        if metrics['good_percentage'] is not None:
             st.metric(
                 "% Señales Buenas",
-                f"{good_percentage:.1f}%",
+                f"{metrics['good_percentage']:.1f}%",
                 help="Porcentaje de señales reportadas como buenas"
             )
         else:
@@ -2130,35 +2392,17 @@ elif page == "📊 Dashboard":
     
     with col1:
         # Participantes por zona
-        if not stats['by_zona'].empty:
+        if figures['zona']:
             st.subheader("Participantes por Zona")
-            
-            fig_zona = px.bar(
-                stats['by_zona'],
-                x='zona',
-                y='count',
-                title="Distribución por Zonas",
-                labels={'zona': 'Zona', 'count': 'Participantes'},
-                color='count',
-                color_continuous_scale='Blues'
-            )
-            fig_zona.update_layout(showlegend=False)
-            st.plotly_chart(fig_zona, use_container_width=True)
+            st.plotly_chart(figures['zona'], use_container_width=True)
         else:
             st.info("No hay datos de zonas disponibles")
     
     with col2:
         # Participantes por sistema
-        if not stats['by_sistema'].empty:
+        if figures['sistema']:
             st.subheader("Participantes por Sistema")
-            
-            fig_sistema = px.pie(
-                stats['by_sistema'],
-                values='count',
-                names='sistema',
-                title="Distribución por Sistemas"
-            )
-            st.plotly_chart(fig_sistema, use_container_width=True)
+            st.plotly_chart(figures['sistema'], use_container_width=True)
         else:
             st.info("No hay datos de sistemas disponibles")
     
@@ -2167,67 +2411,102 @@ elif page == "📊 Dashboard":
     
     with col1:
         # Participantes por región
-        if not stats['by_region'].empty:
+        if figures['region']:
             st.subheader("Participantes por Región")
-            
-            fig_region = px.bar(
-                stats['by_region'],
-                x='region',
-                y='count',
-                title="Distribución por Estados",
-                labels={'region': 'Estado', 'count': 'Participantes'}
-            )
-            fig_region.update_layout(showlegend=False)
-            st.plotly_chart(fig_region, use_container_width=True)
+            st.plotly_chart(figures['region'], use_container_width=True)
         else:
             st.info("No hay datos de regiones disponibles")
     
     with col2:
         # Calidad de señal
-        if not stats['signal_quality'].empty:
+        if figures['quality']:
             st.subheader("Distribución de Calidad de Señal")
-            
-            quality_df = stats['signal_quality'].copy()
-            quality_df['quality_text'] = quality_df['signal_quality'].map(get_signal_quality_text)
-            
-            fig_quality = px.pie(
-                quality_df,
-                values='count',
-                names='quality_text',
-                title="Calidad de Señales Reportadas"
-            )
-            st.plotly_chart(fig_quality, use_container_width=True)
+            st.plotly_chart(figures['quality'], use_container_width=True)
         else:
             st.info("No hay datos de calidad de señal disponibles")
     
+    # Distribución RST
+    if figures['rst']:
+        st.subheader("Distribución de Reportes RST")
+        st.plotly_chart(figures['rst'], use_container_width=True)
+    
     # Estaciones más activas
-    if not stats['most_active'].empty:
+    if figures['most_active']:
         st.subheader("Estaciones Más Activas")
-        
-        active_df = stats['most_active'].head(10)
-        fig_active = px.bar(
-            active_df,
-            x='call_sign',
-            y='reports_count',
-            title="Top 10 Estaciones por Número de Reportes",
-            labels={'call_sign': 'Indicativo', 'reports_count': 'Reportes'}
-        )
-        fig_active.update_layout(showlegend=False)
-        st.plotly_chart(fig_active, use_container_width=True)
+        st.plotly_chart(figures['most_active'], use_container_width=True)
     
     # Actividad por hora
-    if not stats['by_hour'].empty:
+    if figures['hour']:
         st.subheader("Actividad por Hora")
+        st.plotly_chart(figures['hour'], use_container_width=True)
+    
+    # Ritmo de check-ins durante la sesión
+    if figures['checkin_rate']:
+        st.subheader("Ritmo de Check-ins")
+        st.plotly_chart(figures['checkin_rate'], use_container_width=True)
+    
+    # Actividad HF por banda
+    if figures['band']:
+        st.subheader("📻 Actividad HF por Banda")
+        st.plotly_chart(figures['band'], use_container_width=True)
+    
+    # Propagación HF por banda, hora y zona (matriz acumulada por sesión)
+    propagation = init_propagation()
+    propagation.refresh()
+    propagation_bands = propagation.active_bands
+    if propagation_bands:
+        st.subheader("🌐 Propagación HF por Banda, Hora y Zona")
+        col1, col2 = st.columns(2)
+        with col1:
+            propagation_band = st.selectbox("Banda", propagation_bands, key="propagation_band")
+        with col2:
+            propagation_period = st.selectbox(
+                "Periodo",
+                ["Últimos 12 meses", "Sesión seleccionada", "Todo el historial"],
+                key="propagation_period"
+            )
+        
+        if propagation_period == "Sesión seleccionada":
+            propagation_range = (session_date_text, session_date_text)
+        elif propagation_period == "Últimos 12 meses":
+            propagation_range = ((session_date - timedelta(days=365)).strftime('%Y-%m-%d'), session_date_text)
+        else:
+            propagation_range = (None, None)
         
-        fig_hour = px.line(
-            stats['by_hour'],
-            x='hour',
-            y='count',
-            title="Reportes por Hora del Día",
-            labels={'hour': 'Hora', 'count': 'Número de Reportes'}
+        st.plotly_chart(
+            build_propagation_figure(propagation.band_heatmap(propagation_band, *propagation_range), propagation_band),
+            use_container_width=True
         )
-        fig_hour.update_traces(mode='lines+markers')
-        st.plotly_chart(fig_hour, use_container_width=True)
+        
+        best_bands = propagation.best_bands(*propagation_range)
+        if not best_bands.empty:
+            st.caption("Mejor banda por zona y hora (mayor calidad promedio; empates por número de reportes)")
+            best_table = best_bands.pivot(index='zona', columns='hour', values='band')
+            best_table.columns = [f"{hour:02d}:00" for hour in best_table.columns]
+            st.dataframe(best_table, use_container_width=True)
+        else:
+            st.info("No hay reportes HF en el periodo seleccionado")
+    
+    # Distancias desde la estación de control de red
+    distance_records = dashboard['distance_records']
+    if distance_records is not None and not distance_records.empty:
+        st.subheader("📏 Récords de Distancia")
+        st.caption(f"Distancias de círculo máximo desde la estación de control ({NET_CONTROL_GRID})")
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            display_records = distance_records.rename(columns={
+                'call_sign': 'Indicativo',
+                'grid_locator': 'Grid',
+                'session_date': 'Sesión',
+                'distance_km': 'Distancia (km)',
+                'bearing': 'Rumbo (°)'
+            })
+            st.dataframe(display_records, use_container_width=True, hide_index=True)
+        
+        with col2:
+            if figures['distance_by_band']:
+                st.plotly_chart(figures['distance_by_band'], use_container_width=True)
 
 # Página: Gestión de Reportes
 elif page == "📋 Gestión de Reportes":
@@ -2368,8 +2647,18 @@ elif page == "📁 Exportar Datos":
         
         export_format = st.selectbox(
             "Formato de exportación:",
-            ["CSV", "Excel", "PDF"]
+            ["CSV", "Excel", "PDF", "NDJSON", "Paquete completo (ZIP)"],
+            help="El paquete incluye CSV, Excel y PDF generados con una sola consulta. NDJSON (un JSON por línea) es para integraciones"
         )
+        
+        export_compression = None
+        if export_format in ("CSV", "NDJSON"):
+            compression_choice = st.selectbox(
+                "Compresión:",
+                ["Ninguna"] + available_compressions(),
+                help="Reduce el tamaño de la descarga en conexiones lentas"
+            )
+            export_compression = None if compression_choice == "Ninguna" else compression_choice
     
     with col2:
         include_stats = st.checkbox(
@@ -2384,31 +2673,104 @@ elif page == "📁 Exportar Datos":
             help="Exportar datos de todas las fechas"
         )
     
+    # Filtros avanzados: se traducen a una sola consulta SQL con solo las filas y columnas elegidas
+    with st.expander("🔎 Filtros avanzados"):
+        use_date_range = st.checkbox("Usar rango de fechas", value=False)
+        if use_date_range:
+            col_start, col_end = st.columns(2)
+            with col_start:
+                range_start = st.date_input("Desde:", value=session_date, key="export_range_start")
+            with col_end:
+                range_end = st.date_input("Hasta:", value=session_date, key="export_range_end")
+        
+        export_zonas = st.multiselect("Zonas:", get_zonas())
+        export_sistemas = st.multiselect("Sistemas:", get_sistemas())
+        export_calls_text = st.text_input(
+            "Indicativos:",
+            placeholder="XE1ABC, XE2*",
+            help="Separados por coma. Termina con * para buscar por prefijo (ej: XE2*)"
+        )
+        export_columns = []
+        if export_format in ("CSV", "Excel", "NDJSON"):
+            export_columns = st.multiselect(
+                "Columnas:",
+                REPORT_COLUMNS,
+                default=[],
+                help="Vacío = columnas predeterminadas del formato"
+            )
+        
+        sort_options = {
+            'timestamp': "Hora de registro",
+            'session_date': "Fecha de sesión",
+            'call_sign': "Indicativo",
+            'region': "Región",
+            'zona': "Zona",
+            'sistema': "Sistema",
+        }
+        col_sort, col_direction = st.columns(2)
+        with col_sort:
+            export_sort_by = st.selectbox("Ordenar por:", list(sort_options), format_func=sort_options.get)
+        with col_direction:
+            export_descending = st.checkbox("Orden descendente", value=True)
+    
     if st.button("📥 Generar Exportación", use_container_width=True):
         try:
-            # Obtener datos
-            if all_sessions:
-                export_df = db.get_all_reports()
-                stats = db.get_statistics() if include_stats else None
+            # Construir especificación de exportación
+            if use_date_range:
+                start_date, end_date = range_start, range_end
+            elif all_sessions:
+                start_date, end_date = None, None
+            else:
+                start_date, end_date = export_date, export_date
+            
+            if export_format == "PDF":
+                projection = PDF_COLUMNS
+            elif export_format == "Excel":
+                projection = export_columns or EXCEL_COLUMN_ORDER
+            elif export_format in ("CSV", "NDJSON"):
+                projection = export_columns or None
+            else:
+                # El paquete necesita todas las columnas (CSV completo)
+                projection = None
+            
+            export_query = ExportQuery(
+                start_date=start_date,
+                end_date=end_date,
+                zonas=export_zonas,
+                sistemas=export_sistemas,
+                call_signs=ExportQuery.parse_call_signs(export_calls_text),
+                columns=projection,
+                sort_by=export_sort_by,
+                descending=export_descending
+            )
+            
+            # Obtener datos y estadísticas con los mismos filtros
+            stats = db.get_statistics(export_query=export_query) if include_stats else None
+            if export_format in ("CSV", "NDJSON"):
+                # CSV y NDJSON se leen y comprimen por bloques; el resultado queda en un archivo temporal
+                stream_format = export_format.lower()
+                data, filename, total_rows = exporter.export_stream(
+                    db.iter_reports_for_export(export_query), stream_format, export_compression
+                )
             else:
-                export_df = db.get_all_reports(export_date)
-                stats = db.get_statistics(export_date) if include_stats else None
+                export_df = db.get_reports_for_export(export_query)
+                total_rows = len(export_df)
             
-            if export_df.empty:
+            if total_rows == 0:
                 st.warning("No hay datos para exportar en el período seleccionado.")
             else:
                 # Generar exportación según formato
-                if export_format == "CSV":
-                    data, filename = exporter.export_to_csv(export_df)
-                    st.download_button(
-                        label="📄 Descargar CSV",
-                        data=data,
-                        file_name=filename,
-                        mime="text/csv"
-                    )
+                if export_format in ("CSV", "NDJSON"):
+                    with data:
+                        st.download_button(
+                            label=f"📄 Descargar {export_format}",
+                            data=data.read(),
+                            file_name=filename,
+                            mime=exporter.stream_mime_type(stream_format, export_compression)
+                        )
                 
                 elif export_format == "Excel":
-                    data, filename = exporter.export_to_excel(export_df)
+                    data, filename = exporter.export_to_excel(export_df, columns=projection)
                     st.download_button(
                         label="📊 Descargar Excel",
                         data=data,
@@ -2430,8 +2792,17 @@ elif page == "📁 Exportar Datos":
                         import traceback
                         st.code(traceback.format_exc())
                 
+                elif export_format == "Paquete completo (ZIP)":
+                    data, filename = exporter.export_bundle(export_df, stats, session_date=export_date, current_user=current_user)
+                    st.download_button(
+                        label="📦 Descargar paquete ZIP",
+                        data=data,
+                        file_name=filename,
+                        mime="application/zip"
+                    )
+                
                 # Mostrar resumen
-                st.success(f"✅ Exportación generada: {len(export_df)} reportes")
+                st.success(f"✅ Exportación generada: {total_rows} reportes")
                 
                 if include_stats and stats:
                     summary = exporter.create_session_summary(stats, export_date)
@@ -3097,9 +3468,11 @@ def show_user_management():
     
     # Inicializar servicio de email
     if 'email_service' not in st.session_state:
-        st.session_state.email_service = EmailService()
+        st.session_state.email_service = bootstrap().email_service
     
     email_service = st.session_state.email_service
+    # Tomar la configuración SMTP guardada por otro administrador u otro proceso
+    email_service.reload_settings()
     
     # Tabs para organizar funcionalidades
     tab1, tab2, tab3, tab4 = st.tabs(["📋 Lista de Usuarios", "➕ Crear Usuario", "🔄 Recuperar Contraseña", "⚙️ Configuración Email"])
@@ -3195,9 +3568,7 @@ def show_user_management():
                                             
                                             # Cambiar contraseña si se solicitó
                                             if change_password:
-                                                import hashlib
-                                                password_hash = hashlib.sha256(new_password.encode()).hexdigest()
-                                                db.change_password(user['username'], password_hash)
+                                                db.change_password(user['username'], auth.hash_password(new_password))
                                             
                                             st.success("✅ Usuario actualizado exitosamente")
                                             
@@ -3316,8 +3687,11 @@ def show_user_management():
             st.success("✅ Servicio de email configurado")
             st.info(f"Servidor: {email_service.smtp_server}:{email_service.smtp_port}")
             st.info(f"Usuario: {email_service.smtp_username}")
+            if email_service.updated_by:
+                st.caption(f"Última modificación por {email_service.updated_by}")
         else:
             st.warning("⚠️ Servicio de email no configurado")
+        st.caption("La configuración es del sistema: aplica a todas las sesiones y a la bandeja de salida.")
         
         with st.form("email_config_form"):
             st.write("**Configuración SMTP:**")
@@ -3334,14 +3708,15 @@ def show_user_management():
             if submit_config:
                 if smtp_server and smtp_username and smtp_password:
                     email_service.configure_smtp(
-                        smtp_server=smtp_server,
-                        smtp_port=smtp_port,
-                        smtp_username=smtp_username,
-                        smtp_password=smtp_password,
+                        server=smtp_server,
+                        port=smtp_port,
+                        username=smtp_username,
+                        password=smtp_password,
                         from_email=from_email or smtp_username,
-                        from_name=from_name
+                        from_name=from_name,
+                        updated_by=current_user['username']
                     )
-                    st.success("✅ Configuración de email guardada")
+                    st.success("✅ Configuración de email guardada para todo el sistema")
                     st.rerun()
                 else:
                     st.error("❌ Por favor completa los campos obligatorios")
@@ -3349,10 +3724,8 @@ def show_user_management():
 # Footer
 st.markdown("---")
 # Footer con logo usando base64
-import base64
-try:
-    with open("assets/LogoFMRE_small.png", "rb") as f:
-        logo_data = base64.b64encode(f.read()).decode()
+logo_data = get_asset_registry().logo_base64("LogoFMRE_small.png")
+if logo_data:
     st.markdown(
         f"""
         <div style='text-align: center; color: #666;'>
@@ -3368,7 +3741,7 @@ try:
         """,
         unsafe_allow_html=True
     )
-except:
+else:
     st.markdown(
         """
         <div style='text-align: center; color: #666;'>
@@ -0,0 +1,248 @@
+import base64
+import io
+import os
+import threading
+
+from reportlab.lib import colors
+from reportlab.lib.colors import HexColor
+from reportlab.lib.pagesizes import letter, landscape
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.lib.utils import ImageReader
+from reportlab.platypus import Flowable
+
+ASSETS_DIR = "assets"
+
+# Colores institucionales FMRE
+FMRE_COLORS = {
+    'fmre_green': HexColor('#2E7D32'),
+    'fmre_blue': HexColor('#1565C0'),
+    'fmre_gray': HexColor('#424242'),
+    'light_gray': HexColor('#F5F5F5'),
+    'white': colors.white,
+    'black': colors.black
+}
+
+
+class CachedImage(Flowable):
+    """Flowable que dibuja un ImageReader ya decodificado
+
+    Image() vuelve a abrir y decodificar el archivo en cada instancia; aquí solo
+    se crea el flowable (barato) y el mapa de bits se comparte entre documentos.
+    """
+
+    def __init__(self, reader, width, height, hAlign='CENTER'):
+        Flowable.__init__(self)
+        self.reader = reader
+        self.drawWidth = width
+        self.drawHeight = height
+        self.hAlign = hAlign
+
+    def wrap(self, availWidth, availHeight):
+        return self.drawWidth, self.drawHeight
+
+    def draw(self):
+        self.canv.drawImage(self.reader, 0, 0, self.drawWidth, self.drawHeight, mask='auto')
+
+
+class AssetRegistry:
+    """Registro de recursos compartido por todo el proceso (logos, estilos y plantillas PDF)"""
+
+    def __init__(self, assets_dir=ASSETS_DIR):
+        self.assets_dir = assets_dir
+        self.colors = FMRE_COLORS
+        self._lock = threading.Lock()
+        self._raw = {}
+        self._base64 = {}
+        self._readers = {}
+        self._styles = None
+        self._page_layouts = None
+
+    def _path(self, name):
+        return os.path.join(self.assets_dir, name)
+
+    def logo_bytes(self, name):
+        """Obtiene los bytes del archivo (None si no existe), leídos una sola vez"""
+        if name not in self._raw:
+            with self._lock:
+                if name not in self._raw:
+                    path = self._path(name)
+                    data = None
+                    if os.path.exists(path):
+                        with open(path, "rb") as f:
+                            data = f.read()
+                    self._raw[name] = data
+        return self._raw[name]
+
+    def logo_base64(self, name):
+        """Obtiene el logo codificado en base64 para incrustarlo en HTML"""
+        if name not in self._base64:
+            data = self.logo_bytes(name)
+            encoded = base64.b64encode(data).decode() if data is not None else None
+            with self._lock:
+                self._base64.setdefault(name, encoded)
+        return self._base64[name]
+
+    def logo_flowable(self, name, max_width=None, max_height=None):
+        """Crea un flowable del logo reutilizando la imagen decodificada y redimensionada
+
+        Sin límites se conserva el tamaño original (1 px = 1 pt), igual que Image(path).
+        Retorna None si el archivo no existe.
+        """
+        key = (name, max_width, max_height)
+        if key not in self._readers:
+            data = self.logo_bytes(name)
+            entry = None
+            if data is not None:
+                reader = ImageReader(io.BytesIO(data))
+                width, height = reader.getSize()
+                factor = 1.0
+                if max_width:
+                    factor = min(factor, float(max_width) / width)
+                if max_height:
+                    factor = min(factor, float(max_height) / height)
+                entry = (reader, width * factor, height * factor)
+            with self._lock:
+                self._readers.setdefault(key, entry)
+        entry = self._readers[key]
+        if entry is None:
+            return None
+        reader, width, height = entry
+        return CachedImage(reader, width, height)
+
+    @property
+    def styles(self):
+        """Hoja de estilos FMRE construida una sola vez (solo lectura)"""
+        if self._styles is None:
+            with self._lock:
+                if self._styles is None:
+                    self._styles = self._build_styles()
+        return self._styles
+
+    def _build_styles(self):
+        """Configura estilos personalizados para el reporte"""
+        styles = getSampleStyleSheet()
+
+        # Título principal
+        styles.add(ParagraphStyle(
+            name='FMRETitle',
+            parent=styles['Heading1'],
+            fontSize=18,
+            fontName='Helvetica-Bold',
+            textColor=self.colors['fmre_green'],
+            spaceAfter=20,
+            alignment=1  # Center
+        ))
+
+        # Subtítulos
+        styles.add(ParagraphStyle(
+            name='FMRESubtitle',
+            parent=styles['Heading2'],
+            fontSize=14,
+            fontName='Helvetica-Bold',
+            textColor=self.colors['fmre_blue'],
+            spaceAfter=12,
+            spaceBefore=8
+        ))
+
+        # Texto de estadísticas
+        styles.add(ParagraphStyle(
+            name='StatText',
+            parent=styles['Normal'],
+            fontSize=11,
+            fontName='Helvetica',
+            textColor=self.colors['fmre_gray'],
+            spaceAfter=6
+        ))
+
+        # Encabezado institucional
+        styles.add(ParagraphStyle(
+            name='InstitutionalHeader',
+            parent=styles['Normal'],
+            fontSize=14,
+            fontName='Helvetica-Bold',
+            textColor=self.colors['fmre_green'],
+            alignment=0,
+            spaceAfter=3
+        ))
+
+        # Estilos del encabezado profesional (antes se creaban en cada encabezado)
+        styles.add(ParagraphStyle(
+            name='OrgStyle',
+            parent=styles['Normal'],
+            fontSize=14,
+            fontName='Helvetica-Bold',
+            alignment=0,  # Left
+            spaceAfter=3
+        ))
+
+        styles.add(ParagraphStyle(
+            name='ReportStyle',
+            parent=styles['Normal'],
+            fontSize=12,
+            fontName='Helvetica',
+            alignment=0,  # Left
+            spaceAfter=2
+        ))
+
+        styles.add(ParagraphStyle(
+            name='DateStyle',
+            parent=styles['Normal'],
+            fontSize=10,
+            fontName='Helvetica',
+            alignment=0,  # Left
+            spaceAfter=1
+        ))
+
+        return styles
+
+    @property
+    def page_layouts(self):
+        """Geometría precalculada de las plantillas vertical y horizontal
+
+        Los Frame guardan estado mientras se construye un documento, por lo que
+        cada documento crea los suyos a partir de esta geometría en lugar de
+        compartir instancias entre hilos de Streamlit.
+        """
+        if self._page_layouts is None:
+            with self._lock:
+                if self._page_layouts is None:
+                    landscape_size = landscape(letter)
+                    self._page_layouts = {
+                        # Página vertical (primera página) - margen superior muy reducido
+                        'portrait': {
+                            'pagesize': None,  # Tamaño por defecto del documento
+                            'frame': (0.75*inch, 0.75*inch, letter[0] - 1.5*inch, letter[1] - 1.0*inch),
+                            'frame_kwargs': {'topPadding': 0.1*inch},
+                        },
+                        # Página horizontal (tabla de reportes)
+                        'landscape': {
+                            'pagesize': landscape_size,
+                            'frame': (0.75*inch, 0.75*inch, landscape_size[0] - 1.5*inch, landscape_size[1] - 1.5*inch),
+                            'frame_kwargs': {},
+                        },
+                    }
+        return self._page_layouts
+
+    def warm_up(self):
+        """Precarga logos, estilos y plantillas"""
+        for name in ("LogoFMRE_medium.png", "LogoFMRE_small.png"):
+            self.logo_base64(name)
+        self.logo_flowable("LogoFMRE_medium.png")
+        self.styles
+        self.page_layouts
+        return self
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_asset_registry():
+    """Obtiene el registro de recursos del proceso"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = AssetRegistry()
+    return _registry
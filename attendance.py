@@ -0,0 +1,176 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+def trailing_true_counts(matrix):
+    """Cuenta los True consecutivos al final de cada columna (racha actual)"""
+    if matrix.shape[0] == 0:
+        return np.zeros(matrix.shape[1], dtype=np.int64)
+    return np.cumprod(matrix[::-1], axis=0, dtype=np.int8).sum(axis=0, dtype=np.int64)
+
+
+def longest_true_runs(matrix):
+    """Longitud de la corrida más larga de True en cada columna (racha máxima)
+
+    Se rellenan los bordes con False y se diferencia a lo largo de las sesiones:
+    +1 marca el inicio de una corrida y -1 su final. np.nonzero sobre la matriz
+    transpuesta regresa los inicios y finales ordenados por columna, por lo que
+    se emparejan directamente.
+    """
+    n_sessions, n_calls = matrix.shape
+    longest = np.zeros(n_calls, dtype=np.int64)
+    if n_sessions == 0 or n_calls == 0:
+        return longest
+    padded = np.zeros((n_calls, n_sessions + 2), dtype=np.int8)
+    padded[:, 1:-1] = matrix.T
+    edges = np.diff(padded, axis=1)
+    start_calls, start_rows = np.nonzero(edges == 1)
+    _, end_rows = np.nonzero(edges == -1)
+    np.maximum.at(longest, start_calls, end_rows - start_rows)
+    return longest
+
+
+class AttendanceAnalytics:
+    """Matriz de participación sesión × indicativo con rachas y retención por cohorte
+
+    La matriz se guarda en forma dispersa (índices de indicativo por sesión) y se
+    densifica como arreglo booleano solo al calcular. refresh() compara las
+    revisiones de report_revisions con las ya cargadas y vuelve a leer
+    únicamente las sesiones nuevas o modificadas.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._lock = threading.Lock()
+        self._revisions = {}
+        self._session_calls = {}
+        self._call_index = {}
+        self._call_signs = []
+        self._loaded = False
+        self._dense = None
+
+    def refresh(self):
+        """Incorpora sesiones nuevas o modificadas; retorna True si hubo cambios"""
+        with self._lock:
+            revisions = self.db.get_session_revisions()
+            if not self._loaded:
+                changed = None  # Primera carga: todas las sesiones
+            else:
+                changed = [session for session, revision in revisions.items()
+                           if self._revisions.get(session) != revision]
+                if not changed:
+                    return False
+
+            pairs = self.db.get_participation_pairs(changed)
+            if changed is not None:
+                for session in changed:
+                    self._session_calls.pop(session, None)
+
+            for session, calls in pairs.groupby('session_date', sort=False)['call_sign']:
+                indices = []
+                for call_sign in calls:
+                    index = self._call_index.get(call_sign)
+                    if index is None:
+                        index = self._call_index[call_sign] = len(self._call_signs)
+                        self._call_signs.append(call_sign)
+                    indices.append(index)
+                self._session_calls[session] = np.array(indices, dtype=np.int64)
+
+            self._revisions = revisions
+            self._loaded = True
+            self._dense = None
+            return True
+
+    def _snapshot(self):
+        """Obtiene (sesiones, indicativos, matriz booleana) consistentes entre sí"""
+        with self._lock:
+            if self._dense is None:
+                sessions = np.array(sorted(self._session_calls), dtype=object)
+                call_signs = np.array(self._call_signs, dtype=object)
+                matrix = np.zeros((len(sessions), len(call_signs)), dtype=bool)
+                if len(sessions):
+                    lengths = [len(self._session_calls[session]) for session in sessions]
+                    rows = np.repeat(np.arange(len(sessions)), lengths)
+                    cols = np.concatenate([self._session_calls[session] for session in sessions])
+                    matrix[rows, cols] = True
+                self._dense = (sessions, call_signs, matrix)
+            return self._dense
+
+    @property
+    def sessions(self):
+        return self._snapshot()[0]
+
+    @property
+    def call_signs(self):
+        return self._snapshot()[1]
+
+    @property
+    def matrix(self):
+        return self._snapshot()[2]
+
+    def station_summary(self):
+        """Resumen por indicativo: asistencias, primera y última sesión, rachas y constancia
+
+        current_streak cuenta las sesiones consecutivas hasta la más reciente del
+        sistema; attendance_rate es el porcentaje de sesiones asistidas desde la
+        primera aparición.
+        """
+        sessions, call_signs, matrix = self._snapshot()
+        columns = ['call_sign', 'sessions_attended', 'first_seen', 'last_seen',
+                   'current_streak', 'longest_streak', 'attendance_rate']
+        attended = matrix.sum(axis=0)
+        present = attended > 0
+        if not present.any():
+            return pd.DataFrame(columns=columns)
+
+        first_index = matrix.argmax(axis=0)
+        last_index = len(sessions) - 1 - matrix[::-1].argmax(axis=0)
+        possible = len(sessions) - first_index
+        summary = pd.DataFrame({
+            'call_sign': call_signs,
+            'sessions_attended': attended,
+            'first_seen': sessions[first_index],
+            'last_seen': sessions[last_index],
+            'current_streak': trailing_true_counts(matrix),
+            'longest_streak': longest_true_runs(matrix),
+            'attendance_rate': np.round(attended / np.maximum(possible, 1) * 100, 1),
+        })[present]
+        return summary.sort_values(['longest_streak', 'sessions_attended', 'call_sign'],
+                                   ascending=[False, False, True]).reset_index(drop=True)
+
+    def cohort_retention(self):
+        """Retención por cohorte anual
+
+        La cohorte de una estación es el año de su primera sesión. Cada celda es el
+        porcentaje de la cohorte que asistió al menos a una sesión en ese año.
+        Retorna un DataFrame indexado por cohorte con la columna 'estaciones' y una
+        columna por año.
+        """
+        sessions, _, matrix = self._snapshot()
+        if not len(sessions) or not matrix.any():
+            return pd.DataFrame()
+
+        session_years = np.array([session[:4] for session in sessions])
+        years, year_starts = np.unique(session_years, return_index=True)
+        # Las sesiones están ordenadas, así que cada año es un bloque contiguo de filas
+        by_year = np.add.reduceat(matrix, year_starts, axis=0, dtype=np.int64) > 0
+        present = by_year.any(axis=0)
+        by_year = by_year[:, present]
+        cohorts = by_year.argmax(axis=0)
+
+        cohort_sizes = np.bincount(cohorts, minlength=len(years))
+        # retained[c, y] = estaciones de la cohorte c activas en el año y
+        retained = np.zeros((len(years), len(years)), dtype=np.int64)
+        for year_index in range(len(years)):
+            retained[:, year_index] = np.bincount(cohorts[by_year[year_index]], minlength=len(years))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rates = np.round(retained / cohort_sizes[:, None] * 100, 1)
+        rates[np.arange(len(years))[:, None] > np.arange(len(years))[None, :]] = np.nan
+
+        retention = pd.DataFrame(rates, index=years, columns=years)
+        retention.insert(0, 'estaciones', cohort_sizes)
+        retention.index.name = 'cohorte'
+        return retention[retention['estaciones'] > 0]
@@ -1,18 +1,38 @@
-import hashlib
 import streamlit as st
 from database import FMREDatabase
+from asset_registry import get_asset_registry
+from passwords import hash_password_async, verify_password_async, needs_rehash
 
 class AuthManager:
     def __init__(self, db: FMREDatabase):
         self.db = db
         
     def hash_password(self, password):
-        """Genera hash de la contraseña"""
-        return hashlib.sha256(password.encode()).hexdigest()
+        """Genera hash bcrypt con sal de la contraseña
+
+        Se calcula en el pool de hashing, pero el hilo que llama espera el
+        resultado: el pool solo acota cuántos hashes corren a la vez en el
+        proceso, no libera al script de Streamlit durante el costo de bcrypt.
+        """
+        return hash_password_async(password).result()
     
     def verify_password(self, password, password_hash):
-        """Verifica si una contraseña coincide con su hash"""
-        return self.hash_password(password) == password_hash
+        """Verifica si una contraseña coincide con su hash (bcrypt o SHA-256 heredado)
+
+        Igual que hash_password, espera al pool de hashing: acota la concurrencia,
+        no evita la espera del script.
+        """
+        return verify_password_async(password, password_hash).result()
+    
+    def _schedule_rehash(self, username, password, old_hash):
+        """Reemplaza en segundo plano un hash heredado o de costo bajo por uno bcrypt actual"""
+        def store(future):
+            try:
+                self.db.update_password_hash(username, old_hash, future.result())
+            except Exception as e:
+                print(f"Error al actualizar hash de contraseña de {username}: {e}")
+        
+        hash_password_async(password).add_done_callback(store)
     
     def create_default_admin(self):
         """Crea usuario administrador por defecto si no existe"""
@@ -24,8 +44,14 @@ class AuthManager:
     
     def authenticate_user(self, username, password):
         """Autentica un usuario"""
-        user = self.db.get_user(username)
-        if user and user['password_hash'] == self.hash_password(password):
+        # El hash se lee de la tabla en cada intento; el perfil puede venir del caché
+        password_hash = self.db.get_password_hash(username)
+        if password_hash and self.verify_password(password, password_hash):
+            if needs_rehash(password_hash):
+                self._schedule_rehash(username, password, password_hash)
+            user = self.db.get_user(username)
+            if user is None:
+                return None
             self.db.update_last_login(username)
             return {
                 'id': user['id'],
@@ -36,6 +62,55 @@ class AuthManager:
             }
         return None
     
+    def generate_password_reset_token(self, username):
+        """Genera un token de recuperación de un solo uso; None si el usuario no existe"""
+        if not self.db.get_user(username):
+            return None
+        return self.db.create_reset_token(username)
+    
+    def reset_password_with_token(self, token, new_password):
+        """Cambia la contraseña con un token de recuperación vigente; lo consume al usarlo"""
+        if not self.db.validate_reset_token(token):
+            return False
+        password_hash = self.hash_password(new_password)
+        username = self.db.consume_reset_token(token)
+        if not username:
+            return False
+        return self.db.change_password(username, password_hash)
+    
+    def show_reset_password_form(self, token):
+        """Formulario para el enlace de recuperación (?reset_token=...) enviado por email"""
+        st.markdown('<h3 style="text-align: center;">🔐 Restablecer Contraseña</h3>', unsafe_allow_html=True)
+        
+        col1, col2, col3 = st.columns([1, 2, 1])
+        
+        with col2:
+            username = self.db.validate_reset_token(token)
+            if not username:
+                st.error("❌ El enlace de recuperación es inválido, ya fue usado o expiró")
+            else:
+                with st.form("reset_password_link_form"):
+                    st.write(f"Usuario: **{username}**")
+                    new_password = st.text_input("Nueva contraseña", type="password")
+                    confirm_password = st.text_input("Confirmar nueva contraseña", type="password")
+                    submitted = st.form_submit_button("🔑 Cambiar Contraseña", use_container_width=True)
+                    
+                    if submitted:
+                        from utils import validate_password
+                        is_valid, message = validate_password(new_password)
+                        if new_password != confirm_password:
+                            st.error("❌ Las contraseñas no coinciden")
+                        elif not is_valid:
+                            st.error(f"❌ {message}")
+                        elif self.reset_password_with_token(token, new_password):
+                            st.success("✅ Contraseña cambiada exitosamente. Ya puedes iniciar sesión.")
+                        else:
+                            st.error("❌ El enlace de recuperación es inválido, ya fue usado o expiró")
+            
+            if st.button("🚪 Ir a Iniciar Sesión", use_container_width=True):
+                del st.query_params["reset_token"]
+                st.rerun()
+    
     def create_user(self, username, password, role='operator', full_name=None, email=None):
         """Crea un nuevo usuario"""
         password_hash = self.hash_password(password)
@@ -69,17 +144,15 @@ class AuthManager:
             <div style="text-align: center;">
         """, unsafe_allow_html=True)
         
-        # Logo centrado con CSS directo
-        import base64
-        try:
-            with open("assets/LogoFMRE_medium.png", "rb") as f:
-                logo_data = base64.b64encode(f.read()).decode()
+        # Logo centrado con CSS directo (base64 precalculado por el registro de recursos)
+        logo_data = get_asset_registry().logo_base64("LogoFMRE_medium.png")
+        if logo_data:
             st.markdown(f"""
             <img src="data:image/png;base64,{logo_data}" 
                  style="display: block; margin: 0 auto 15px auto; max-width: 100%; height: auto;" 
                  alt="FMRE Logo">
             """, unsafe_allow_html=True)
-        except:
+        else:
             st.markdown('<div style="font-size: 60px; text-align: center;">📻</div>', unsafe_allow_html=True)
         
         # Título y subtítulo
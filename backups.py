@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Respaldos consistentes de la base de datos con la API de respaldo de SQLite
+Uso: python backups.py [--db ruta] [--dir carpeta] <create|list|prune|verify|schedule>
+"""
+
+import argparse
+import gzip
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+BACKUP_DIR = os.getenv('BACKUP_DIR', 'backups')
+
+# Páginas copiadas por paso y pausa entre pasos: entre un paso y otro la base no
+# queda bloqueada, así que los registros de reportes no esperan al respaldo
+BACKUP_PAGES_PER_STEP = int(os.getenv('BACKUP_PAGES_PER_STEP', '256'))
+BACKUP_STEP_PAUSE = float(os.getenv('BACKUP_STEP_PAUSE', '0.005'))
+
+# Si otra conexión escribe durante la copia, SQLite la reinicia; tras estos reinicios
+# se copia en un solo paso (una lectura breve) para no reiniciar indefinidamente
+BACKUP_MAX_RESTARTS = int(os.getenv('BACKUP_MAX_RESTARTS', '3'))
+
+# Retención: último respaldo de cada uno de los N días, semanas y meses más recientes
+BACKUP_KEEP_DAILY = int(os.getenv('BACKUP_KEEP_DAILY', '7'))
+BACKUP_KEEP_WEEKLY = int(os.getenv('BACKUP_KEEP_WEEKLY', '4'))
+BACKUP_KEEP_MONTHLY = int(os.getenv('BACKUP_KEEP_MONTHLY', '12'))
+
+# Horas entre respaldos automáticos (0 = desactivado)
+BACKUP_INTERVAL_HOURS = float(os.getenv('BACKUP_INTERVAL_HOURS', '0'))
+
+BACKUP_PREFIX = 'backup_sigq_'
+TIMESTAMP_FORMAT = '%Y%m%d_%H%M%S'
+
+# Compresión -> extensión
+COMPRESSIONS = {
+    None: '',
+    'gzip': '.gz',
+    'zstd': '.zst',
+}
+
+_CHUNK_SIZE = 1024 * 1024
+
+
+def available_compressions():
+    """Compresiones disponibles en este servidor (zstd requiere el paquete zstandard)"""
+    return [name for name in COMPRESSIONS if name and (name != 'zstd' or zstandard is not None)]
+
+
+def _compressed_output(path, compression):
+    if compression is None:
+        return open(path, 'wb')
+    if compression == 'gzip':
+        return gzip.open(path, 'wb', compresslevel=6)
+    if compression == 'zstd':
+        if zstandard is None:
+            raise ValueError("La compresión zstd requiere el paquete 'zstandard'")
+        return zstandard.ZstdCompressor(level=3).stream_writer(open(path, 'wb'))
+    raise ValueError(f"Compresión no soportada: {compression}")
+
+
+def _decompressed_input(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    if path.endswith('.zst'):
+        if zstandard is None:
+            raise ValueError("La compresión zstd requiere el paquete 'zstandard'")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    return open(path, 'rb')
+
+
+def quick_check(db_path):
+    """Ejecuta PRAGMA quick_check; retorna 'ok' o los problemas encontrados"""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute("PRAGMA quick_check").fetchall()
+    finally:
+        conn.close()
+    return '\n'.join(row[0] for row in rows)
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def _discard_credentials(conn):
+    """Quita de la copia los correos pendientes con contraseñas o enlaces de recuperación"""
+    from database import discard_outbox_credentials
+
+    try:
+        # secure_delete sobrescribe las páginas liberadas para que el texto no quede en el archivo
+        conn.execute("PRAGMA secure_delete = ON")
+        discard_outbox_credentials(conn)
+        conn.commit()
+    except sqlite3.OperationalError as e:
+        if 'no such table' not in str(e):
+            raise
+
+
+def _copy_database(db_path, raw_path, pages, step_pause, max_restarts):
+    """Copia la base con Connection.backup en pasos de `pages` páginas; retorna los reinicios"""
+    restarts = 0
+    last_remaining = None
+
+    def progress(status, remaining, total):
+        nonlocal restarts, last_remaining
+        if last_remaining is not None and remaining > last_remaining:
+            restarts += 1
+            if restarts > max_restarts:
+                raise _TooManyRestarts()
+        last_remaining = remaining
+        if step_pause:
+            time.sleep(step_pause)
+
+    source = sqlite3.connect(db_path, timeout=30)
+    target = sqlite3.connect(raw_path)
+    try:
+        try:
+            source.backup(target, pages=pages, progress=progress)
+        except _TooManyRestarts:
+            # Escrituras más frecuentes que la copia completa: copiar de una vez
+            source.backup(target, pages=-1)
+        # La copia hereda el modo WAL; se deja como un solo archivo autocontenido
+        target.execute("PRAGMA journal_mode = DELETE")
+        _discard_credentials(target)
+    finally:
+        target.close()
+        source.close()
+    return restarts
+
+
+def backup_timestamp(path):
+    """Fecha de un respaldo según su nombre (None si no es un respaldo del SIGQ)"""
+    name = os.path.basename(path)
+    if not name.startswith(BACKUP_PREFIX):
+        return None
+    try:
+        return datetime.strptime(name[len(BACKUP_PREFIX):len(BACKUP_PREFIX) + 15], TIMESTAMP_FORMAT)
+    except ValueError:
+        return None
+
+
+def create_backup(db_path, backup_dir=BACKUP_DIR, compression='gzip', pages=BACKUP_PAGES_PER_STEP,
+                  step_pause=BACKUP_STEP_PAUSE, max_restarts=BACKUP_MAX_RESTARTS):
+    """Crea un respaldo consistente, verificado y comprimido; retorna sus datos
+
+    Connection.backup copia `pages` páginas por paso con la base en uso; si
+    otra conexión escribe durante la copia, SQLite reinicia los pasos, así que
+    el resultado siempre corresponde a un solo instante (tras max_restarts
+    reinicios se copia en un solo paso). La copia se verifica con PRAGMA
+    quick_check antes de comprimirla en bloques y se publica con un rename, de
+    modo que nunca queda un respaldo a medias con el nombre final. La copia no
+    incluye el cuerpo de los correos con credenciales que no se han enviado.
+    """
+    os.makedirs(backup_dir, exist_ok=True)
+    start = time.perf_counter()
+    filename = f"{BACKUP_PREFIX}{datetime.now().strftime(TIMESTAMP_FORMAT)}.db{COMPRESSIONS[compression]}"
+    path = os.path.join(backup_dir, filename)
+
+    fd, raw_path = tempfile.mkstemp(suffix='.db', dir=backup_dir)
+    os.close(fd)
+    partial_path = path + '.partial'
+    try:
+        restarts = _copy_database(db_path, raw_path, pages, step_pause, max_restarts)
+
+        check = quick_check(raw_path)
+        if check != 'ok':
+            raise RuntimeError(f"El respaldo no pasó PRAGMA quick_check: {check}")
+
+        with open(raw_path, 'rb') as raw, _compressed_output(partial_path, compression) as output:
+            shutil.copyfileobj(raw, output, _CHUNK_SIZE)
+        os.replace(partial_path, path)
+        return {
+            'path': path,
+            'filename': filename,
+            'size': os.path.getsize(path),
+            'database_size': os.path.getsize(raw_path),
+            'seconds': time.perf_counter() - start,
+            'quick_check': check,
+            'restarts': restarts,
+        }
+    finally:
+        for leftover in (raw_path, partial_path):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+
+def verify_backup(path):
+    """Descomprime un respaldo a un archivo temporal y ejecuta PRAGMA quick_check"""
+    fd, raw_path = tempfile.mkstemp(suffix='.db')
+    try:
+        with os.fdopen(fd, 'wb') as raw, _decompressed_input(path) as source:
+            shutil.copyfileobj(source, raw, _CHUNK_SIZE)
+        return quick_check(raw_path)
+    finally:
+        os.remove(raw_path)
+
+
+def list_backups(backup_dir=BACKUP_DIR):
+    """Respaldos de la carpeta, del más reciente al más antiguo: dicts con path, filename, created y size"""
+    if not os.path.isdir(backup_dir):
+        return []
+    backups = []
+    for filename in os.listdir(backup_dir):
+        created = backup_timestamp(filename)
+        if created is None or filename.endswith('.partial'):
+            continue
+        path = os.path.join(backup_dir, filename)
+        backups.append({'path': path, 'filename': filename, 'created': created, 'size': os.path.getsize(path)})
+    return sorted(backups, key=lambda backup: backup['created'], reverse=True)
+
+
+def select_retained(backups, daily=BACKUP_KEEP_DAILY, weekly=BACKUP_KEEP_WEEKLY, monthly=BACKUP_KEEP_MONTHLY):
+    """Rutas a conservar: el respaldo más reciente de cada uno de los últimos días, semanas y meses
+
+    backups debe venir ordenado del más reciente al más antiguo (list_backups).
+    El más reciente siempre se conserva.
+    """
+    keep = set()
+    if backups:
+        keep.add(backups[0]['path'])
+    buckets = (
+        (daily, lambda created: created.date()),
+        (weekly, lambda created: tuple(created.isocalendar())[:2]),
+        (monthly, lambda created: (created.year, created.month)),
+    )
+    for limit, bucket in buckets:
+        seen = []
+        for backup in backups:
+            key = bucket(backup['created'])
+            if key in seen:
+                continue
+            if len(seen) >= limit:
+                break
+            seen.append(key)
+            keep.add(backup['path'])
+    return keep
+
+
+def apply_retention(backup_dir=BACKUP_DIR, daily=BACKUP_KEEP_DAILY, weekly=BACKUP_KEEP_WEEKLY,
+                    monthly=BACKUP_KEEP_MONTHLY, dry_run=False):
+    """Elimina los respaldos fuera de la política de retención; retorna sus rutas"""
+    backups = list_backups(backup_dir)
+    keep = select_retained(backups, daily, weekly, monthly)
+    removed = [backup['path'] for backup in backups if backup['path'] not in keep]
+    if not dry_run:
+        for path in removed:
+            os.remove(path)
+    return removed
+
+
+class BackupScheduler:
+    """Hilo que crea un respaldo cada `interval_hours` y aplica la retención
+
+    Antes de respaldar revisa la fecha del respaldo más reciente de la carpeta,
+    así que varios procesos con el programador activo no duplican respaldos.
+    """
+
+    def __init__(self, db_path, interval_hours=BACKUP_INTERVAL_HOURS, backup_dir=BACKUP_DIR, compression='gzip'):
+        self.db_path = db_path
+        self.interval = timedelta(hours=interval_hours)
+        self.backup_dir = backup_dir
+        self.compression = compression
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self):
+        """Respalda si el último respaldo ya venció; retorna los datos del respaldo o None"""
+        backups = list_backups(self.backup_dir)
+        if backups and datetime.now() - backups[0]['created'] < self.interval:
+            return None
+        result = create_backup(self.db_path, self.backup_dir, self.compression)
+        apply_retention(self.backup_dir)
+        return result
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                result = self.run_once()
+                if result:
+                    print(f"💾 Respaldo creado: {result['path']} ({result['size'] / 1024:.0f} KB)")
+            except Exception as e:
+                print(f"❌ Error en el respaldo programado: {e}")
+            self._stop.wait(min(self.interval.total_seconds(), 3600))
+
+    def start(self):
+        """Inicia el hilo de respaldos (una sola vez)"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='backup-scheduler', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Respaldos de la base de datos del SIGQ")
+    parser.add_argument('--db', default="fmre_reports.db", help="Ruta de la base de datos")
+    parser.add_argument('--dir', default=BACKUP_DIR, help="Carpeta de respaldos")
+    subparsers = parser.add_subparsers(dest='command')
+
+    create = subparsers.add_parser('create', help="Crea un respaldo y aplica la retención")
+    create.add_argument('--compression', default='gzip', choices=available_compressions() + ['none'])
+    create.add_argument('--no-prune', action='store_true', help="No aplicar la retención")
+    subparsers.add_parser('list', help="Lista los respaldos")
+    prune = subparsers.add_parser('prune', help="Aplica la retención")
+    prune.add_argument('--dry-run', action='store_true')
+    verify = subparsers.add_parser('verify', help="Verifica un respaldo con PRAGMA quick_check")
+    verify.add_argument('path')
+    schedule = subparsers.add_parser('schedule', help="Respalda periódicamente (para cron o un servicio)")
+    schedule.add_argument('--hours', type=float, default=BACKUP_INTERVAL_HOURS or 24)
+
+    args = parser.parse_args()
+    if args.command == 'create':
+        if not os.path.exists(args.db):
+            print(f"❌ Error: Base de datos no encontrada en {args.db}")
+            return 1
+        result = create_backup(args.db, args.dir, None if args.compression == 'none' else args.compression)
+        print(f"✅ {result['path']}: {result['database_size'] / 1024:.0f} KB → {result['size'] / 1024:.0f} KB "
+              f"en {result['seconds']:.2f}s (quick_check {result['quick_check']})")
+        if not args.no_prune:
+            for path in apply_retention(args.dir):
+                print(f"🗑️ {path}")
+    elif args.command == 'list':
+        for backup in list_backups(args.dir):
+            print(f"• {backup['filename']}  {backup['size'] / 1024:8.0f} KB")
+    elif args.command == 'prune':
+        for path in apply_retention(args.dir, dry_run=args.dry_run):
+            print(f"🗑️ {path}")
+    elif args.command == 'verify':
+        check = verify_backup(args.path)
+        print(f"{'✅' if check == 'ok' else '❌'} quick_check: {check}")
+        return 0 if check == 'ok' else 1
+    elif args.command == 'schedule':
+        scheduler = BackupScheduler(args.db, args.hours, args.dir).start()
+        print(f"💾 Respaldando {args.db} cada {args.hours:g} h en {args.dir} (Ctrl+C para salir)")
+        try:
+            while True:
+                time.sleep(60)
+        except KeyboardInterrupt:
+            scheduler.stop(timeout=60)
+    else:
+        parser.print_help()
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Benchmarks de rendimiento del SIGQ
+Uso: python benchmark.py <benchmark> [opciones]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from tests.smtp_standin import SMTPStandIn
+
+
+def synthetic_reports(rows, seed=0):
+    """Genera un DataFrame de reportes sintéticos con el esquema de la tabla reports"""
+    rng = np.random.default_rng(seed)
+    zonas = np.array(['XE1', 'XE2', 'XE3', 'Extranjera'])
+    sistemas = np.array(['IRLP', 'ASL', 'DMR', 'Fusion', 'D-Star', 'HF', 'Otro'])
+    regiones = np.array(['JAL', 'DUR', 'NLE', 'CMX', 'YUC', 'EX'])
+    sistema = sistemas[rng.integers(0, len(sistemas), rows)]
+    is_hf = sistema == 'HF'
+    start = pd.Timestamp('2025-01-05 20:00:00')
+    timestamps = start + pd.to_timedelta(rng.integers(0, 3600 * 24 * 365, rows), unit='s')
+    return pd.DataFrame({
+        'id': np.arange(1, rows + 1),
+        'call_sign': np.char.add('XE1', rng.integers(100, 999, rows).astype(str)),
+        'operator_name': 'Operador De Prueba',
+        'qth': 'JALISCO',
+        'ciudad': np.where(rng.random(rows) < 0.1, None, 'Guadalajara'),
+        'signal_report': '59',
+        'zona': zonas[rng.integers(0, len(zonas), rows)],
+        'sistema': sistema,
+        'grid_locator': np.where(rng.random(rows) < 0.5, None, 'DL74QB'),
+        'hf_frequency': np.where(is_hf, '14.230', None),
+        'hf_band': None,
+        'hf_mode': np.where(is_hf, 'USB', None),
+        'hf_power': np.where(is_hf, '100', None),
+        'observations': np.where(rng.random(rows) < 0.8, '', 'Buena señal'),
+        'session_date': timestamps.strftime('%Y-%m-%d'),
+        'timestamp': timestamps.strftime('%Y-%m-%d %H:%M:%S'),
+        'region': regiones[rng.integers(0, len(regiones), rows)],
+        'signal_quality': 3,
+    })
+
+
+def _legacy_report_rows(df):
+    """Preparación fila por fila con iterrows (implementación anterior de _add_reports_table)"""
+    export_data = []
+    for idx, (_, row) in enumerate(df.iterrows(), 1):
+        export_data.append([
+            str(idx),
+            row['call_sign'],
+            row['operator_name'],
+            row.get('region', 'N/A'),
+            row.get('ciudad', 'N/A'),
+            row['zona'],
+            row['sistema'],
+            row.get('hf_frequency', '-') or '-',
+            row.get('hf_mode', '-') or '-',
+            row.get('hf_power', '-') or '-',
+            row['signal_report'],
+            row.get('grid_locator', 'N/A') or 'N/A',
+            row['observations'] or '-',
+            pd.to_datetime(row['timestamp']).strftime('%d/%m/%Y %H:%M')
+        ])
+    return export_data
+
+
+def _timed(func, *args, repeat=1):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_export_rows(args):
+    """Compara la preparación de filas iterrows contra la capa vectorizada"""
+    from export_prep import build_report_matrix
+
+    print("📊 Preparación de filas para exportación (tabla PDF)")
+    print("-" * 60)
+    for rows in args.rows:
+        df = synthetic_reports(rows)
+        vectorized = _timed(lambda d: build_report_matrix(d).values.tolist(), df, repeat=3)
+        legacy = _timed(_legacy_report_rows, df) if rows <= args.legacy_limit else None
+        if legacy is None:
+            print(f"{rows:>8} filas | vectorizado {vectorized:8.3f}s | iterrows (omitido)")
+        else:
+            print(f"{rows:>8} filas | vectorizado {vectorized:8.3f}s | iterrows {legacy:8.3f}s | {legacy / vectorized:6.1f}x")
+
+
+def _synthetic_attendance_db(path, years, stations, per_session, seed=0):
+    """Crea una base con una sesión semanal durante varios años y reportes aleatorios"""
+    import sqlite3
+    from database import FMREDatabase
+
+    rng = np.random.default_rng(seed)
+    db = FMREDatabase(path)
+    sessions = pd.date_range('2016-01-03', periods=years * 52, freq='7D').strftime('%Y-%m-%d')
+    call_signs = np.char.add('XE1', np.arange(stations).astype(str))
+    rows = []
+    for session in sessions:
+        for call_sign in rng.choice(call_signs, per_session, replace=False):
+            rows.append((call_sign, 'Operador', 'JALISCO', 'Guadalajara', '59', 'XE1', 'ASL', session))
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO reports (call_sign, operator_name, qth, ciudad, signal_report, zona, sistema, session_date) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+    return db, sessions
+
+
+def bench_attendance(args):
+    """Mide la construcción de la matriz de participación, rachas y retención"""
+    import os
+    import sqlite3
+    import tempfile
+    from attendance import AttendanceAnalytics
+
+    print(f"📊 Rachas y retención ({args.years} años de sesiones semanales, {args.stations} estaciones)")
+    print("-" * 60)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'asistencia.db')
+        db, sessions = _synthetic_attendance_db(path, args.years, args.stations, args.per_session)
+        analytics = AttendanceAnalytics(db)
+        print(f"Carga inicial de la matriz   {_timed(analytics.refresh):8.3f}s")
+        print(f"Resumen por estación         {_timed(analytics.station_summary, repeat=3):8.3f}s")
+        print(f"Retención por cohorte        {_timed(analytics.cohort_retention, repeat=3):8.3f}s")
+
+        conn = sqlite3.connect(path)
+        conn.execute(
+            "INSERT INTO reports (call_sign, operator_name, qth, ciudad, signal_report, zona, sistema, session_date) "
+            "VALUES ('XE1NEW', 'Operador', 'JALISCO', 'Guadalajara', '59', 'XE1', 'ASL', ?)",
+            ((pd.Timestamp(sessions[-1]) + pd.Timedelta(days=7)).strftime('%Y-%m-%d'),))
+        conn.commit()
+        conn.close()
+        print(f"Actualización incremental    {_timed(analytics.refresh):8.3f}s")
+        print(f"Sesiones x estaciones        {analytics.matrix.shape[0]} x {analytics.matrix.shape[1]}")
+
+
+def bench_propagation(args):
+    """Mide la matriz de propagación HF banda × hora × zona y su actualización incremental"""
+    import os
+    import sqlite3
+    import tempfile
+    from database import FMREDatabase
+    from hf_bands import HF_BANDS
+    from propagation import PropagationAnalytics
+
+    print(f"📊 Propagación HF ({args.years} años de sesiones semanales, {args.per_session} reportes HF por sesión)")
+    print("-" * 60)
+    rng = np.random.default_rng(0)
+    bands = np.array([name for name, _, _ in HF_BANDS])
+    zonas = np.array(['XE1', 'XE2', 'XE3', 'Extranjera'])
+    sessions = pd.date_range('2016-01-03', periods=args.years * 52, freq='7D')
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'propagacion.db')
+        db = FMREDatabase(path)
+        rows = []
+        for session in sessions:
+            minutes = rng.integers(0, 24 * 60, args.per_session)
+            timestamps = (session + pd.to_timedelta(minutes, unit='m')).strftime('%Y-%m-%d %H:%M:%S')
+            for timestamp, band, zona, quality in zip(timestamps,
+                                                      bands[rng.integers(0, len(bands), args.per_session)],
+                                                      zonas[rng.integers(0, len(zonas), args.per_session)],
+                                                      rng.integers(1, 4, args.per_session)):
+                rows.append(('XE1HF', 'Operador', 'JALISCO', 'Guadalajara', '59', zona, 'HF',
+                             band, session.strftime('%Y-%m-%d'), timestamp, int(quality)))
+        conn = sqlite3.connect(path)
+        conn.executemany(
+            "INSERT INTO reports (call_sign, operator_name, qth, ciudad, signal_report, zona, sistema, "
+            "hf_band, session_date, timestamp, signal_quality) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        conn.commit()
+        conn.close()
+
+        analytics = PropagationAnalytics(db)
+        print(f"Carga inicial de la matriz   {_timed(analytics.refresh):8.3f}s")
+        print(f"Mejor banda (historial)      {_timed(analytics.best_bands, repeat=3):8.3f}s")
+        print(f"Mejor banda (últimos 12 m)   {_timed(lambda: analytics.best_bands('2025-01-01'), repeat=3):8.3f}s")
+        print(f"Sin cambios                  {_timed(analytics.refresh):8.3f}s")
+
+        conn = sqlite3.connect(path)
+        conn.execute(
+            "INSERT INTO reports (call_sign, operator_name, qth, ciudad, signal_report, zona, sistema, hf_band, "
+            "session_date, signal_quality) VALUES ('XE1NEW', 'Operador', 'JALISCO', 'Guadalajara', '59', 'XE1', "
+            "'HF', '40m', ?, 3)", (sessions[-1].strftime('%Y-%m-%d'),))
+        conn.commit()
+        conn.close()
+        print(f"Actualización incremental    {_timed(analytics.refresh):8.3f}s")
+        print(f"Reportes HF en la matriz     {int(analytics.matrix()[1].sum())}")
+
+
+def _login_round(auth, usernames, password):
+    """Inicia sesión con todos los usuarios a la vez; retorna las latencias en segundos"""
+    import threading
+
+    latencies = [None] * len(usernames)
+    barrier = threading.Barrier(len(usernames))
+
+    def login(index, username):
+        barrier.wait()
+        start = time.perf_counter()
+        assert auth.authenticate_user(username, password) is not None
+        latencies[index] = time.perf_counter() - start
+
+    threads = [threading.Thread(target=login, args=(index, username)) for index, username in enumerate(usernames)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return np.array(latencies)
+
+
+def bench_login(args):
+    """Latencia de inicio de sesión con muchos operadores entrando al mismo tiempo"""
+    import hashlib
+    import os
+    import sqlite3
+    import tempfile
+
+    os.environ['BCRYPT_ROUNDS'] = str(args.rounds)
+    os.environ['PASSWORD_HASH_WORKERS'] = str(args.workers)
+    import passwords
+    from auth import AuthManager
+    from database import FMREDatabase
+
+    print(f"📊 Inicio de sesión simultáneo ({args.operators} operadores, bcrypt costo {passwords.BCRYPT_ROUNDS}, "
+          f"{passwords.HASH_WORKERS} hilos de hashing)")
+    print("-" * 60)
+    password = 'contraseña-de-prueba'
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'usuarios.db')
+        db = FMREDatabase(path)
+        usernames = [f'operador{index}' for index in range(args.operators)]
+        legacy_hash = hashlib.sha256(password.encode()).hexdigest()
+        conn = sqlite3.connect(path)
+        conn.executemany("INSERT INTO users (username, password_hash, full_name) VALUES (?, ?, 'Operador')",
+                         [(username, legacy_hash) for username in usernames])
+        conn.commit()
+        conn.close()
+        auth = AuthManager(db)
+
+        def report(label, latencies):
+            print(f"{label:<28} p50 {np.percentile(latencies, 50) * 1000:8.1f} ms | "
+                  f"p95 {np.percentile(latencies, 95) * 1000:8.1f} ms | máx {latencies.max() * 1000:8.1f} ms")
+
+        report("SHA-256 heredado + rehash", _login_round(auth, usernames, password))
+        # Esperar a que terminen los rehash en segundo plano
+        while any(passwords.is_legacy_hash(db.get_password_hash(username)) for username in usernames):
+            time.sleep(0.05)
+        report("bcrypt", _login_round(auth, usernames, password))
+        print(f"Hash bcrypt individual       {_timed(passwords.hash_password, password) * 1000:8.1f} ms")
+
+
+def _standin_email_service(port, rate_limit):
+    """EmailService apuntando al servidor local (sin STARTTLS)"""
+    os.environ['SMTP_STARTTLS'] = '0'
+    os.environ['SMTP_RATE_LIMIT'] = str(rate_limit)
+    from email_service import EmailService
+
+    service = EmailService()
+    service.configure_smtp('127.0.0.1', port, 'benchmark', 'benchmark', 'sigq@example.com')
+    return service
+
+
+def bench_smtp(args):
+    """Compara un handshake SMTP por mensaje contra send_bulk sobre conexiones reutilizadas"""
+    import smtplib
+
+    print(f"📊 Envío de {args.messages} correos (handshake simulado {args.handshake_ms} ms, "
+          f"límite {args.rate:g} mensajes/s)")
+    print("-" * 60)
+    with SMTPStandIn(handshake_delay=args.handshake_ms / 1000) as stand_in:
+        service = _standin_email_service(stand_in.port, args.rate)
+        messages = [{'to_email': f'operador{index}@example.com', 'subject': 'Resumen de sesión',
+                     'body_html': f'<p>Hola operador {index}</p>', 'body_text': f'Hola operador {index}'}
+                    for index in range(args.messages)]
+
+        # Implementación anterior: conexión y login por cada mensaje (se mide un subconjunto)
+        legacy_messages = messages[:args.legacy_limit]
+        start = time.perf_counter()
+        for message in legacy_messages:
+            with smtplib.SMTP('127.0.0.1', stand_in.port) as server:
+                server.login('benchmark', 'benchmark')
+                server.sendmail(service.from_email, message['to_email'],
+                                service._build_message(message['to_email'], message['subject'],
+                                                       message['body_html'], message['body_text']))
+        legacy = (time.perf_counter() - start) * len(messages) / max(len(legacy_messages), 1)
+
+        connections_before = stand_in.connections
+        start = time.perf_counter()
+        results = service.send_bulk(messages)
+        pooled = time.perf_counter() - start
+        print(f"Conexión por mensaje (est.)  {legacy:8.2f}s")
+        print(f"send_bulk (pool)             {pooled:8.2f}s | {stand_in.connections - connections_before} conexiones "
+              f"| {sum(ok for ok, _ in results)} enviados")
+
+
+def bench_summaries(args):
+    """Mide el resumen por participante: consulta única, plantillas y envío masivo"""
+    import tempfile
+    from mail_merge import SessionSummaryMailer
+
+    print(f"📊 Resumen por participante para {args.participants} correos "
+          f"({args.years} años de sesiones semanales, límite {args.rate:g} mensajes/s)")
+    print("-" * 60)
+    with tempfile.TemporaryDirectory() as tmp, SMTPStandIn(handshake_delay=args.handshake_ms / 1000) as stand_in:
+        db, _ = _synthetic_attendance_db(os.path.join(tmp, 'resumen.db'), args.years,
+                                         args.participants, args.participants * 3 // 4)
+        db.upsert_participant_contacts({'call_sign': f'XE1{index}', 'email': f'xe1{index}@example.com'}
+                                       for index in range(args.participants))
+        mailer = SessionSummaryMailer(db, _standin_email_service(stand_in.port, args.rate))
+
+        total = time.perf_counter()
+        print(f"Estadísticas (una consulta)  {_timed(db.get_participant_summaries):8.3f}s")
+        start = time.perf_counter()
+        messages = mailer.build_messages()
+        print(f"Generación de mensajes       {time.perf_counter() - start:8.3f}s | {len(messages)} mensajes")
+        start = time.perf_counter()
+        sent = sum(ok for ok, _ in mailer.email_service.send_bulk(messages))
+        print(f"send_bulk                    {time.perf_counter() - start:8.3f}s | {sent} enviados")
+        print(f"Total                        {time.perf_counter() - total:8.3f}s")
+
+
+BENCHMARKS = {
+    'export-rows': bench_export_rows,
+    'attendance': bench_attendance,
+    'propagation': bench_propagation,
+    'login': bench_login,
+    'smtp': bench_smtp,
+    'summaries': bench_summaries,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de rendimiento del SIGQ")
+    subparsers = parser.add_subparsers(dest='benchmark')
+
+    export_rows = subparsers.add_parser('export-rows', help="Preparación de filas para CSV/Excel/PDF")
+    export_rows.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000])
+    export_rows.add_argument('--legacy-limit', type=int, default=100_000,
+                             help="Máximo de filas para ejecutar la versión iterrows")
+
+    attendance = subparsers.add_parser('attendance', help="Matriz de participación, rachas y retención")
+    attendance.add_argument('--years', type=int, default=10)
+    attendance.add_argument('--stations', type=int, default=2000)
+    attendance.add_argument('--per-session', type=int, default=150)
+
+    propagation = subparsers.add_parser('propagation', help="Matriz de propagación HF banda × hora × zona")
+    propagation.add_argument('--years', type=int, default=10)
+    propagation.add_argument('--per-session', type=int, default=100)
+
+    login = subparsers.add_parser('login', help="Latencia de inicio de sesión simultáneo con bcrypt")
+    login.add_argument('--operators', type=int, default=40)
+    login.add_argument('--rounds', type=int, default=12)
+    login.add_argument('--workers', type=int, default=4)
+
+    smtp = subparsers.add_parser('smtp', help="Envío masivo de correo con conexiones SMTP reutilizadas")
+    smtp.add_argument('--messages', type=int, default=300)
+    smtp.add_argument('--handshake-ms', type=int, default=150)
+    smtp.add_argument('--rate', type=float, default=50, help="Mensajes por segundo (0 = sin límite)")
+    smtp.add_argument('--legacy-limit', type=int, default=30,
+                      help="Mensajes enviados con una conexión por mensaje (el total se extrapola)")
+
+    summaries = subparsers.add_parser('summaries', help="Resumen por participante con plantillas y envío masivo")
+    summaries.add_argument('--participants', type=int, default=500)
+    summaries.add_argument('--years', type=int, default=5)
+    summaries.add_argument('--handshake-ms', type=int, default=150)
+    summaries.add_argument('--rate', type=float, default=50, help="Mensajes por segundo (0 = sin límite)")
+
+    args = parser.parse_args()
+    if args.benchmark not in BENCHMARKS:
+        parser.print_help()
+        return 1
+    BENCHMARKS[args.benchmark](args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+import threading
+import time
+
+from asset_registry import get_asset_registry
+from attendance import AttendanceAnalytics
+from auth import AuthManager
+from backups import BACKUP_INTERVAL_HOURS, BackupScheduler
+from database import FMREDatabase
+from email_outbox import EmailOutboxWorker
+from email_service import EmailService
+from exports import FMREExporter
+from geo import NET_CONTROL_GRID, decode_locator
+from mail_merge import SessionSummaryMailer
+from propagation import PropagationAnalytics
+
+
+class AppContext:
+    """Objetos compartidos por todas las sesiones de navegador de un proceso
+
+    Se construye una sola vez en bootstrap(): esquema de la base de datos,
+    administrador por defecto, recursos y cachés quedan listos antes de atender
+    la primera sesión.
+    """
+
+    def __init__(self, db_path):
+        start = time.perf_counter()
+        self.db = FMREDatabase(db_path)
+        self.auth = AuthManager(self.db)
+        self.auth.create_default_admin()
+        self.assets = get_asset_registry().warm_up()
+        self.exporter = FMREExporter()
+        # Configuración SMTP del sistema, guardada en la base de datos: la leen las sesiones
+        # y el hilo que entrega la bandeja de salida (reload_settings antes de cada lote)
+        self.email_service = EmailService(self.db)
+        self.outbox = EmailOutboxWorker(self.db, self.email_service).start()
+        self.summary_mailer = SessionSummaryMailer(self.db, self.email_service, self.outbox)
+        self.attendance = AttendanceAnalytics(self.db)
+        self.propagation = PropagationAnalytics(self.db)
+        # Respaldos automáticos solo si se configuró BACKUP_INTERVAL_HOURS
+        self.backups = BackupScheduler(db_path).start() if BACKUP_INTERVAL_HOURS > 0 else None
+        self._warm_up()
+        self.boot_seconds = time.perf_counter() - start
+
+    def _warm_up(self):
+        """Precarga cachés que de otro modo llenaría la primera sesión"""
+        self.db.get_user('admin')
+        self.db.purge_expired_reset_tokens()
+        decode_locator(NET_CONTROL_GRID)
+        self.attendance.refresh()
+        self.propagation.refresh()
+
+
+_contexts = {}
+_contexts_lock = threading.Lock()
+
+
+def bootstrap(db_path="fmre_reports.db"):
+    """Obtiene el contexto del proceso, creándolo la primera vez
+
+    Las llamadas siguientes son una búsqueda en diccionario sin consultas a la
+    base de datos.
+    """
+    context = _contexts.get(db_path)
+    if context is None:
+        with _contexts_lock:
+            context = _contexts.get(db_path)
+            if context is None:
+                context = _contexts[db_path] = AppContext(db_path)
+    return context
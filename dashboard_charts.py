@@ -0,0 +1,213 @@
+import plotly.express as px
+
+from utils import get_signal_quality_text
+
+
+def _figure_spec(fig):
+    """Serializa una figura de Plotly a un diccionario (apto para st.cache_data)"""
+    return fig.to_plotly_json()
+
+
+def build_zona_figure(by_zona):
+    """Participantes por zona"""
+    fig = px.bar(
+        by_zona,
+        x='zona',
+        y='count',
+        title="Distribución por Zonas",
+        labels={'zona': 'Zona', 'count': 'Participantes'},
+        color='count',
+        color_continuous_scale='Blues'
+    )
+    fig.update_layout(showlegend=False)
+    return fig
+
+
+def build_sistema_figure(by_sistema):
+    """Participantes por sistema"""
+    return px.pie(
+        by_sistema,
+        values='count',
+        names='sistema',
+        title="Distribución por Sistemas"
+    )
+
+
+def build_region_figure(by_region):
+    """Participantes por región"""
+    fig = px.bar(
+        by_region,
+        x='region',
+        y='count',
+        title="Distribución por Estados",
+        labels={'region': 'Estado', 'count': 'Participantes'}
+    )
+    fig.update_layout(showlegend=False)
+    return fig
+
+
+def build_quality_figure(signal_quality):
+    """Distribución de calidad de señal"""
+    quality_df = signal_quality.copy()
+    quality_df['quality_text'] = quality_df['signal_quality'].map(get_signal_quality_text)
+    return px.pie(
+        quality_df,
+        values='count',
+        names='quality_text',
+        title="Calidad de Señales Reportadas"
+    )
+
+
+def build_rst_figure(rst_distribution):
+    """Distribución de reportes RST por intensidad y legibilidad"""
+    rst_df = rst_distribution.copy()
+    rst_df['readability'] = 'R' + rst_df['readability'].astype(str)
+    rst_df['strength'] = 'S' + rst_df['strength'].astype(str)
+    return px.bar(
+        rst_df.sort_values('strength'),
+        x='strength',
+        y='count',
+        color='readability',
+        title="Reportes RST por Intensidad",
+        labels={'strength': 'Intensidad', 'count': 'Reportes', 'readability': 'Legibilidad'}
+    )
+
+
+def build_most_active_figure(most_active):
+    """Top 10 estaciones por número de reportes"""
+    fig = px.bar(
+        most_active.head(10),
+        x='call_sign',
+        y='reports_count',
+        title="Top 10 Estaciones por Número de Reportes",
+        labels={'call_sign': 'Indicativo', 'reports_count': 'Reportes'}
+    )
+    fig.update_layout(showlegend=False)
+    return fig
+
+
+def build_hour_figure(by_hour):
+    """Reportes por hora del día"""
+    fig = px.line(
+        by_hour,
+        x='hour',
+        y='count',
+        title="Reportes por Hora del Día",
+        labels={'hour': 'Hora', 'count': 'Número de Reportes'}
+    )
+    fig.update_traces(mode='lines+markers')
+    return fig
+
+
+def build_checkin_rate_figure(checkin_rate):
+    """Check-ins por minuto de la sesión con promedio móvil"""
+    fig = px.bar(
+        checkin_rate,
+        x='clock',
+        y='checkins',
+        title="Check-ins por Minuto",
+        labels={'clock': 'Hora', 'checkins': 'Check-ins'}
+    )
+    fig.add_scatter(
+        x=checkin_rate['clock'],
+        y=checkin_rate['rolling_avg'],
+        mode='lines',
+        name='Promedio móvil'
+    )
+    fig.update_layout(legend=dict(orientation='h', yanchor='bottom', y=1.02, xanchor='right', x=1))
+    return fig
+
+
+def build_distance_by_band_figure(distance_by_band):
+    """Distancia promedio desde la estación de control por banda o sistema"""
+    fig = px.bar(
+        distance_by_band,
+        x='band',
+        y='avg_distance_km',
+        title="Distancia Promedio por Banda",
+        labels={'band': 'Banda / Sistema', 'avg_distance_km': 'Distancia promedio (km)'},
+        hover_data=['reports', 'max_distance_km']
+    )
+    fig.update_layout(showlegend=False)
+    return fig
+
+
+def build_band_figure(by_band):
+    """Reportes HF por banda con potencia promedio"""
+    fig = px.bar(
+        by_band,
+        x='hf_band',
+        y='count',
+        title="Reportes HF por Banda",
+        labels={'hf_band': 'Banda', 'count': 'Reportes', 'avg_power_w': 'Potencia promedio (W)'},
+        hover_data=['participants', 'avg_power_w'],
+        color='avg_power_w',
+        color_continuous_scale='Oranges'
+    )
+    fig.update_layout(showlegend=False)
+    return fig
+
+
+def build_propagation_figure(band_heatmap, band):
+    """Mapa de calor de calidad promedio zona × hora para una banda HF"""
+    fig = px.imshow(
+        band_heatmap,
+        x=[f"{hour:02d}:00" for hour in band_heatmap.columns],
+        y=list(band_heatmap.index),
+        zmin=1,
+        zmax=3,
+        color_continuous_scale='RdYlGn',
+        aspect='auto',
+        title=f"Propagación en {band}: Calidad Promedio por Zona y Hora",
+        labels={'x': 'Hora', 'y': 'Zona', 'color': 'Calidad'}
+    )
+    return fig
+
+
+# Figuras del Dashboard: nombre -> (llave en estadísticas, constructor)
+DASHBOARD_FIGURES = {
+    'zona': ('by_zona', build_zona_figure),
+    'sistema': ('by_sistema', build_sistema_figure),
+    'region': ('by_region', build_region_figure),
+    'quality': ('signal_quality', build_quality_figure),
+    'rst': ('rst_distribution', build_rst_figure),
+    'most_active': ('most_active', build_most_active_figure),
+    'hour': ('by_hour', build_hour_figure),
+    'checkin_rate': ('checkin_rate', build_checkin_rate_figure),
+    'band': ('by_band', build_band_figure),
+    'distance_by_band': ('distance_by_band', build_distance_by_band_figure),
+}
+
+
+def dashboard_metrics(stats):
+    """Calcula las métricas principales del Dashboard"""
+    total_participants = stats['total_participants']
+    total_reports = stats['total_reports']
+    good_percentage = None
+    quality_df = stats['signal_quality']
+    if not quality_df.empty:
+        good_signals = quality_df[quality_df['signal_quality'] == 3]['count'].sum()
+        total_signals = quality_df['count'].sum()
+        good_percentage = float(good_signals / max(total_signals, 1) * 100)
+    return {
+        'total_participants': total_participants,
+        'total_reports': total_reports,
+        'avg_per_participant': total_reports / max(total_participants, 1),
+        'good_percentage': good_percentage,
+    }
+
+
+def build_dashboard(stats):
+    """Construye métricas y especificaciones serializadas de todas las figuras del Dashboard
+
+    Las figuras sin datos se representan con None.
+    """
+    figures = {}
+    for name, (key, builder) in DASHBOARD_FIGURES.items():
+        data = stats.get(key)
+        figures[name] = _figure_spec(builder(data)) if data is not None and not data.empty else None
+    return {
+        'metrics': dashboard_metrics(stats),
+        'figures': figures,
+        'distance_records': stats.get('distance_records'),
+    }
@@ -1,19 +1,109 @@
 import sqlite3
+import numpy as np
 import pandas as pd
 from datetime import datetime
 import os
+import atexit
+import logging
+import weakref
+import secrets
+import threading
+import time
 import pytz
 
+from ranking import RankingPeriod, RANKING_DIMENSIONS
+from rst import parse_rst, parse_rst_series, signal_quality as signal_quality_from_report
+from hf_bands import hf_fields, parse_frequencies, parse_powers, bands_for_frequencies
+from passwords import hash_password_async, token_digest
+from geo import decode_locator, decode_locators, distance_bearing, distance_statistics
+
+logger = logging.getLogger(__name__)
+
+# Vigencia del caché de perfiles de usuario (segundos); protege contra cambios hechos
+# por otros procesos, como reset_password.py
+USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', '300'))
+
+# Vigencia de los tokens de recuperación de contraseña y cada cuánto se purgan los vencidos (segundos)
+RESET_TOKEN_TTL = int(os.getenv('RESET_TOKEN_TTL', '3600'))
+RESET_TOKEN_PURGE_INTERVAL = int(os.getenv('RESET_TOKEN_PURGE_INTERVAL', '600'))
+
+# Correos de la bandeja de salida que llevan credenciales (contraseña temporal o enlace
+# de recuperación) y cuánto pueden esperar sin enviarse antes de descartar su cuerpo (segundos)
+OUTBOX_CREDENTIAL_KINDS = ('welcome', 'password_reset')
+OUTBOX_CREDENTIAL_TTL = int(os.getenv('OUTBOX_CREDENTIAL_TTL', '86400'))
+
+# Modo de diario de SQLite; con WAL las lecturas largas (consola SQL, respaldos,
+# exportaciones) no impiden que se confirmen nuevos reportes
+SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+
+# Intervalo (segundos) con el que se escriben en bloque los last_login pendientes
+LAST_LOGIN_FLUSH_INTERVAL = int(os.getenv('LAST_LOGIN_FLUSH_INTERVAL', '30'))
+
+# Instancias con last_login en búfer: se guardan al salir del proceso. WeakSet para
+# no retener las instancias temporales (p. ej. las de validate_all_fields)
+_instances_with_pending_logins = weakref.WeakSet()
+
+
+def _flush_all_pending_logins():
+    for db in list(_instances_with_pending_logins):
+        db.flush_last_logins()
+
+
+atexit.register(_flush_all_pending_logins)
+
+
+def discard_outbox_credentials(conn, created_before=float('inf')):
+    """Borra el cuerpo de los correos con credenciales que ya no se van a entregar
+
+    Aplica a los que están en 'dead' y a los no enviados creados antes de
+    created_before, que pasan a 'dead'. No confirma la transacción; retorna cuántos.
+    """
+    kinds = ', '.join('?' for _ in OUTBOX_CREDENTIAL_KINDS)
+    cursor = conn.execute(f'''
+        UPDATE email_outbox
+        SET body_html = NULL, body_text = NULL, status = 'dead',
+            last_error = COALESCE(last_error || ' | ', '') || 'Cuerpo con credenciales descartado sin enviar'
+        WHERE kind IN ({kinds}) AND (body_html IS NOT NULL OR body_text IS NOT NULL)
+          AND (status = 'dead' OR (status != 'sent' AND created_at <= ?))
+    ''', (*OUTBOX_CREDENTIAL_KINDS, created_before))
+    return cursor.rowcount
+
+
 class FMREDatabase:
+    # Bases de datos cuyo esquema ya se verificó en este proceso
+    _initialized_paths = set()
+    _schema_lock = threading.Lock()
+    
     def __init__(self, db_path="fmre_reports.db"):
         self.db_path = db_path
-        self.init_database()
+        self._user_cache = {}
+        self._user_cache_lock = threading.Lock()
+        self._user_cache_generation = 0
+        self._pending_logins = {}
+        self._login_flush_timer = None
+        self._last_token_purge = 0.0
+        self.ensure_schema()
+    
+    def ensure_schema(self, force=False):
+        """Ejecuta init_database una sola vez por proceso y archivo de base de datos
+
+        Las instancias siguientes sobre el mismo archivo no vuelven a revisar
+        tablas, migraciones ni índices; force=True obliga a hacerlo.
+        """
+        key = os.path.abspath(self.db_path)
+        with FMREDatabase._schema_lock:
+            if force or key not in FMREDatabase._initialized_paths or not os.path.exists(self.db_path):
+                self.init_database()
+                FMREDatabase._initialized_paths.add(key)
     
     def init_database(self):
         """Inicializa la base de datos con las tablas necesarias"""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
+        # El modo de diario es persistente: basta fijarlo al abrir la base
+        cursor.execute(f"PRAGMA journal_mode = {SQLITE_JOURNAL_MODE}")
+        
         # Tabla de reportes - esquema limpio y consistente con campos HF
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS reports (
@@ -34,7 +124,17 @@ class FMREDatabase:
                 session_date TEXT NOT NULL,
                 timestamp DATETIME DEFAULT (datetime('now', 'localtime')),
                 region TEXT,
-                signal_quality INTEGER
+                signal_quality INTEGER,
+                readability INTEGER,
+                strength INTEGER,
+                tone INTEGER,
+                frequency_mhz REAL,
+                power_w REAL,
+                lat REAL,
+                lon REAL,
+                ts_epoch INTEGER GENERATED ALWAYS AS (CAST(strftime('%s', timestamp) AS INTEGER)) VIRTUAL,
+                hour INTEGER GENERATED ALWAYS AS (CAST(strftime('%H', timestamp) AS INTEGER)) VIRTUAL,
+                minute_of_day INTEGER GENERATED ALWAYS AS ((CAST(strftime('%s', timestamp) AS INTEGER) - CAST(strftime('%s', session_date) AS INTEGER)) / 60) VIRTUAL
             )
         ''')
         
@@ -83,6 +183,8 @@ class FMREDatabase:
                 hf_power TEXT,
                 last_used DATETIME DEFAULT CURRENT_TIMESTAMP,
                 use_count INTEGER DEFAULT 1,
+                lat REAL,
+                lon REAL,
                 UNIQUE(call_sign, operator_name)
             )
         ''')
@@ -90,9 +192,246 @@ class FMREDatabase:
         # Ejecutar migraciones después de crear las tablas
         self._migrate_database(cursor)
         
+        # Índices para filtros de exportación (fecha, zona/sistema e indicativo)
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_reports_session_date ON reports(session_date)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_reports_zona_sistema_date ON reports(zona, sistema, session_date)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_reports_call_sign ON reports(call_sign)')
+        
+        # Índices para consultas por banda y rango de potencia
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_reports_band_date ON reports(hf_band, session_date)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_reports_power ON reports(power_w)')
+        
+        # Índice para agrupar la distribución de señales RST por sesión
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_reports_session_rst ON reports(session_date, readability, strength)')
+        
+        # Índices de actividad por hora y por minuto del día de la sesión (columnas generadas)
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_reports_session_hour ON reports(session_date, hour)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_reports_session_minute ON reports(session_date, minute_of_day)')
+        
+        # Revisión de datos por sesión: los triggers la incrementan con cada cambio en
+        # reports, de modo que las vistas en caché saben cuándo recalcular
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS report_revisions (
+                session_date TEXT PRIMARY KEY,
+                revision INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        bump_revision = '''
+                INSERT INTO report_revisions (session_date, revision) VALUES ({0}.session_date, 1)
+                ON CONFLICT(session_date) DO UPDATE SET revision = revision + 1;
+        '''
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_reports_revision_insert AFTER INSERT ON reports
+            BEGIN {bump_revision.format('NEW')} END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_reports_revision_update AFTER UPDATE ON reports
+            BEGIN {bump_revision.format('OLD')} {bump_revision.format('NEW')} END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_reports_revision_delete AFTER DELETE ON reports
+            BEGIN {bump_revision.format('OLD')} END
+        ''')
+        
+        # Índices espaciales R*Tree sobre las coordenadas de reports y station_history
+        for table in ('reports', 'station_history'):
+            self._create_spatial_index(cursor, table)
+        
+        # Bandeja de salida de correo: la UI solo inserta y un hilo de fondo entrega
+        # (pending -> sending -> sent, o dead tras agotar reintentos)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS email_outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                to_email TEXT NOT NULL,
+                subject TEXT NOT NULL,
+                body_html TEXT,
+                body_text TEXT,
+                kind TEXT,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                created_at REAL NOT NULL,
+                next_attempt_at REAL NOT NULL,
+                sent_at REAL,
+                latency_seconds REAL
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_email_outbox_due ON email_outbox(status, next_attempt_at)')
+        
+        # Tokens de recuperación de contraseña: solo la huella SHA-256, con vencimiento
+        # indexado para purgar y used_at para garantizar un solo uso
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS password_reset_tokens (
+                token_hash TEXT PRIMARY KEY,
+                username TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                used_at REAL
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_password_reset_tokens_expires ON password_reset_tokens(expires_at)')
+        
+        # Correos de los participantes para el resumen por sesión (uno por indicativo)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS participant_contacts (
+                call_sign TEXT PRIMARY KEY,
+                email TEXT NOT NULL,
+                name TEXT,
+                subscribed INTEGER NOT NULL DEFAULT 1,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Configuración SMTP del sistema (una sola fila): la comparten todas las sesiones
+        # y procesos, incluida la bandeja de salida; sin fila se usan las variables de entorno
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS smtp_settings (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                server TEXT NOT NULL,
+                port INTEGER NOT NULL,
+                username TEXT NOT NULL,
+                password TEXT NOT NULL,
+                from_email TEXT,
+                from_name TEXT,
+                updated_by TEXT,
+                updated_at REAL NOT NULL
+            )
+        ''')
+        
+        # Calcular coordenadas pendientes (reportes previos a las columnas lat/lon)
+        self.sync_locations(cursor)
+        
         conn.commit()
         conn.close()
     
+    def _create_spatial_index(self, cursor, table):
+        """Crea la tabla R*Tree de una tabla con lat/lon y los triggers que la mantienen sincronizada
+
+        Cambiar grid_locator sin enviar lat/lon (por ejemplo, SQL directo) borra las
+        coordenadas para que sync_locations las vuelva a calcular.
+        """
+        rtree = f"{table}_rtree"
+        cursor.execute(f'CREATE VIRTUAL TABLE IF NOT EXISTS {rtree} USING rtree(id, min_lat, max_lat, min_lon, max_lon)')
+        insert_point = f'''
+                INSERT OR REPLACE INTO {rtree} (id, min_lat, max_lat, min_lon, max_lon)
+                SELECT NEW.id, NEW.lat, NEW.lat, NEW.lon, NEW.lon WHERE NEW.lat IS NOT NULL AND NEW.lon IS NOT NULL;
+        '''
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_rtree_insert AFTER INSERT ON {table}
+            BEGIN {insert_point} END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_rtree_update AFTER UPDATE OF lat, lon ON {table}
+            BEGIN
+                DELETE FROM {rtree} WHERE id = OLD.id;
+                {insert_point}
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_rtree_delete AFTER DELETE ON {table}
+            BEGIN DELETE FROM {rtree} WHERE id = OLD.id; END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_grid_changed AFTER UPDATE OF grid_locator ON {table}
+            WHEN NEW.grid_locator IS NOT OLD.grid_locator AND NEW.lat IS OLD.lat AND NEW.lon IS OLD.lon
+            BEGIN UPDATE {table} SET lat = NULL, lon = NULL WHERE id = NEW.id; END
+        ''')
+    
+    def sync_locations(self, cursor=None):
+        """Calcula lat/lon de los Grid Locators pendientes y limpia entradas huérfanas del R*Tree
+
+        Retorna el número de filas actualizadas.
+        """
+        own_connection = cursor is None
+        if own_connection:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+        updated = 0
+        for table in ('reports', 'station_history'):
+            cursor.execute(f"SELECT id, grid_locator FROM {table} WHERE lat IS NULL AND grid_locator IS NOT NULL AND grid_locator != ''")
+            pending = cursor.fetchall()
+            if pending:
+                lat, lon = decode_locators([grid for _, grid in pending])
+                valid = ~np.isnan(lat)
+                rows = [(float(la), float(lo), row_id)
+                        for (row_id, _), la, lo, ok in zip(pending, lat, lon, valid) if ok]
+                cursor.executemany(f"UPDATE {table} SET lat = ?, lon = ? WHERE id = ?", rows)
+                updated += len(rows)
+            # INSERT OR REPLACE no dispara el trigger de borrado; se eliminan los ids que ya no existen
+            cursor.execute(f"DELETE FROM {table}_rtree WHERE id NOT IN (SELECT id FROM {table})")
+        cursor.connection.commit()
+        if own_connection:
+            conn.close()
+        return updated
+    
+    def backfill_signal_fields(self, cursor=None):
+        """Calcula readability, strength, tone y signal_quality de todos los reportes en bloque
+
+        El análisis de signal_report se hace con una sola pasada vectorizada de
+        pandas; también corrige signal_quality calculada con la heurística anterior
+        (que consideraba buena cualquier señal con un '5'). Retorna las filas procesadas.
+        """
+        own_connection = cursor is None
+        if own_connection:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+        cursor.execute("SELECT id, signal_report FROM reports")
+        rows = cursor.fetchall()
+        if rows:
+            ids = [row_id for row_id, _ in rows]
+            parsed = parse_rst_series([signal for _, signal in rows])
+            values = parsed[['readability', 'strength', 'tone']].astype(object)
+            values = values.where(parsed[['readability', 'strength', 'tone']].notna(), None)
+            cursor.executemany(
+                "UPDATE reports SET readability = ?, strength = ?, tone = ?, signal_quality = ? WHERE id = ?",
+                zip(
+                    values['readability'].tolist(),
+                    values['strength'].tolist(),
+                    values['tone'].tolist(),
+                    parsed['signal_quality'].astype(int).tolist(),
+                    ids
+                )
+            )
+        if own_connection:
+            conn.commit()
+            conn.close()
+        return len(rows)
+    
+    def backfill_hf_fields(self, cursor=None):
+        """Calcula frequency_mhz, power_w y hf_band (si está vacía) de los reportes HF en bloque
+
+        Retorna las filas procesadas.
+        """
+        own_connection = cursor is None
+        if own_connection:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id, hf_frequency, hf_power, hf_band FROM reports
+            WHERE (hf_frequency IS NOT NULL AND hf_frequency != '') OR (hf_power IS NOT NULL AND hf_power != '')
+        ''')
+        rows = cursor.fetchall()
+        if rows:
+            ids, frequencies, powers, bands = zip(*rows)
+            frequency_mhz = parse_frequencies(frequencies)
+            power_w = parse_powers(powers)
+            derived = bands_for_frequencies(frequency_mhz)
+            current = pd.Series(bands, dtype=object)
+            band = current.where(current.notna() & (current.astype(str).str.strip() != ''), derived)
+            cursor.executemany(
+                "UPDATE reports SET frequency_mhz = ?, power_w = ?, hf_band = ? WHERE id = ?",
+                zip(
+                    [None if np.isnan(f) else float(f) for f in frequency_mhz],
+                    [None if np.isnan(w) else float(w) for w in power_w],
+                    band.where(band.notna(), None).tolist(),
+                    ids
+                )
+            )
+        if own_connection:
+            conn.commit()
+            conn.close()
+        return len(rows)
+    
     def _migrate_database(self, cursor):
         """Migra la base de datos agregando columnas faltantes"""
         try:
@@ -116,6 +455,53 @@ class FMREDatabase:
             if 'hf_power' not in columns:
                 cursor.execute('ALTER TABLE reports ADD COLUMN hf_power TEXT')
             
+            # Campos RST tipados; los reportes existentes se completan en bloque
+            rst_added = False
+            for rst_column in ('readability', 'strength', 'tone'):
+                if rst_column not in columns:
+                    cursor.execute(f'ALTER TABLE reports ADD COLUMN {rst_column} INTEGER')
+                    rst_added = True
+            if rst_added:
+                self.backfill_signal_fields(cursor)
+            
+            # Frecuencia y potencia numéricas; se completan en bloque junto con hf_band
+            hf_added = False
+            for hf_column in ('frequency_mhz', 'power_w'):
+                if hf_column not in columns:
+                    cursor.execute(f'ALTER TABLE reports ADD COLUMN {hf_column} REAL')
+                    hf_added = True
+            if hf_added:
+                self.backfill_hf_fields(cursor)
+            
+            # Coordenadas decodificadas del Grid Locator
+            if 'lat' not in columns:
+                cursor.execute('ALTER TABLE reports ADD COLUMN lat REAL')
+            if 'lon' not in columns:
+                cursor.execute('ALTER TABLE reports ADD COLUMN lon REAL')
+            cursor.execute("PRAGMA table_info(station_history)")
+            history_columns = [column[1] for column in cursor.fetchall()]
+            if 'lat' not in history_columns:
+                cursor.execute('ALTER TABLE station_history ADD COLUMN lat REAL')
+            if 'lon' not in history_columns:
+                cursor.execute('ALTER TABLE station_history ADD COLUMN lon REAL')
+            
+            # Columnas generadas de tiempo (no aparecen en table_info, sí en table_xinfo).
+            # timestamp es hora local sin zona y una columna generada no puede convertirla,
+            # así que ts_epoch la trata como si fuera UTC: sirve para ordenar y restar, no
+            # como instante real. minute_of_day cuenta minutos desde las 00:00 del día de la
+            # sesión (no desde su inicio; get_checkin_rate calcula ese desfase).
+            cursor.execute("PRAGMA table_xinfo(reports)")
+            all_columns = [column[1] for column in cursor.fetchall()]
+            if 'minute_of_session' in all_columns and 'minute_of_day' not in all_columns:
+                cursor.execute("ALTER TABLE reports RENAME COLUMN minute_of_session TO minute_of_day")
+                all_columns[all_columns.index('minute_of_session')] = 'minute_of_day'
+            if 'ts_epoch' not in all_columns:
+                cursor.execute("ALTER TABLE reports ADD COLUMN ts_epoch INTEGER GENERATED ALWAYS AS (CAST(strftime('%s', timestamp) AS INTEGER)) VIRTUAL")
+            if 'hour' not in all_columns:
+                cursor.execute("ALTER TABLE reports ADD COLUMN hour INTEGER GENERATED ALWAYS AS (CAST(strftime('%H', timestamp) AS INTEGER)) VIRTUAL")
+            if 'minute_of_day' not in all_columns:
+                cursor.execute("ALTER TABLE reports ADD COLUMN minute_of_day INTEGER GENERATED ALWAYS AS ((CAST(strftime('%s', timestamp) AS INTEGER) - CAST(strftime('%s', session_date) AS INTEGER)) / 60) VIRTUAL")
+            
             # Migrar tabla de usuarios para agregar preferred_system y campos HF
             cursor.execute("PRAGMA table_info(users)")
             user_columns = [column[1] for column in cursor.fetchall()]
@@ -163,6 +549,14 @@ class FMREDatabase:
         
         # Convertir señal a calidad numérica (1=mala, 2=regular, 3=buena)
         signal_quality = self._convert_signal_to_quality(signal_report)
+        readability, strength, tone = parse_rst(signal_report)
+        
+        # Frecuencia y potencia numéricas; la banda se deriva de la frecuencia si no se indica
+        frequency_mhz, power_w, hf_band = hf_fields(hf_frequency, hf_power, hf_band)
+        
+        # Coordenadas del centro del Grid Locator
+        location = decode_locator(grid_locator) if grid_locator else None
+        lat, lon = location if location else (None, None)
         
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
@@ -170,11 +564,13 @@ class FMREDatabase:
         try:
             cursor.execute('''
                 INSERT INTO reports (call_sign, operator_name, qth, ciudad, signal_report, zona, sistema,
-                               grid_locator, hf_frequency, hf_band, hf_mode, hf_power, observations, session_date, region, signal_quality)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                               grid_locator, hf_frequency, hf_band, hf_mode, hf_power, observations, session_date, region, signal_quality,
+                               readability, strength, tone, frequency_mhz, power_w, lat, lon)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (call_sign.upper(), operator_name.title(), qth.upper(), ciudad.title(), signal_report, zona, sistema,
                   grid_locator.upper() if grid_locator else None, hf_frequency or None, hf_band or None, 
-                  hf_mode or None, hf_power or None, observations, session_date, region, signal_quality))
+                  hf_mode or None, hf_power or None, observations, session_date, region, signal_quality,
+                  readability, strength, tone, frequency_mhz, power_w, lat, lon))
         except sqlite3.OperationalError as e:
             if "no column named" in str(e):
                 # Fallback para compatibilidad con esquemas antiguos
@@ -197,12 +593,12 @@ class FMREDatabase:
         # Actualizar historial de estaciones
         cursor.execute('''
             INSERT OR REPLACE INTO station_history 
-            (call_sign, operator_name, qth, ciudad, zona, sistema, grid_locator, hf_frequency, hf_band, hf_mode, hf_power, last_used, use_count)
+            (call_sign, operator_name, qth, ciudad, zona, sistema, grid_locator, hf_frequency, hf_band, hf_mode, hf_power, last_used, use_count, lat, lon)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now', 'localtime'), 
-                    COALESCE((SELECT use_count FROM station_history WHERE call_sign = ?) + 1, 1))
+                    COALESCE((SELECT use_count FROM station_history WHERE call_sign = ?) + 1, 1), ?, ?)
         ''', (call_sign.upper(), operator_name.title(), qth.upper(), ciudad.title(), zona, sistema, 
               grid_locator.upper() if grid_locator else None, hf_frequency or None, hf_band or None, 
-              hf_mode or None, hf_power or None, call_sign.upper()))
+              hf_mode or None, hf_power or None, call_sign.upper(), lat, lon))
         
         # Actualizar contador de sesión
         cursor.execute('''
@@ -303,13 +699,7 @@ class FMREDatabase:
     
     def _convert_signal_to_quality(self, signal_report):
         """Convierte el reporte de señal a calidad numérica"""
-        signal_lower = signal_report.lower()
-        if any(word in signal_lower for word in ['buena', 'excelente', 'fuerte', '5']):
-            return 3
-        elif any(word in signal_lower for word in ['regular', 'media', '3', '4']):
-            return 2
-        else:
-            return 1
+        return signal_quality_from_report(signal_report)
     
     def get_all_reports(self, session_date=None):
         """Obtiene todos los reportes, opcionalmente filtrados por fecha"""
@@ -325,11 +715,120 @@ class FMREDatabase:
         conn.close()
         return df
     
+    def get_reports_since(self, session_date, last_id=0):
+        """Obtiene los reportes de una sesión con id mayor a last_id (consulta sobre el índice de fecha)"""
+        conn = sqlite3.connect(self.db_path)
+        df = pd.read_sql_query(
+            "SELECT * FROM reports WHERE session_date = ? AND id > ? ORDER BY id",
+            conn, params=(session_date, int(last_id))
+        )
+        conn.close()
+        return df
+    
+    def get_reports_for_export(self, export_query):
+        """Obtiene solo las filas y columnas de una especificación de exportación (ExportQuery)"""
+        conn = sqlite3.connect(self.db_path)
+        query, params = export_query.to_sql()
+        df = pd.read_sql_query(query, conn, params=params)
+        conn.close()
+        return df
+    
+    def get_data_revision(self, session_date=None):
+        """Obtiene la revisión de datos de una sesión (o la suma de todas si no se indica fecha)
+
+        Es una lectura de una sola fila por llave primaria; sirve como llave de caché
+        junto con la fecha de sesión.
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        if session_date:
+            cursor.execute('SELECT revision FROM report_revisions WHERE session_date = ?', (session_date,))
+        else:
+            cursor.execute('SELECT SUM(revision) FROM report_revisions')
+        row = cursor.fetchone()
+        conn.close()
+        return row[0] if row and row[0] is not None else 0
+    
+    def get_session_revisions(self):
+        """Obtiene la revisión de datos de cada sesión como diccionario {session_date: revision}"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT session_date, revision FROM report_revisions')
+        revisions = dict(cursor.fetchall())
+        conn.close()
+        return revisions
+    
+    def get_participation_pairs(self, session_dates=None):
+        """Obtiene los pares (session_date, call_sign) distintos, opcionalmente solo de ciertas sesiones"""
+        conn = sqlite3.connect(self.db_path)
+        query = "SELECT DISTINCT session_date, call_sign FROM reports"
+        params = ()
+        if session_dates is not None:
+            session_dates = list(session_dates)
+            if not session_dates:
+                conn.close()
+                return pd.DataFrame(columns=['session_date', 'call_sign'])
+            query += f" WHERE session_date IN ({', '.join('?' for _ in session_dates)})"
+            params = tuple(session_dates)
+        df = pd.read_sql_query(query + " ORDER BY session_date", conn, params=params)
+        conn.close()
+        return df
+    
+    def get_hf_quality_rows(self, session_dates=None):
+        """Obtiene session_date, hf_band, hour, zona y signal_quality de los reportes con banda HF"""
+        conn = sqlite3.connect(self.db_path)
+        query = """
+            SELECT session_date, hf_band, hour, zona, signal_quality FROM reports
+            WHERE hf_band IS NOT NULL AND hf_band != ''
+        """
+        params = ()
+        if session_dates is not None:
+            session_dates = list(session_dates)
+            if not session_dates:
+                conn.close()
+                return pd.DataFrame(columns=['session_date', 'hf_band', 'hour', 'zona', 'signal_quality'])
+            query += f" AND session_date IN ({', '.join('?' for _ in session_dates)})"
+            params = tuple(session_dates)
+        df = pd.read_sql_query(query, conn, params=params)
+        conn.close()
+        return df
+    
+    def iter_reports_for_export(self, export_query, chunksize=5000):
+        """Itera por bloques de DataFrame los reportes de una especificación de exportación
+
+        Permite exportar todo el archivo histórico sin cargarlo completo en memoria.
+        """
+        conn = sqlite3.connect(self.db_path)
+        try:
+            query, params = export_query.to_sql()
+            for chunk in pd.read_sql_query(query, conn, params=params, chunksize=chunksize):
+                yield chunk
+        finally:
+            conn.close()
+    
     def update_report(self, report_id, **kwargs):
         """Actualiza un reporte existente"""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
+        # Recalcular campos RST y calidad si cambia el reporte de señal
+        if 'signal_report' in kwargs:
+            kwargs['readability'], kwargs['strength'], kwargs['tone'] = parse_rst(kwargs['signal_report'])
+            kwargs['signal_quality'] = self._convert_signal_to_quality(kwargs['signal_report'])
+        
+        # Recalcular frecuencia, potencia y banda si cambian los campos HF
+        if 'hf_frequency' in kwargs:
+            kwargs['frequency_mhz'], _, derived_band = hf_fields(kwargs['hf_frequency'], None)
+            if not kwargs.get('hf_band'):
+                kwargs['hf_band'] = derived_band
+        if 'hf_power' in kwargs:
+            _, kwargs['power_w'], _ = hf_fields(None, kwargs['hf_power'])
+        
+        # Recalcular coordenadas si cambia el Grid Locator
+        if 'grid_locator' in kwargs and not ('lat' in kwargs or 'lon' in kwargs):
+            location = decode_locator(kwargs['grid_locator']) if kwargs['grid_locator'] else None
+            kwargs['lat'], kwargs['lon'] = location if location else (None, None)
+        
         # Construir query dinámicamente
         set_clause = ", ".join([f"{key} = ?" for key in kwargs.keys()])
         values = list(kwargs.values()) + [report_id]
@@ -352,15 +851,17 @@ class FMREDatabase:
         conn.close()
         return rows_affected
     
-    def get_statistics(self, session_date=None):
-        """Obtiene estadísticas de los reportes"""
+    def get_statistics(self, session_date=None, export_query=None):
+        """Obtiene estadísticas de los reportes, opcionalmente con los filtros de un ExportQuery"""
         conn = sqlite3.connect(self.db_path)
         
         base_query = "FROM reports"
         where_clause = ""
         params = ()
         
-        if session_date:
+        if export_query is not None:
+            where_clause, params = export_query.where_clause()
+        elif session_date:
             where_clause = " WHERE session_date = ?"
             params = (session_date,)
         
@@ -388,6 +889,23 @@ class FMREDatabase:
         query = f"SELECT signal_quality, COUNT(*) as count {base_query} {where_clause} GROUP BY signal_quality"
         stats['signal_quality'] = pd.read_sql_query(query, conn, params=params)
         
+        # Estadísticas HF por banda sobre columnas numéricas
+        band_where = f"{where_clause} AND hf_band IS NOT NULL AND hf_band != ''" if where_clause else " WHERE hf_band IS NOT NULL AND hf_band != ''"
+        query = f"""
+            SELECT hf_band, COUNT(*) as count, COUNT(DISTINCT call_sign) as participants,
+                   ROUND(AVG(power_w), 1) as avg_power_w, MIN(frequency_mhz) as min_frequency_mhz,
+                   MAX(frequency_mhz) as max_frequency_mhz
+            {base_query}{band_where}
+            GROUP BY hf_band
+            ORDER BY MIN(frequency_mhz)
+        """
+        stats['by_band'] = pd.read_sql_query(query, conn, params=params)
+        
+        # Distribución RST exacta (legibilidad × intensidad) sobre columnas enteras indexadas
+        rst_where = f"{where_clause} AND readability IS NOT NULL" if where_clause else " WHERE readability IS NOT NULL"
+        query = f"SELECT readability, strength, COUNT(*) as count {base_query}{rst_where} GROUP BY readability, strength ORDER BY readability DESC, strength DESC"
+        stats['rst_distribution'] = pd.read_sql_query(query, conn, params=params)
+        
         # Reportes por zona (total de reportes, no participantes únicos)
         query = f"SELECT zona, COUNT(*) as count {base_query} {where_clause} GROUP BY zona ORDER BY count DESC"
         stats['by_zona'] = pd.read_sql_query(query, conn, params=params)
@@ -397,9 +915,16 @@ class FMREDatabase:
         stats['by_sistema'] = pd.read_sql_query(query, conn, params=params)
         
         # Reportes por hora
-        query = f"SELECT strftime('%H', timestamp) as hour, COUNT(*) as count {base_query} {where_clause} GROUP BY hour ORDER BY hour"
+        query = f"SELECT hour, COUNT(*) as count {base_query} {where_clause} GROUP BY hour ORDER BY hour"
         stats['by_hour'] = pd.read_sql_query(query, conn, params=params)
         
+        # Distancias desde la estación de control (Grid Locators decodificados en bloque)
+        locator_filter = "grid_locator IS NOT NULL AND grid_locator != ''"
+        located_where = f"{where_clause} AND {locator_filter}" if where_clause else f" WHERE {locator_filter}"
+        query = f"SELECT call_sign, grid_locator, session_date, hf_band, sistema {base_query}{located_where}"
+        located_df = pd.read_sql_query(query, conn, params=params)
+        stats['distance_records'], stats['distance_by_band'] = distance_statistics(located_df)
+        
         # Rankings - Top zona (incluir empates)
         if not stats['by_zona'].empty:
             max_count = stats['by_zona']['count'].max()
@@ -424,6 +949,40 @@ class FMREDatabase:
         conn.close()
         return stats
     
+    def get_checkin_rate(self, session_date, window=5):
+        """Obtiene la tasa de check-ins por minuto de una sesión con promedio móvil
+
+        Se agrupa por minute_of_day sobre el índice (session_date, minute_of_day) y
+        el desfase se cuenta desde el primer check-in de la sesión.
+        Retorna columnas: minute (minutos desde el primer reporte), clock (HH:MM),
+        checkins, rolling_avg (ventana de window minutos) y cumulative.
+        """
+        conn = sqlite3.connect(self.db_path)
+        counts = pd.read_sql_query('''
+            SELECT minute_of_day, COUNT(*) as checkins
+            FROM reports
+            WHERE session_date = ? AND minute_of_day IS NOT NULL
+            GROUP BY minute_of_day
+            ORDER BY minute_of_day
+        ''', conn, params=(str(session_date),))
+        conn.close()
+        
+        columns = ['minute', 'clock', 'checkins', 'rolling_avg', 'cumulative']
+        if counts.empty:
+            return pd.DataFrame(columns=columns)
+        
+        # Rellenar los minutos sin check-ins para que el promedio móvil sea por tiempo
+        start, end = int(counts['minute_of_day'].min()), int(counts['minute_of_day'].max())
+        minutes = pd.RangeIndex(start, end + 1)
+        checkins = counts.set_index('minute_of_day')['checkins'].reindex(minutes, fill_value=0)
+        return pd.DataFrame({
+            'minute': minutes - start,
+            'clock': [f"{(m // 60) % 24:02d}:{m % 60:02d}" for m in minutes],
+            'checkins': checkins.to_numpy(),
+            'rolling_avg': checkins.rolling(window, min_periods=1).mean().round(2).to_numpy(),
+            'cumulative': checkins.cumsum().to_numpy(),
+        }, columns=columns)
+    
     def search_reports(self, search_term, filters=None):
         """Busca reportes por indicativo, nombre o QTH con filtros opcionales"""
         conn = sqlite3.connect(self.db_path)
@@ -481,99 +1040,181 @@ class FMREDatabase:
         conn.close()
         return systems
     
-    def get_motivational_stats(self):
-        """Obtiene estadísticas motivacionales para competencia entre radioaficionados"""
-        conn = sqlite3.connect(self.db_path)
-        stats = {}
-        
-        # Estación más reportada del año
-        current_year = datetime.now().year
-        query = """
-            SELECT call_sign, operator_name, COUNT(*) as total_reports
-            FROM reports 
-            WHERE strftime('%Y', session_date) = ?
-            GROUP BY call_sign, operator_name
-            ORDER BY total_reports DESC
-            LIMIT 10
-        """
-        stats['top_stations_year'] = pd.read_sql_query(query, conn, params=(str(current_year),))
-        
-        # Estación más reportada del mes
-        current_month = datetime.now().strftime('%Y-%m')
-        query = """
-            SELECT call_sign, operator_name, COUNT(*) as total_reports
-            FROM reports 
-            WHERE strftime('%Y-%m', session_date) = ?
-            GROUP BY call_sign, operator_name
-            ORDER BY total_reports DESC
-            LIMIT 10
-        """
-        stats['top_stations_month'] = pd.read_sql_query(query, conn, params=(current_month,))
-        
-        # Zona más activa del año
-        query = """
-            SELECT zona, COUNT(DISTINCT call_sign) as unique_stations, COUNT(*) as total_reports
-            FROM reports 
-            WHERE strftime('%Y', session_date) = ?
-            GROUP BY zona
-            ORDER BY total_reports DESC
-        """
-        stats['top_zones_year'] = pd.read_sql_query(query, conn, params=(str(current_year),))
-        
-        # Zona más activa del mes
-        query = """
-            SELECT zona, COUNT(DISTINCT call_sign) as unique_stations, COUNT(*) as total_reports
-            FROM reports 
-            WHERE strftime('%Y-%m', session_date) = ?
-            GROUP BY zona
-            ORDER BY total_reports DESC
-        """
-        stats['top_zones_month'] = pd.read_sql_query(query, conn, params=(current_month,))
-        
-        # Sistema más usado del año
-        query = """
-            SELECT sistema, COUNT(DISTINCT call_sign) as unique_stations, COUNT(*) as total_reports
-            FROM reports 
-            WHERE strftime('%Y', session_date) = ?
-            GROUP BY sistema
-            ORDER BY total_reports DESC
+    def get_ranking(self, dimension='call_sign', period=None, limit=10):
+        """Clasifica una dimensión (ver ranking.RANKING_DIMENSIONS) por reportes en un periodo
+
+        RANK() y DENSE_RANK() se calculan en SQLite; limit se aplica sobre DENSE_RANK
+        para no cortar empates. Retorna columnas: dimensión, [operator_name],
+        unique_stations, total_reports, rank y dense_rank.
         """
-        stats['top_systems_year'] = pd.read_sql_query(query, conn, params=(str(current_year),))
-        
-        # Sistema más usado del mes
-        query = """
-            SELECT sistema, COUNT(DISTINCT call_sign) as unique_stations, COUNT(*) as total_reports
-            FROM reports 
-            WHERE strftime('%Y-%m', session_date) = ?
-            GROUP BY sistema
-            ORDER BY total_reports DESC
+        if dimension not in RANKING_DIMENSIONS:
+            raise ValueError(f"Dimensión de ranking no válida: {dimension}")
+        period = period or RankingPeriod()
+        where_clause, params = period.where_clause()
+        
+        # Para indicativos se muestra el nombre de operador del reporte más reciente
+        # (columna simple junto a MAX() en SQLite)
+        extra_columns = "operator_name, MAX(timestamp) AS last_report," if dimension == 'call_sign' else ""
+        query = f"""
+            WITH totals AS (
+                SELECT {dimension}, {extra_columns}
+                       COUNT(DISTINCT call_sign) AS unique_stations,
+                       COUNT(*) AS total_reports
+                FROM reports{where_clause}
+                GROUP BY {dimension}
+            ),
+            ranked AS (
+                SELECT *,
+                       RANK() OVER (ORDER BY total_reports DESC) AS rank,
+                       DENSE_RANK() OVER (ORDER BY total_reports DESC) AS dense_rank
+                FROM totals
+            )
+            SELECT * FROM ranked
         """
-        stats['top_systems_month'] = pd.read_sql_query(query, conn, params=(current_month,))
+        if limit:
+            query += " WHERE dense_rank <= ?"
+            params = params + (int(limit),)
+        query += f" ORDER BY rank, {dimension}"
         
-        # Estadísticas generales del año
-        query = """
+        conn = sqlite3.connect(self.db_path)
+        df = pd.read_sql_query(query, conn, params=params)
+        conn.close()
+        return df.drop(columns=['last_report'], errors='ignore')
+    
+    def get_period_summary(self, period=None):
+        """Obtiene total de reportes, estaciones únicas y días activos de un periodo"""
+        period = period or RankingPeriod()
+        where_clause, params = period.where_clause()
+        conn = sqlite3.connect(self.db_path)
+        df = pd.read_sql_query(f"""
             SELECT 
                 COUNT(*) as total_reports,
                 COUNT(DISTINCT call_sign) as unique_stations,
                 COUNT(DISTINCT session_date) as active_days
-            FROM reports 
-            WHERE strftime('%Y', session_date) = ?
+            FROM reports{where_clause}
+        """, conn, params=params)
+        conn.close()
+        return df
+    
+    def get_motivational_stats(self, reference_date=None):
+        """Obtiene estadísticas motivacionales para competencia entre radioaficionados
+
+        Los rankings del año y del mes que contienen reference_date (hoy por
+        defecto) se calculan con get_ranking, incluyendo empates.
         """
-        stats['general_year'] = pd.read_sql_query(query, conn, params=(str(current_year),))
+        reference_date = reference_date or datetime.now().date()
+        year = RankingPeriod.year(reference_date)
+        month = RankingPeriod.month(reference_date)
+        stats = {}
         
-        # Estadísticas generales del mes
-        query = """
-            SELECT 
-                COUNT(*) as total_reports,
-                COUNT(DISTINCT call_sign) as unique_stations,
-                COUNT(DISTINCT session_date) as active_days
-            FROM reports 
-            WHERE strftime('%Y-%m', session_date) = ?
+        # Estaciones más reportadas del año y del mes
+        station_columns = ['call_sign', 'operator_name', 'total_reports', 'rank']
+        stats['top_stations_year'] = self.get_ranking('call_sign', year)[station_columns]
+        stats['top_stations_month'] = self.get_ranking('call_sign', month)[station_columns]
+        
+        # Zonas y sistemas más activos del año y del mes
+        for dimension, key in (('zona', 'zones'), ('sistema', 'systems')):
+            group_columns = [dimension, 'unique_stations', 'total_reports', 'rank']
+            stats[f'top_{key}_year'] = self.get_ranking(dimension, year, limit=None)[group_columns]
+            stats[f'top_{key}_month'] = self.get_ranking(dimension, month, limit=None)[group_columns]
+        
+        # Estadísticas generales del año y del mes
+        stats['general_year'] = self.get_period_summary(year)
+        stats['general_month'] = self.get_period_summary(month)
+        
+        return stats
+    
+    def stations_in_bbox(self, min_lat, min_lon, max_lat, max_lon, start_date=None, end_date=None):
+        """Obtiene las estaciones dentro de un rectángulo de coordenadas usando el índice R*Tree
+
+        Sin fechas se consulta station_history (ubicación vigente de cada estación).
+        Con start_date/end_date se consultan los reportes del periodo y se agrupan
+        por indicativo con su ubicación más reciente.
         """
-        stats['general_month'] = pd.read_sql_query(query, conn, params=(current_month,))
+        conn = sqlite3.connect(self.db_path)
+        # El R*Tree guarda flotantes de 32 bits redondeados hacia afuera: se consulta por
+        # traslape y se confirma con las coordenadas exactas de la tabla
+        bbox_params = (float(min_lat), float(max_lat), float(min_lon), float(max_lon)) * 2
+        bbox_condition = (
+            "r.max_lat >= ? AND r.min_lat <= ? AND r.max_lon >= ? AND r.min_lon <= ?"
+            " AND {0}.lat BETWEEN ? AND ? AND {0}.lon BETWEEN ? AND ?"
+        )
+        
+        if start_date is None and end_date is None:
+            df = pd.read_sql_query(f'''
+                SELECT s.call_sign, s.operator_name, s.grid_locator, s.lat, s.lon, s.zona, s.sistema, s.use_count, s.last_used
+                FROM station_history_rtree r
+                JOIN station_history s ON s.id = r.id
+                WHERE {bbox_condition.format('s')}
+                ORDER BY s.call_sign
+            ''', conn, params=bbox_params)
+        else:
+            date_conditions, params = RankingPeriod(start_date, end_date).conditions('p.session_date')
+            date_condition = "".join(f" AND {condition}" for condition in date_conditions)
+            # Columnas simples junto a MAX(): valores del reporte más reciente de cada indicativo
+            df = pd.read_sql_query(f'''
+                SELECT p.call_sign, p.operator_name, p.grid_locator, p.lat, p.lon, p.zona, p.sistema,
+                       COUNT(*) AS reports, MAX(p.session_date) AS last_session
+                FROM reports_rtree r
+                JOIN reports p ON p.id = r.id
+                WHERE {bbox_condition.format('p')}{date_condition}
+                GROUP BY p.call_sign
+                ORDER BY p.call_sign
+            ''', conn, params=bbox_params + params)
+        conn.close()
+        return df
+    
+    def stations_within_radius(self, center, radius_km, start_date=None, end_date=None):
+        """Obtiene las estaciones a menos de radius_km de un centro (Grid Locator o tupla lat, lon)
+
+        El R*Tree filtra por el rectángulo que contiene al círculo y la distancia
+        exacta se calcula después sobre los candidatos. Agrega distance_km y bearing.
+        """
+        if isinstance(center, str):
+            location = decode_locator(center)
+            if location is None:
+                raise ValueError(f"Grid Locator inválido: {center}")
+            center = location
+        center_lat, center_lon = center
+        
+        lat_delta = radius_km / 111.2
+        lon_delta = radius_km / (111.2 * max(np.cos(np.radians(center_lat)), 0.01))
+        candidates = self.stations_in_bbox(
+            max(center_lat - lat_delta, -90.0), max(center_lon - lon_delta, -180.0),
+            min(center_lat + lat_delta, 90.0), min(center_lon + lon_delta, 180.0),
+            start_date, end_date
+        )
+        if candidates.empty:
+            return candidates.assign(distance_km=pd.Series(dtype=float), bearing=pd.Series(dtype=float))
+        
+        distance, bearing = distance_bearing(candidates['lat'], candidates['lon'], center_lat, center_lon)
+        candidates['distance_km'] = np.round(distance, 1)
+        candidates['bearing'] = np.round(bearing, 1)
+        return candidates[candidates['distance_km'] <= radius_km].sort_values('distance_km').reset_index(drop=True)
+    
+    def get_hf_reports(self, band=None, min_power=None, max_power=None, start_date=None, end_date=None):
+        """Obtiene reportes HF filtrados por banda y rango de potencia (watts) sobre columnas indexadas"""
+        conditions, params = RankingPeriod(start_date, end_date).conditions()
+        conditions, params = list(conditions), list(params)
+        if band:
+            conditions.append("hf_band = ?")
+            params.append(band)
+        if min_power is not None:
+            conditions.append("power_w >= ?")
+            params.append(float(min_power))
+        if max_power is not None:
+            conditions.append("power_w <= ?")
+            params.append(float(max_power))
+        if not band:
+            conditions.append("hf_band IS NOT NULL")
         
+        conn = sqlite3.connect(self.db_path)
+        df = pd.read_sql_query(
+            f"SELECT * FROM reports WHERE {' AND '.join(conditions)} ORDER BY session_date DESC, frequency_mhz",
+            conn, params=params
+        )
         conn.close()
-        return stats
+        return df
     
     def get_sessions(self):
         """Obtiene todas las sesiones registradas"""
@@ -628,19 +1269,74 @@ class FMREDatabase:
             conn.commit()
             user_id = cursor.lastrowid
             conn.close()
+            self.invalidate_user(username)
             return user_id
         except sqlite3.IntegrityError:
             conn.close()
             return None
     
-    def get_user_by_username(self, username):
-        """Obtiene un usuario por su nombre de usuario"""
+    def _cached_user(self, username):
+        """Perfil de usuario desde el caché del proceso; consulta la tabla solo si no está o venció
+
+        Retorna un diccionario en orden de columnas sin password_hash (compartido:
+        no modificar) o None. El hash se lee siempre de la tabla con
+        get_password_hash, para que un reset hecho desde otro proceso aplique de
+        inmediato.
+        """
+        now = time.monotonic()
+        with self._user_cache_lock:
+            entry = self._user_cache.get(username)
+            if entry is not None and now - entry[0] < USER_CACHE_TTL:
+                return entry[1]
+            generation = self._user_cache_generation
+        
         conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
+        cursor.execute("SELECT * FROM users WHERE username = ?", (username,))
+        row = cursor.fetchone()
+        conn.close()
+        if row is None:
+            return None
         
-        cursor.execute('SELECT * FROM users WHERE username = ?', (username,))
+        user = dict(row)
+        del user['password_hash']
+        with self._user_cache_lock:
+            # Un last_login pendiente de escribir es más reciente que el de la tabla
+            if username in self._pending_logins:
+                user['last_login'] = self._pending_logins[username]
+            # Si hubo una invalidación durante la lectura, el perfil leído puede ser anterior a ella
+            if generation == self._user_cache_generation:
+                self._user_cache[username] = (now, user)
+        return user
+    
+    def invalidate_user(self, username=None, user_id=None):
+        """Descarta del caché el perfil de un usuario (por nombre o id); sin argumentos vacía el caché"""
+        with self._user_cache_lock:
+            self._user_cache_generation += 1
+            if username is None and user_id is None:
+                self._user_cache.clear()
+                return
+            for cached_username, (_, user) in list(self._user_cache.items()):
+                if cached_username == username or (user_id is not None and user['id'] == user_id):
+                    del self._user_cache[cached_username]
+    
+    def get_password_hash(self, username):
+        """Hash de contraseña vigente de un usuario, leído de la tabla (sin caché); None si no existe"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute("SELECT password_hash FROM users WHERE username = ?", (username,))
+        row = cursor.fetchone()
+        conn.close()
+        return row[0] if row else None
+    
+    def get_user_by_username(self, username):
+        """Obtiene un usuario por su nombre de usuario (tupla en orden de columnas, incluye password_hash)"""
+        self.flush_last_logins()
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM users WHERE username = ?", (username,))
         user = cursor.fetchone()
-        
         conn.close()
         return user
     
@@ -657,18 +1353,13 @@ class FMREDatabase:
         
         conn.commit()
         conn.close()
+        self.invalidate_user(username)
         return cursor.rowcount > 0
     
     def get_user_preferred_system(self, username):
         """Obtiene el sistema preferido de un usuario"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT preferred_system FROM users WHERE username = ?', (username,))
-        result = cursor.fetchone()
-        
-        conn.close()
-        return result[0] if result else 'ASL'
+        user = self._cached_user(username)
+        return user['preferred_system'] if user else 'ASL'
     
     def update_user_hf_preferences(self, username, frequency, mode, power):
         """Actualiza las preferencias HF de un usuario"""
@@ -684,6 +1375,7 @@ class FMREDatabase:
         conn.commit()
         success = cursor.rowcount > 0
         conn.close()
+        self.invalidate_user(username)
         return success
     
     def update_user_profile(self, user_id, full_name, email):
@@ -701,20 +1393,23 @@ class FMREDatabase:
             conn.commit()
             success = cursor.rowcount > 0
             conn.close()
+            self.invalidate_user(user_id=user_id)
             return success
         except Exception as e:
             conn.close()
             raise e
     
     def change_user_password(self, user_id, new_password):
-        """Cambia la contraseña de un usuario"""
+        """Cambia la contraseña de un usuario
+
+        El hash bcrypt se calcula en el pool de hashing y se espera aquí (el pool
+        acota la concurrencia); la conexión se abre hasta tener el hash.
+        """
+        password_hash = hash_password_async(new_password).result()
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
         try:
-            # Usar el mismo método de hash que auth.py (SHA256)
-            import hashlib
-            password_hash = hashlib.sha256(new_password.encode()).hexdigest()
             cursor.execute('''
                 UPDATE users 
                 SET password_hash = ?
@@ -724,6 +1419,7 @@ class FMREDatabase:
             conn.commit()
             success = cursor.rowcount > 0
             conn.close()
+            self.invalidate_user(user_id=user_id)
             return success
         except Exception as e:
             conn.close()
@@ -731,18 +1427,12 @@ class FMREDatabase:
     
     def get_user(self, username):
         """Obtiene un usuario por nombre de usuario"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM users WHERE username = ?", (username,))
-        user = cursor.fetchone()
-        conn.close()
-        if user:
-            return dict(user)
-        return None
+        user = self._cached_user(username)
+        return dict(user) if user else None
     
     def get_all_users(self):
         """Obtiene todos los usuarios"""
+        self.flush_last_logins()
         conn = sqlite3.connect(self.db_path)
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
@@ -779,6 +1469,7 @@ class FMREDatabase:
             conn.commit()
         
         conn.close()
+        self.invalidate_user(user_id=user_id)
         return cursor.rowcount > 0
     
     def delete_user(self, user_id):
@@ -788,6 +1479,7 @@ class FMREDatabase:
         cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
         conn.commit()
         conn.close()
+        self.invalidate_user(user_id=user_id)
         return cursor.rowcount > 0
     
     def change_password(self, username, new_password_hash):
@@ -797,8 +1489,77 @@ class FMREDatabase:
         cursor.execute("UPDATE users SET password_hash = ? WHERE username = ?", (new_password_hash, username))
         conn.commit()
         conn.close()
+        self.invalidate_user(username)
+        return cursor.rowcount > 0
+    
+    def update_password_hash(self, username, old_hash, new_hash):
+        """Reemplaza el hash de contraseña solo si no cambió desde que se leyó (rehash al iniciar sesión)"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute("UPDATE users SET password_hash = ? WHERE username = ? AND password_hash = ?",
+                       (new_hash, username, old_hash))
+        conn.commit()
+        conn.close()
+        self.invalidate_user(username)
         return cursor.rowcount > 0
     
+    def bulk_create_users(self, users):
+        """Crea varios usuarios en una sola transacción; retorna los nombres creados
+
+        Cada usuario es un diccionario con username, password_hash, full_name y
+        opcionalmente email y role. Los nombres que ya existen se omiten; si
+        falla una inserción no se crea ninguno.
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute("SELECT username FROM users")
+            existing = {row[0] for row in cursor.fetchall()}
+            new_users = [user for user in users if user['username'] not in existing]
+            cursor.executemany('''
+                INSERT INTO users (username, password_hash, full_name, email, role)
+                VALUES (?, ?, ?, ?, ?)
+            ''', [(user['username'], user['password_hash'], user['full_name'], user.get('email'),
+                   user.get('role') or 'operator') for user in new_users])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return [user['username'] for user in new_users]
+    
+    def bulk_change_passwords(self, password_hashes):
+        """Cambia las contraseñas de varios usuarios en una sola transacción
+
+        password_hashes es un diccionario username -> hash. Retorna los
+        usuarios actualizados.
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        updated = []
+        try:
+            for username, password_hash in password_hashes.items():
+                cursor.execute("UPDATE users SET password_hash = ? WHERE username = ?", (password_hash, username))
+                if cursor.rowcount:
+                    updated.append(username)
+            conn.commit()
+        finally:
+            conn.close()
+        for username in password_hashes:
+            self.invalidate_user(username)
+        return updated
+    
+    def get_password_hashes(self):
+        """Obtiene username -> hash de contraseña de todos los usuarios (para auditar hashes heredados)"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute("SELECT username, password_hash FROM users")
+        hashes = dict(cursor.fetchall())
+        conn.close()
+        return hashes
+    
     def normalize_operator_names(self):
         """Normaliza todos los nombres de operadores y ciudades existentes a formato título"""
         conn = sqlite3.connect(self.db_path)
@@ -850,10 +1611,400 @@ class FMREDatabase:
         
         return reports_count + stations_count
     
-    def update_last_login(self, username):
-        """Actualiza la última fecha de login del usuario"""
+    def enqueue_emails(self, messages, kind=None):
+        """Inserta correos en la bandeja de salida en una sola transacción; retorna sus ids
+
+        Cada mensaje es un diccionario con to_email, subject, body_html y
+        opcionalmente body_text.
+        """
+        now = time.time()
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        ids = []
+        for message in messages:
+            cursor.execute('''
+                INSERT INTO email_outbox (to_email, subject, body_html, body_text, kind, created_at, next_attempt_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (message['to_email'], message['subject'], message['body_html'], message.get('body_text'),
+                  kind, now, now))
+            ids.append(cursor.lastrowid)
+        conn.commit()
+        conn.close()
+        return ids
+    
+    def claim_outbox_batch(self, limit=50, lease_seconds=300):
+        """Reserva atómicamente hasta `limit` correos vencidos para entregarlos
+
+        Los reservados pasan a 'sending' con next_attempt_at = fin de la reserva;
+        si el proceso muere antes de marcarlos, vuelven a ser elegibles al vencer.
+        Varios procesos pueden reclamar a la vez sin enviar dos veces el mismo correo.
+        """
+        now = time.time()
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE email_outbox SET status = 'sending', next_attempt_at = ?
+            WHERE id IN (
+                SELECT id FROM email_outbox
+                WHERE status IN ('pending', 'sending') AND next_attempt_at <= ?
+                ORDER BY next_attempt_at LIMIT ?
+            )
+            RETURNING id, to_email, subject, body_html, body_text, kind, attempts, created_at
+        ''', (now + lease_seconds, now, limit))
+        claimed = [dict(row) for row in cursor.fetchall()]
+        conn.commit()
+        conn.close()
+        return claimed
+    
+    def mark_outbox_sent(self, message_ids):
+        """Marca correos como enviados, registra su latencia y descarta el cuerpo (puede incluir credenciales)
+
+        Solo afecta a los que siguen reservados ('sending'), para no pisar un
+        estado puesto por otro proceso (p. ej. descartado por credenciales).
+        """
+        now = time.time()
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.executemany('''
+            UPDATE email_outbox
+            SET status = 'sent', attempts = attempts + 1, sent_at = ?, latency_seconds = ? - created_at,
+                last_error = NULL, body_html = NULL, body_text = NULL
+            WHERE id = ? AND status = 'sending'
+        ''', [(now, now, message_id) for message_id in message_ids])
+        conn.commit()
+        conn.close()
+    
+    def mark_outbox_failed(self, failures):
+        """Registra intentos fallidos: (id, error, next_attempt_at o None para mandarlo a 'dead')
+
+        Solo afecta a los que siguen reservados ('sending'). Los correos con
+        credenciales que pasan a 'dead' pierden su cuerpo.
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.executemany('''
+            UPDATE email_outbox
+            SET attempts = attempts + 1, last_error = ?,
+                status = CASE WHEN ? IS NULL THEN 'dead' ELSE 'pending' END,
+                next_attempt_at = COALESCE(?, next_attempt_at)
+            WHERE id = ? AND status = 'sending'
+        ''', [(error, next_attempt_at, next_attempt_at, message_id)
+              for message_id, error, next_attempt_at in failures])
+        discard_outbox_credentials(conn, created_before=0)
+        conn.commit()
+        conn.close()
+    
+    def retry_dead_emails(self, message_ids=None):
+        """Regresa correos en 'dead' a la cola (todos si no se indican ids); retorna cuántos
+
+        Los que ya no tienen cuerpo (credenciales descartadas) no se pueden reintentar.
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        query = ("UPDATE email_outbox SET status = 'pending', attempts = 0, next_attempt_at = ? "
+                 "WHERE status = 'dead' AND body_html IS NOT NULL")
+        params = [time.time()]
+        if message_ids is not None:
+            message_ids = list(message_ids)
+            query += f" AND id IN ({', '.join('?' for _ in message_ids)})"
+            params += message_ids
+        cursor.execute(query, params)
+        conn.commit()
+        conn.close()
+        return cursor.rowcount
+    
+    def expire_outbox_credentials(self, max_age=OUTBOX_CREDENTIAL_TTL):
+        """Descarta el cuerpo de los correos con credenciales sin enviar tras max_age segundos; retorna cuántos
+
+        Así una contraseña temporal o un enlace de recuperación no quedan en la
+        base (ni en sus respaldos) si SMTP no está configurado o el correo falla.
+        """
+        conn = sqlite3.connect(self.db_path)
+        expired = discard_outbox_credentials(conn, time.time() - max_age)
+        conn.commit()
+        conn.close()
+        return expired
+    
+    def get_outbox_stats(self, since_seconds=86400):
+        """Conteo por estado y latencia de entrega (promedio y máxima) de las últimas `since_seconds`"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute("SELECT status, COUNT(*) FROM email_outbox GROUP BY status")
+        stats = {status: 0 for status in ('pending', 'sending', 'sent', 'dead')}
+        stats.update(dict(cursor.fetchall()))
+        cursor.execute('''
+            SELECT COUNT(*), AVG(latency_seconds), MAX(latency_seconds) FROM email_outbox
+            WHERE status = 'sent' AND sent_at >= ?
+        ''', (time.time() - since_seconds,))
+        stats['recent_sent'], stats['avg_latency'], stats['max_latency'] = cursor.fetchone()
+        conn.close()
+        return stats
+    
+    def get_outbox(self, status=None, limit=100):
+        """Obtiene los correos más recientes de la bandeja de salida (sin cuerpo)"""
+        conn = sqlite3.connect(self.db_path)
+        query = '''
+            SELECT id, to_email, subject, kind, status, attempts, last_error,
+                   datetime(created_at, 'unixepoch', 'localtime') AS created_at,
+                   datetime(sent_at, 'unixepoch', 'localtime') AS sent_at,
+                   ROUND(latency_seconds, 2) AS latency_seconds
+            FROM email_outbox
+        '''
+        params = []
+        if status:
+            query += " WHERE status = ?"
+            params.append(status)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        df = pd.read_sql_query(query, conn, params=params)
+        conn.close()
+        return df
+    
+    def upsert_participant_contacts(self, contacts):
+        """Inserta o actualiza correos de participantes en una sola transacción; retorna cuántos
+
+        Cada contacto es un diccionario con call_sign y email, y opcionalmente
+        name y subscribed.
+        """
+        def text(value):
+            # Las celdas vacías de un DataFrame llegan como NaN o None
+            return None if value is None or pd.isna(value) else str(value).strip() or None
+        
+        rows = []
+        for contact in contacts:
+            call_sign, email = text(contact.get('call_sign')), text(contact.get('email'))
+            if not call_sign or not email:
+                continue
+            if '@' not in email:
+                raise ValueError(f"Email inválido para {call_sign}: {email}")
+            subscribed = contact.get('subscribed', True)
+            subscribed = True if subscribed is None or pd.isna(subscribed) else bool(subscribed)
+            rows.append((call_sign.upper(), email, text(contact.get('name')), int(subscribed)))
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.executemany('''
+            INSERT INTO participant_contacts (call_sign, email, name, subscribed)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(call_sign) DO UPDATE SET
+                email = excluded.email, name = excluded.name,
+                subscribed = excluded.subscribed, updated_at = CURRENT_TIMESTAMP
+        ''', rows)
+        conn.commit()
+        conn.close()
+        return len(rows)
+    
+    def delete_participant_contacts(self, call_signs):
+        """Elimina los correos de los indicativos dados; retorna cuántos"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.executemany("DELETE FROM participant_contacts WHERE call_sign = ?",
+                           [(call_sign.upper(),) for call_sign in call_signs])
+        conn.commit()
+        conn.close()
+        return cursor.rowcount
+    
+    def get_participant_contacts(self):
+        """Obtiene los correos de participantes ordenados por indicativo"""
+        conn = sqlite3.connect(self.db_path)
+        df = pd.read_sql_query(
+            "SELECT call_sign, email, name, subscribed FROM participant_contacts ORDER BY call_sign", conn)
+        conn.close()
+        df['subscribed'] = df['subscribed'].astype(bool)
+        return df
+    
+    def get_smtp_settings(self):
+        """Obtiene la configuración SMTP guardada como diccionario, o None si no hay"""
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        row = conn.execute('''
+            SELECT server, port, username, password, from_email, from_name, updated_by, updated_at
+            FROM smtp_settings WHERE id = 1
+        ''').fetchone()
+        conn.close()
+        return dict(row) if row else None
+    
+    def save_smtp_settings(self, server, port, username, password, from_email=None, from_name=None, updated_by=None):
+        """Guarda la configuración SMTP del sistema; una contraseña vacía conserva la anterior"""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
-        cursor.execute("UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE username = ?", (username,))
+        cursor.execute('''
+            INSERT INTO smtp_settings (id, server, port, username, password, from_email, from_name, updated_by, updated_at)
+            VALUES (1, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                server = excluded.server, port = excluded.port, username = excluded.username,
+                password = COALESCE(NULLIF(excluded.password, ''), smtp_settings.password),
+                from_email = excluded.from_email, from_name = excluded.from_name,
+                updated_by = excluded.updated_by, updated_at = excluded.updated_at
+        ''', (server, int(port), username, password or '', from_email, from_name, updated_by, time.time()))
         conn.commit()
         conn.close()
+    
+    def get_participant_summaries(self, session_date=None, attended_only=True):
+        """Estadísticas de cada participante suscrito hasta una sesión, en una sola consulta
+
+        Con attended_only (por defecto) solo se incluyen los indicativos que
+        reportaron en esa sesión; si es False, todos los que han reportado alguna
+        vez (los ausentes con current_streak = 0).
+        Para cada indicativo con correo y al menos un reporte calcula check_ins
+        (sesiones con reporte), current_streak (sesiones consecutivas hasta la
+        última), longest_streak, rank (por check_ins, empates con el mismo lugar)
+        y participants. Las rachas se obtienen agrupando las sesiones
+        consecutivas: el índice de sesión menos el número de fila del indicativo
+        es constante dentro de cada racha. Sin fecha se usa la última sesión.
+        """
+        conn = sqlite3.connect(self.db_path)
+        df = pd.read_sql_query('''
+            WITH sesiones AS (
+                SELECT session_date, ROW_NUMBER() OVER (ORDER BY session_date) AS idx
+                FROM (SELECT DISTINCT session_date FROM reports WHERE session_date <= ?)
+            ),
+            asistencia AS (
+                SELECT DISTINCT r.call_sign, s.idx
+                FROM reports r JOIN sesiones s ON s.session_date = r.session_date
+            ),
+            islas AS (
+                SELECT call_sign, idx, idx - ROW_NUMBER() OVER (PARTITION BY call_sign ORDER BY idx) AS grupo
+                FROM asistencia
+            ),
+            rachas AS (
+                SELECT call_sign, COUNT(*) AS largo, MAX(idx) AS ultima
+                FROM islas GROUP BY call_sign, grupo
+            ),
+            totales AS (
+                SELECT call_sign, SUM(largo) AS check_ins, MAX(largo) AS longest_streak,
+                       MAX(CASE WHEN ultima = (SELECT MAX(idx) FROM sesiones) THEN largo ELSE 0 END) AS current_streak
+                FROM rachas GROUP BY call_sign
+            ),
+            ranking AS (
+                SELECT *, RANK() OVER (ORDER BY check_ins DESC) AS rank, COUNT(*) OVER () AS participants
+                FROM totales
+            )
+            SELECT c.call_sign, c.email,
+                   COALESCE(c.name, (SELECT operator_name FROM reports r
+                                     WHERE r.call_sign = c.call_sign ORDER BY r.id DESC LIMIT 1)) AS name,
+                   k.check_ins, k.current_streak, k.longest_streak, k.rank, k.participants,
+                   (SELECT COUNT(*) FROM sesiones) AS total_sessions,
+                   (SELECT MAX(session_date) FROM sesiones) AS session_date
+            FROM participant_contacts c
+            JOIN ranking k ON k.call_sign = c.call_sign
+            WHERE c.subscribed = 1 AND (k.current_streak > 0 OR NOT ?)
+            ORDER BY k.rank, c.call_sign
+        ''', conn, params=(str(session_date) if session_date else '9999-12-31', int(attended_only)))
+        conn.close()
+        return df
+    
+    def create_reset_token(self, username, ttl_seconds=None):
+        """Genera un token de recuperación para el usuario; retorna el token en claro
+
+        Solo se guarda su huella, así que una copia de la base de datos no permite
+        usar tokens vigentes. La tabla es compartida por todos los procesos.
+        """
+        token = secrets.token_urlsafe(32)
+        now = time.time()
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO password_reset_tokens (token_hash, username, created_at, expires_at)
+            VALUES (?, ?, ?, ?)
+        ''', (token_digest(token), username, now, now + (ttl_seconds or RESET_TOKEN_TTL)))
+        conn.commit()
+        conn.close()
+        
+        if now - self._last_token_purge >= RESET_TOKEN_PURGE_INTERVAL:
+            self.purge_expired_reset_tokens()
+        return token
+    
+    def validate_reset_token(self, token):
+        """Retorna el usuario de un token vigente y sin usar (None si no lo es), sin consumirlo"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT username FROM password_reset_tokens
+            WHERE token_hash = ? AND used_at IS NULL AND expires_at > ?
+        ''', (token_digest(token or ''), time.time()))
+        row = cursor.fetchone()
+        conn.close()
+        return row[0] if row else None
+    
+    def consume_reset_token(self, token):
+        """Marca el token como usado y retorna su usuario, en una sola sentencia
+
+        Si dos procesos intentan usar el mismo token, solo uno obtiene el usuario.
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        now = time.time()
+        cursor.execute('''
+            UPDATE password_reset_tokens SET used_at = ?
+            WHERE token_hash = ? AND used_at IS NULL AND expires_at > ?
+            RETURNING username
+        ''', (now, token_digest(token or ''), now))
+        row = cursor.fetchone()
+        conn.commit()
+        conn.close()
+        return row[0] if row else None
+    
+    def purge_expired_reset_tokens(self):
+        """Elimina los tokens vencidos (usados o no); retorna cuántos"""
+        now = time.time()
+        self._last_token_purge = now
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM password_reset_tokens WHERE expires_at <= ?", (now,))
+        conn.commit()
+        conn.close()
+        return cursor.rowcount
+    
+    def update_last_login(self, username):
+        """Registra la última fecha de login del usuario
+
+        La escritura se difiere: el valor queda en un búfer (y en el perfil en
+        caché) y flush_last_logins lo guarda en bloque a lo más
+        LAST_LOGIN_FLUSH_INTERVAL segundos después.
+        """
+        # Mismo formato UTC que CURRENT_TIMESTAMP
+        last_login = datetime.now(pytz.utc).strftime('%Y-%m-%d %H:%M:%S')
+        with self._user_cache_lock:
+            self._pending_logins[username] = last_login
+            _instances_with_pending_logins.add(self)
+            entry = self._user_cache.get(username)
+            if entry is not None:
+                entry[1]['last_login'] = last_login
+            self._schedule_login_flush()
+    
+    def _schedule_login_flush(self):
+        """Programa flush_last_logins si no hay uno pendiente (llamar con _user_cache_lock)"""
+        if self._login_flush_timer is None:
+            self._login_flush_timer = threading.Timer(LAST_LOGIN_FLUSH_INTERVAL, self.flush_last_logins)
+            self._login_flush_timer.daemon = True
+            self._login_flush_timer.start()
+    
+    def flush_last_logins(self):
+        """Escribe en una sola transacción los last_login pendientes; retorna cuántos se guardaron"""
+        with self._user_cache_lock:
+            pending = self._pending_logins
+            self._pending_logins = {}
+            if self._login_flush_timer is not None:
+                self._login_flush_timer.cancel()
+                self._login_flush_timer = None
+        if not pending:
+            return 0
+        
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.executemany("UPDATE users SET last_login = ? WHERE username = ?",
+                               [(last_login, username) for username, last_login in pending.items()])
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            logger.warning("Error al guardar %d last_login pendientes; se reintentará: %s", len(pending), e)
+            with self._user_cache_lock:
+                # Conservar los pendientes salvo que ya exista uno más reciente, y reintentar
+                for username, last_login in pending.items():
+                    self._pending_logins.setdefault(username, last_login)
+                _instances_with_pending_logins.add(self)
+                self._schedule_login_flush()
+            return 0
+        return len(pending)
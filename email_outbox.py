@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Entrega en segundo plano de la bandeja de salida de correo (tabla email_outbox)
+Uso independiente: python email_outbox.py [ruta_base_de_datos]
+"""
+
+import os
+import random
+import sys
+import threading
+import time
+
+# Reintentos: espera base (segundos) que se duplica en cada intento, con tope, y
+# número máximo de intentos antes de pasar el correo a 'dead'
+OUTBOX_BASE_DELAY = float(os.getenv('OUTBOX_BASE_DELAY', '30'))
+OUTBOX_MAX_DELAY = float(os.getenv('OUTBOX_MAX_DELAY', '3600'))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', '6'))
+
+OUTBOX_POLL_INTERVAL = float(os.getenv('OUTBOX_POLL_INTERVAL', '5'))
+OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', '50'))
+
+# Reserva mínima de un lote (segundos); se amplía a lo que puede tardar su envío
+OUTBOX_MIN_LEASE = float(os.getenv('OUTBOX_MIN_LEASE', '300'))
+
+# Cada cuánto se descartan los correos con credenciales que llevan demasiado sin enviarse (segundos)
+OUTBOX_EXPIRE_INTERVAL = float(os.getenv('OUTBOX_EXPIRE_INTERVAL', '600'))
+
+
+def retry_delay(attempts, base_delay=OUTBOX_BASE_DELAY, max_delay=OUTBOX_MAX_DELAY):
+    """Espera antes del siguiente intento: exponencial con tope y ±20 % de variación"""
+    delay = min(max_delay, base_delay * 2 ** max(attempts - 1, 0))
+    return delay * random.uniform(0.8, 1.2)
+
+
+class EmailOutboxWorker:
+    """Hilo que entrega los correos encolados en email_outbox
+
+    enqueue() solo inserta en SQLite y despierta al hilo, así que la página que
+    lo llama no espera al servidor SMTP. Cada lote reclamado se envía con
+    EmailService.send_bulk; los fallos se reprograman con espera exponencial y
+    al agotar OUTBOX_MAX_ATTEMPTS quedan en 'dead' para revisión manual.
+    """
+
+    def __init__(self, db, email_service, poll_interval=OUTBOX_POLL_INTERVAL,
+                 batch_size=OUTBOX_BATCH_SIZE, max_attempts=OUTBOX_MAX_ATTEMPTS):
+        self.db = db
+        self.email_service = email_service
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._next_expiry = 0.0
+
+    def enqueue(self, to_email, subject, body_html, body_text=None, kind=None):
+        """Encola un correo; retorna su id"""
+        return self.enqueue_many([{
+            'to_email': to_email,
+            'subject': subject,
+            'body_html': body_html,
+            'body_text': body_text,
+        }], kind)[0]
+
+    def enqueue_many(self, messages, kind=None):
+        """Encola varios correos en una sola transacción; retorna sus ids"""
+        ids = self.db.enqueue_emails(messages, kind)
+        self._wake.set()
+        return ids
+
+    def wake(self):
+        """Pide al hilo revisar la cola de inmediato (por ejemplo, tras reintentar correos)"""
+        self._wake.set()
+
+    def deliver_once(self):
+        """Reclama y entrega un lote; retorna (enviados, fallidos)"""
+        # También sin SMTP configurado, para no conservar credenciales indefinidamente
+        if time.time() >= self._next_expiry:
+            self._next_expiry = time.time() + OUTBOX_EXPIRE_INTERVAL
+            self.db.expire_outbox_credentials()
+        # Tomar la configuración SMTP que un administrador haya guardado desde otra sesión o proceso
+        self.email_service.reload_settings()
+        if not self.email_service.is_configured():
+            return 0, 0
+        # La reserva debe durar más que el peor envío del lote, o otro proceso lo reclamaría a medias
+        lease_seconds = max(OUTBOX_MIN_LEASE, self.email_service.bulk_send_bound(self.batch_size))
+        batch = self.db.claim_outbox_batch(self.batch_size, lease_seconds)
+        if not batch:
+            return 0, 0
+
+        results = self.email_service.send_bulk(batch)
+        sent_ids = []
+        failures = []
+        for message, (success, error) in zip(batch, results):
+            if success:
+                sent_ids.append(message['id'])
+            else:
+                attempts = message['attempts'] + 1
+                next_attempt_at = time.time() + retry_delay(attempts) if attempts < self.max_attempts else None
+                failures.append((message['id'], error, next_attempt_at))
+        if sent_ids:
+            self.db.mark_outbox_sent(sent_ids)
+        if failures:
+            self.db.mark_outbox_failed(failures)
+        return len(sent_ids), len(failures)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                sent, failed = self.deliver_once()
+            except Exception as e:
+                print(f"❌ Error en la bandeja de salida de correo: {e}")
+                sent = failed = 0
+            if sent + failed < self.batch_size:
+                # Lote incompleto: no quedan correos vencidos, esperar nuevos o el siguiente sondeo
+                self._wake.wait(self.poll_interval)
+
+    def start(self):
+        """Inicia el hilo de entrega (una sola vez)"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='email-outbox', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+def main():
+    from database import FMREDatabase
+    from email_service import EmailService
+
+    db_path = sys.argv[1] if len(sys.argv) > 1 else "fmre_reports.db"
+    db = FMREDatabase(db_path)
+    email_service = EmailService(db)
+    if not email_service.is_configured():
+        print("❌ Servicio de email no configurado (SMTP_SERVER, SMTP_USERNAME, SMTP_PASSWORD o desde la aplicación)")
+        return 1
+    worker = EmailOutboxWorker(db, email_service).start()
+    print(f"📤 Entregando la bandeja de salida de {db_path} (Ctrl+C para salir)")
+    try:
+        while True:
+            time.sleep(60)
+            stats = worker.db.get_outbox_stats()
+            print(f"Pendientes {stats['pending']} | enviados {stats['sent']} | dead {stats['dead']}")
+    except KeyboardInterrupt:
+        worker.stop(timeout=30)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,20 @@
-import smtplib
-import ssl
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from datetime import datetime, timedelta
-import secrets
+from datetime import datetime
 import hashlib
 import os
-from typing import Optional, Dict, Any
+import time
+from typing import Optional, Dict, Any, List, Tuple
+
+from smtp_pool import discard_smtp_pool, get_smtp_pool
+
+# Dirección pública de la aplicación para los enlaces de los correos
+APP_URL = os.getenv('APP_URL', 'http://localhost:8501')
 
 class EmailService:
     """Servicio de correo electrónico para el sistema FMRE"""
     
-    def __init__(self):
+    def __init__(self, db=None):
         # Configuración SMTP (se puede configurar via variables de entorno)
         self.smtp_server = os.getenv('SMTP_SERVER', 'smtp.gmail.com')
         self.smtp_port = int(os.getenv('SMTP_PORT', '587'))
@@ -20,30 +23,63 @@ class EmailService:
         self.from_email = os.getenv('FROM_EMAIL', self.smtp_username)
         self.from_name = os.getenv('FROM_NAME', 'Sistema FMRE')
         
-        # Tokens de recuperación (en producción usar Redis o base de datos)
-        self.reset_tokens = {}
+        # Base de datos con los tokens de recuperación y la configuración SMTP guardada
+        # (compartidos entre procesos); la configuración guardada reemplaza a la del entorno
+        self._db = db
+        self.updated_by = None
+        self._settings_stamp = None
+        self.reload_settings()
+    
+    def configure_smtp(self, server: str, port: int, username: str, password: str, from_email: str = None, from_name: str = None, updated_by: str = None):
+        """Configura los parámetros SMTP
+
+        Con base de datos la configuración se guarda para todo el sistema: la usan
+        todas las sesiones, la bandeja de salida y los demás procesos.
+        """
+        from_email = from_email or username
+        from_name = from_name or 'Sistema FMRE'
+        if self._db is not None:
+            self._db.save_smtp_settings(server, port, username, password, from_email, from_name, updated_by)
+            self.reload_settings()
+            return
+        self._apply(server, port, username, password or self.smtp_password, from_email, from_name)
     
-    def configure_smtp(self, server: str, port: int, username: str, password: str, from_email: str = None, from_name: str = None):
-        """Configura los parámetros SMTP"""
+    def reload_settings(self) -> bool:
+        """Aplica la configuración SMTP guardada si cambió desde la última lectura; retorna si cambió"""
+        settings = self._db.get_smtp_settings() if self._db is not None else None
+        if settings is None or settings['updated_at'] == self._settings_stamp:
+            return False
+        self._settings_stamp = settings['updated_at']
+        self.updated_by = settings['updated_by']
+        self._apply(settings['server'], settings['port'], settings['username'], settings['password'],
+                    settings['from_email'], settings['from_name'])
+        return True
+    
+    def _apply(self, server, port, username, password, from_email, from_name):
+        """Cambia la configuración en memoria y cierra el pool de la anterior"""
+        previous = (self.smtp_server, self.smtp_port, self.smtp_username, self.smtp_password)
         self.smtp_server = server
-        self.smtp_port = port
+        self.smtp_port = int(port)
         self.smtp_username = username
-        if password:  # Solo actualizar si se proporciona nueva contraseña
-            self.smtp_password = password
+        self.smtp_password = password
         self.from_email = from_email or username
         self.from_name = from_name or 'Sistema FMRE'
+        if previous != (self.smtp_server, self.smtp_port, self.smtp_username, self.smtp_password):
+            # El siguiente envío crea un pool nuevo; las conexiones de la configuración anterior se cierran
+            discard_smtp_pool(*previous)
+    
+    def _pool(self):
+        """Pool de conexiones SMTP autenticadas del proceso para la configuración actual"""
+        return get_smtp_pool(self.smtp_server, self.smtp_port, self.smtp_username, self.smtp_password)
     
     def test_smtp_connection(self) -> bool:
-        """Prueba la conexión SMTP"""
+        """Prueba la conexión SMTP (reutiliza la sesión del pool si ya está abierta)"""
         if not self.is_configured():
             return False
         
         try:
-            import ssl
-            context = ssl.create_default_context()
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls(context=context)
-                server.login(self.smtp_username, self.smtp_password)
+            with self._pool().connection() as connection:
+                connection.smtp.noop()
             return True
         except Exception as e:
             print(f"Error en conexión SMTP: {str(e)}")
@@ -60,26 +96,8 @@ class EmailService:
             return False
         
         try:
-            # Crear mensaje
-            message = MIMEMultipart("alternative")
-            message["Subject"] = subject
-            message["From"] = f"{self.from_name} <{self.from_email}>"
-            message["To"] = to_email
-            
-            # Agregar contenido
-            if body_text:
-                text_part = MIMEText(body_text, "plain", "utf-8")
-                message.attach(text_part)
-            
-            html_part = MIMEText(body_html, "html", "utf-8")
-            message.attach(html_part)
-            
-            # Enviar email
-            context = ssl.create_default_context()
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls(context=context)
-                server.login(self.smtp_username, self.smtp_password)
-                server.sendmail(self.from_email, to_email, message.as_string())
+            # Enviar por una conexión autenticada del pool
+            self._pool().send(self.from_email, to_email, self._build_message(to_email, subject, body_html, body_text))
             
             print(f"✅ Email enviado a {to_email}")
             return True
@@ -88,8 +106,54 @@ class EmailService:
             print(f"❌ Error enviando email: {str(e)}")
             return False
     
+    def _build_message(self, to_email: str, subject: str, body_html: str, body_text: str = None) -> str:
+        """Construye el mensaje MIME (texto opcional + HTML) serializado"""
+        message = MIMEMultipart("alternative")
+        message["Subject"] = subject
+        message["From"] = f"{self.from_name} <{self.from_email}>"
+        message["To"] = to_email
+        
+        # Agregar contenido
+        if body_text:
+            message.attach(MIMEText(body_text, "plain", "utf-8"))
+        message.attach(MIMEText(body_html, "html", "utf-8"))
+        return message.as_string()
+    
+    def bulk_send_bound(self, count: int) -> float:
+        """Segundos que puede tardar, en el peor caso, send_bulk con `count` correos"""
+        if not self.is_configured():
+            return 0.0
+        return self._pool().bulk_send_bound(count)
+    
+    def send_bulk(self, messages: List[Dict[str, Any]]) -> List[Tuple[bool, Optional[str]]]:
+        """Envía muchos correos reutilizando pocas conexiones SMTP
+
+        Cada mensaje es un diccionario con to_email, subject, body_html y
+        opcionalmente body_text. Retorna una lista alineada de (éxito, error).
+        """
+        if not self.is_configured():
+            print("⚠️ Servicio de email no configurado")
+            return [(False, "Servicio de email no configurado")] * len(messages)
+        
+        start = time.perf_counter()
+        errors = self._pool().send_bulk(
+            (self.from_email, message['to_email'],
+             self._build_message(message['to_email'], message['subject'], message['body_html'], message.get('body_text')))
+            for message in messages
+        )
+        sent = sum(error is None for error in errors)
+        print(f"✅ {sent}/{len(errors)} emails enviados en {time.perf_counter() - start:.1f}s")
+        for message, error in zip(messages, errors):
+            if error is not None:
+                print(f"❌ Error enviando email a {message['to_email']}: {error}")
+        return [(error is None, error) for error in errors]
+    
     def send_welcome_email(self, user_data: Dict[str, Any], password: str) -> bool:
         """Envía email de bienvenida con credenciales"""
+        return self.send_email(**self.welcome_message(user_data, password))
+    
+    def welcome_message(self, user_data: Dict[str, Any], password: str) -> Dict[str, Any]:
+        """Construye el email de bienvenida (to_email, subject, body_html, body_text) para enviar o encolar"""
         subject = "🎉 Bienvenido al Sistema FMRE - Credenciales de Acceso"
         
         html_body = f"""
@@ -171,44 +235,45 @@ class EmailService:
         Sistema FMRE - {datetime.now().strftime('%d/%m/%Y %H:%M')}
         """
         
-        return self.send_email(user_data['email'], subject, html_body, text_body)
+        return {
+            'to_email': user_data['email'],
+            'subject': subject,
+            'body_html': html_body,
+            'body_text': text_body,
+        }
+    
+    @property
+    def db(self):
+        if self._db is None:
+            from database import FMREDatabase
+            self._db = FMREDatabase()
+        return self._db
     
     def generate_reset_token(self, username: str) -> str:
-        """Genera un token de recuperación de contraseña"""
-        token = secrets.token_urlsafe(32)
-        expires_at = datetime.now() + timedelta(hours=1)  # Token válido por 1 hora
-        
-        self.reset_tokens[token] = {
-            'username': username,
-            'expires_at': expires_at,
-            'used': False
-        }
-        
-        return token
+        """Genera un token de recuperación de contraseña (válido 1 hora, un solo uso)"""
+        return self.db.create_reset_token(username)
     
     def validate_reset_token(self, token: str) -> Optional[str]:
         """Valida un token de recuperación y retorna el username si es válido"""
-        if token not in self.reset_tokens:
-            return None
-        
-        token_data = self.reset_tokens[token]
-        
-        if token_data['used'] or datetime.now() > token_data['expires_at']:
-            return None
-        
-        return token_data['username']
+        return self.db.validate_reset_token(token)
     
     def use_reset_token(self, token: str) -> bool:
-        """Marca un token como usado"""
-        if token in self.reset_tokens:
-            self.reset_tokens[token]['used'] = True
-            return True
-        return False
+        """Marca un token como usado (falla si ya se usó o expiró)"""
+        return self.db.consume_reset_token(token) is not None
     
     def send_password_reset_email(self, user_data: Dict[str, Any]) -> Optional[str]:
         """Envía email de recuperación de contraseña"""
         token = self.generate_reset_token(user_data['username'])
-        reset_url = f"http://localhost:8501?reset_token={token}"
+        success = self.send_password_recovery_email(user_data, token)
+        return token if success else None
+    
+    def send_password_recovery_email(self, user_data: Dict[str, Any], token: str) -> bool:
+        """Envía el email de recuperación para un token ya generado"""
+        return self.send_email(**self.password_reset_message(user_data, token))
+    
+    def password_reset_message(self, user_data: Dict[str, Any], token: str) -> Dict[str, Any]:
+        """Construye el email de recuperación (to_email, subject, body_html, body_text) para enviar o encolar"""
+        reset_url = f"{APP_URL}?reset_token={token}"
         
         subject = "🔐 Recuperación de Contraseña - Sistema FMRE"
         
@@ -282,5 +347,9 @@ class EmailService:
         Sistema FMRE - {datetime.now().strftime('%d/%m/%Y %H:%M')}
         """
         
-        success = self.send_email(user_data['email'], subject, html_body, text_body)
-        return token if success else None
+        return {
+            'to_email': user_data['email'],
+            'subject': subject,
+            'body_html': html_body,
+            'body_text': text_body,
+        }
@@ -0,0 +1,162 @@
+import re
+
+import numpy as np
+import pandas as pd
+import pytz
+
+# Zona horaria de México (Centro)
+MEXICO_TZ = pytz.timezone('America/Mexico_City')
+
+# Columnas de la tabla de reportes del PDF: (encabezado, columna, valor por defecto)
+# Un valor por defecto None indica que la columna se muestra tal cual.
+REPORT_TABLE_COLUMNS = [
+    ('Indicativo', 'call_sign', None),
+    ('Operador', 'operator_name', None),
+    ('Estado', 'region', 'N/A'),
+    ('Ciudad', 'ciudad', 'N/A'),
+    ('Zona', 'zona', None),
+    ('Sistema', 'sistema', None),
+    ('Frecuencia', 'hf_frequency', '-'),
+    ('Modo', 'hf_mode', '-'),
+    ('Potencia', 'hf_power', '-'),
+    ('Señal', 'signal_report', None),
+    ('Grid', 'grid_locator', 'N/A'),
+    ('Observaciones', 'observations', '-'),
+]
+
+# Orden de columnas para Excel incluyendo campos HF
+EXCEL_COLUMN_ORDER = ['call_sign', 'operator_name', 'qth', 'ciudad', 'zona', 'sistema', 'hf_frequency', 'hf_mode', 'hf_power', 'signal_report', 'grid_locator', 'observations', 'timestamp']
+
+PDF_TIMESTAMP_FORMAT = '%d/%m/%Y %H:%M'
+CSV_TIMESTAMP_FORMAT = '%d/%m/%Y %H:%M:%S'
+
+# Posición de cada campo dentro de 'YYYY-MM-DDTHH:MM:SS'
+_ISO_SLICES = {'%Y': (0, 4), '%m': (5, 7), '%d': (8, 10), '%H': (11, 13), '%M': (14, 16), '%S': (17, 19)}
+_FORMAT_TOKENS = re.compile(r'(%[A-Za-z%])')
+
+
+def to_mexico_time(values):
+    """Convierte una serie de timestamps a datetime en hora de la Ciudad de México
+
+    Los timestamps sin zona horaria se guardan con datetime('now', 'localtime'),
+    por lo que se consideran ya expresados en hora de México.
+    """
+    parsed = pd.to_datetime(values, errors='coerce')
+    if getattr(parsed.dt, 'tz', None) is not None:
+        parsed = parsed.dt.tz_convert(MEXICO_TZ)
+    return parsed
+
+
+def _strftime(parsed, fmt):
+    """Formatea datetimes recortando la representación ISO cuando el formato lo permite
+
+    dt.strftime llama a Python por cada valor; para formatos compuestos solo por
+    %Y %m %d %H %M %S basta con rebanar la cadena ISO generada por NumPy.
+    """
+    parts = [part for part in _FORMAT_TOKENS.split(fmt) if part]
+    if any('%' in part and part not in _ISO_SLICES for part in parts):
+        return parsed.dt.strftime(fmt)
+    if getattr(parsed.dt, 'tz', None) is not None:
+        parsed = parsed.dt.tz_localize(None)
+    iso = pd.Series(np.datetime_as_string(parsed.to_numpy(dtype='datetime64[s]'), unit='s'), index=parsed.index)
+    result = None
+    for part in parts:
+        piece = iso.str.slice(*_ISO_SLICES[part]) if part in _ISO_SLICES else part
+        result = piece if result is None else result + piece
+    return result.where(parsed.notna())
+
+
+def format_timestamps(values, fmt=CSV_TIMESTAMP_FORMAT, fallback='-'):
+    """Formatea una serie de timestamps en hora de México en una sola pasada
+
+    Solo se formatean los valores distintos (en una sesión muchos reportes
+    comparten minuto) y el resultado se expande con los códigos de factorize.
+    """
+    values = pd.Series(values)
+    if values.empty:
+        return pd.Series([], index=values.index, dtype=object)
+    codes, uniques = pd.factorize(values)
+    formatted = _strftime(to_mexico_time(pd.Series(uniques)), fmt)
+    formatted = formatted.where(formatted.notna(), fallback).to_numpy(dtype=object)
+    # factorize marca los nulos con -1
+    result = np.full(len(values), fallback, dtype=object)
+    valid = codes >= 0
+    result[valid] = formatted[codes[valid]]
+    return pd.Series(result, index=values.index, dtype=object)
+
+
+def with_fallback(df, column, fallback):
+    """Obtiene una columna como texto sustituyendo nulos y vacíos por el valor por defecto"""
+    if column not in df.columns:
+        return pd.Series(fallback, index=df.index, dtype=object)
+    series = df[column]
+    if fallback is None:
+        return series.astype(object)
+    empty = series.isna() | (series.astype(str).str.strip() == '')
+    return series.astype(object).where(~empty, fallback)
+
+
+def build_report_matrix(df, columns=REPORT_TABLE_COLUMNS, numbered=True, timestamp_format=PDF_TIMESTAMP_FORMAT):
+    """Construye la matriz de presentación de reportes con operaciones de columna
+
+    Retorna un DataFrame de textos (numeración, valores por defecto y fecha/hora
+    formateada) listo para convertirse en filas de tabla.
+    """
+    data = {}
+    if numbered:
+        data['#'] = np.arange(1, len(df) + 1).astype(str)
+    for header, column, fallback in columns:
+        data[header] = with_fallback(df, column, fallback).to_numpy(dtype=object)
+    if timestamp_format:
+        if 'timestamp' in df.columns:
+            data['Fecha/Hora'] = format_timestamps(df['timestamp'], timestamp_format).to_numpy(dtype=object)
+        else:
+            data['Fecha/Hora'] = np.full(len(df), '-', dtype=object)
+    return pd.DataFrame(data, index=df.index)
+
+
+def prepare_csv_frame(df):
+    """Prepara el DataFrame para CSV con timestamps formateados en hora de México"""
+    export_df = df.copy()
+    if 'timestamp' in export_df.columns:
+        export_df['timestamp'] = format_timestamps(export_df['timestamp'], CSV_TIMESTAMP_FORMAT, fallback='')
+    return export_df
+
+
+def prepare_ndjson_frame(df):
+    """Prepara el DataFrame para NDJSON: timestamps ISO 8601 en hora de México y nulos como null"""
+    export_df = df.copy()
+    if 'timestamp' in export_df.columns:
+        export_df['timestamp'] = format_timestamps(export_df['timestamp'], '%Y-%m-%dT%H:%M:%S', fallback=None)
+    return export_df.astype(object).where(export_df.notna(), None)
+
+
+def prepare_excel_frame(df, column_order=EXCEL_COLUMN_ORDER):
+    """Prepara el DataFrame para Excel: proyección de columnas y timestamps como fecha"""
+    existing_columns = [col for col in column_order if col in df.columns]
+    export_df = df[existing_columns].copy()
+    if 'timestamp' in export_df.columns:
+        timestamps = to_mexico_time(export_df['timestamp'])
+        # openpyxl no admite fechas con zona horaria
+        if getattr(timestamps.dt, 'tz', None) is not None:
+            timestamps = timestamps.dt.tz_localize(None)
+        export_df['timestamp'] = timestamps
+    return export_df
+
+
+def column_widths(df, max_width=50, padding=2):
+    """Calcula el ancho de cada columna (encabezado incluido) sin recorrer celdas"""
+    widths = {}
+    for column in df.columns:
+        # Con pandas 3 astype(str) conserva los nulos; cuentan como celdas vacías
+        lengths = df[column].astype(str).str.len().fillna(0)
+        longest = max(len(str(column)), int(lengths.max()) if len(lengths) else 0)
+        widths[column] = min(longest + padding, max_width)
+    return widths
+
+
+def series_to_dict(df, key_column, value_column):
+    """Convierte dos columnas de un DataFrame en diccionario sin iterrows"""
+    if df is None or df.empty:
+        return {}
+    return dict(zip(df[key_column].tolist(), df[value_column].tolist()))
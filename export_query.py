@@ -0,0 +1,123 @@
+from datetime import date, datetime
+
+# Columnas de la tabla reports que se pueden exportar
+REPORT_COLUMNS = [
+    'id', 'call_sign', 'operator_name', 'qth', 'ciudad', 'signal_report', 'zona', 'sistema',
+    'grid_locator', 'hf_frequency', 'hf_band', 'hf_mode', 'hf_power', 'observations',
+    'session_date', 'timestamp', 'region', 'signal_quality'
+]
+
+# Columnas que necesita la tabla del PDF
+PDF_COLUMNS = [
+    'call_sign', 'operator_name', 'region', 'ciudad', 'zona', 'sistema', 'hf_frequency',
+    'hf_mode', 'hf_power', 'signal_report', 'grid_locator', 'observations', 'timestamp'
+]
+
+
+def _as_date_text(value):
+    """Normaliza una fecha a texto 'YYYY-MM-DD' como se guarda session_date"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (date, datetime)):
+        return value.strftime('%Y-%m-%d')
+    return str(value)
+
+
+def _prefix_upper_bound(prefix):
+    """Límite superior exclusivo para buscar un prefijo con un rango indexable"""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class ExportQuery:
+    """Especificación de exportación que se compila a una sola consulta SQL
+
+    Los filtros (rango de fechas, zonas, sistemas e indicativos) y la proyección
+    de columnas se resuelven en SQLite, de modo que solo se leen las filas y
+    columnas solicitadas. Un indicativo terminado en '*' (ej: XE2*) se trata
+    como prefijo y se traduce a un rango sobre el índice de call_sign.
+    """
+
+    def __init__(self, start_date=None, end_date=None, zonas=None, sistemas=None,
+                 call_signs=None, columns=None, sort_by='timestamp', descending=True, limit=None):
+        self.start_date = _as_date_text(start_date)
+        self.end_date = _as_date_text(end_date)
+        self.zonas = [z for z in (zonas or []) if z]
+        self.sistemas = [s for s in (sistemas or []) if s]
+        self.call_signs = [c.strip().upper() for c in (call_signs or []) if c and c.strip()]
+        self.columns = list(columns) if columns else None
+        self.sort_by = sort_by
+        self.descending = descending
+        self.limit = limit
+
+        invalid = [col for col in (self.columns or []) + [self.sort_by] if col not in REPORT_COLUMNS]
+        if invalid:
+            raise ValueError(f"Columnas no válidas para exportación: {', '.join(invalid)}")
+
+    @classmethod
+    def for_session(cls, session_date, **kwargs):
+        """Especificación para una sola fecha de sesión"""
+        return cls(start_date=session_date, end_date=session_date, **kwargs)
+
+    @staticmethod
+    def parse_call_signs(text):
+        """Convierte texto separado por comas, espacios o saltos de línea en lista de indicativos"""
+        if not text:
+            return []
+        return [part for part in text.replace(',', ' ').split() if part]
+
+    def is_filtered(self):
+        """Indica si la especificación restringe filas"""
+        return bool(self.start_date or self.end_date or self.zonas or self.sistemas or self.call_signs)
+
+    def where_clause(self):
+        """Compila los filtros a una cláusula WHERE con parámetros"""
+        conditions = []
+        params = []
+
+        if self.start_date and self.start_date == self.end_date:
+            conditions.append("session_date = ?")
+            params.append(self.start_date)
+        else:
+            if self.start_date:
+                conditions.append("session_date >= ?")
+                params.append(self.start_date)
+            if self.end_date:
+                conditions.append("session_date <= ?")
+                params.append(self.end_date)
+
+        if self.zonas:
+            conditions.append(f"zona IN ({', '.join('?' for _ in self.zonas)})")
+            params.extend(self.zonas)
+
+        if self.sistemas:
+            conditions.append(f"sistema IN ({', '.join('?' for _ in self.sistemas)})")
+            params.extend(self.sistemas)
+
+        if self.call_signs:
+            exact = [c for c in self.call_signs if not c.endswith('*')]
+            prefixes = [c[:-1] for c in self.call_signs if c.endswith('*') and len(c) > 1]
+            call_conditions = []
+            if exact:
+                call_conditions.append(f"call_sign IN ({', '.join('?' for _ in exact)})")
+                params.extend(exact)
+            for prefix in prefixes:
+                call_conditions.append("(call_sign >= ? AND call_sign < ?)")
+                params.extend([prefix, _prefix_upper_bound(prefix)])
+            if call_conditions:
+                conditions.append("(" + " OR ".join(call_conditions) + ")")
+
+        if not conditions:
+            return "", ()
+        return " WHERE " + " AND ".join(conditions), tuple(params)
+
+    def to_sql(self):
+        """Compila la especificación completa a (consulta, parámetros)"""
+        # Sin proyección se listan las columnas de REPORT_COLUMNS para excluir las columnas generadas
+        select_columns = ", ".join(self.columns or REPORT_COLUMNS)
+        where_clause, params = self.where_clause()
+        direction = "DESC" if self.descending else "ASC"
+        query = f"SELECT {select_columns} FROM reports{where_clause} ORDER BY {self.sort_by} {direction}, id {direction}"
+        if self.limit:
+            query += " LIMIT ?"
+            params = params + (int(self.limit),)
+        return query, params
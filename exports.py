@@ -1,75 +1,123 @@
 from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter, landscape
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak, Image, KeepTogether
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import Table, TableStyle, Paragraph, Spacer, PageBreak
 from reportlab.lib.units import inch
 from reportlab.platypus import PageTemplate, Frame, BaseDocTemplate, NextPageTemplate
 from reportlab.lib.colors import HexColor
 from datetime import datetime
+import contextlib
+import gzip
+import numpy as np
 import pandas as pd
+import hashlib
 import io
+import json
+import logging
+import multiprocessing
 import os
+import pickle
+import tempfile
+import threading
+import zipfile
 import pytz
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from openpyxl.utils import get_column_letter
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from asset_registry import get_asset_registry
+from export_prep import build_report_matrix, prepare_csv_frame, prepare_ndjson_frame, prepare_excel_frame, column_widths, series_to_dict
+
+logger = logging.getLogger(__name__)
+
+class MixedOrientationDoc(BaseDocTemplate):
+    """Documento con página vertical (resumen) y horizontal (tabla de reportes)"""
+    def __init__(self, filename, exporter_instance=None, **kwargs):
+        BaseDocTemplate.__init__(self, filename, **kwargs)
+        self.exporter = exporter_instance
+        
+        # Geometría precalculada por el registro de recursos
+        templates = []
+        for template_id, layout in get_asset_registry().page_layouts.items():
+            frame = Frame(*layout['frame'], **layout['frame_kwargs'])
+            templates.append(PageTemplate(id=template_id, frames=[frame],
+                                          pagesize=layout['pagesize'],
+                                          onPage=self._add_page_number))
+        
+        self.addPageTemplates(templates)
+    
+    def _add_page_number(self, canvas, doc):
+        """Agrega numeración de páginas al pie"""
+        canvas.saveState()
+        
+        # Obtener número de página actual
+        page_num = canvas.getPageNumber()
+        
+        # Solo 1 página si no hay reportes, 2 si hay reportes
+        total_pages = 1 if not (hasattr(self.exporter, '_has_reports') and self.exporter._has_reports) else 2
+        
+        # Posición del número de página (centrado en la parte inferior)
+        canvas.setFont('Helvetica', 8)
+        canvas.setFillColor(colors.gray)
+        
+        # Calcular posición centrada
+        page_width = canvas._pagesize[0]
+        page_text = f"Página {page_num} de {total_pages}"
+        text_width = canvas.stringWidth(page_text, 'Helvetica', 8)
+        x_position = (page_width - text_width) / 2
+        
+        canvas.drawString(x_position, 0.5*inch, page_text)
+        canvas.restoreState()
+
+# Formatos de exportación en streaming: formato -> (extensión, tipo MIME)
+STREAM_FORMATS = {
+    'csv': ('csv', 'text/csv'),
+    'ndjson': ('ndjson', 'application/x-ndjson'),
+}
+
+# Bytes de una exportación por bloques que se mantienen en memoria antes de pasar a disco
+EXPORT_SPOOL_SIZE = int(os.getenv('EXPORT_SPOOL_SIZE', str(8 * 1024 * 1024)))
+
+# Compresiones para exportaciones en streaming: compresión -> (extensión, tipo MIME)
+STREAM_COMPRESSIONS = {
+    'gzip': ('gz', 'application/gzip'),
+    'zstd': ('zst', 'application/zstd'),
+}
+
+
+def available_compressions():
+    """Compresiones disponibles en este servidor (zstd requiere el paquete zstandard)"""
+    return [name for name in STREAM_COMPRESSIONS if name != 'zstd' or zstandard is not None]
+
+
+@contextlib.contextmanager
+def _compressed_writer(buffer, compression=None):
+    """Envuelve un buffer binario con el compresor indicado; se cierra al salir"""
+    if compression is None:
+        yield buffer
+    elif compression == 'gzip':
+        with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=6) as writer:
+            yield writer
+    elif compression == 'zstd':
+        if zstandard is None:
+            raise ValueError("La compresión zstd requiere el paquete 'zstandard'")
+        with zstandard.ZstdCompressor(level=3).stream_writer(buffer, closefd=False) as writer:
+            yield writer
+    else:
+        raise ValueError(f"Compresión no soportada: {compression}")
+
 
 class FMREExporter:
     def __init__(self):
-        self.styles = getSampleStyleSheet()
-        # Colores institucionales FMRE
-        self.colors = {
-            'fmre_green': HexColor('#2E7D32'),
-            'fmre_blue': HexColor('#1565C0'), 
-            'fmre_gray': HexColor('#424242'),
-            'light_gray': HexColor('#F5F5F5'),
-            'white': colors.white,
-            'black': colors.black
-        }
-        self._setup_custom_styles()
+        # Estilos y colores institucionales compartidos por todo el proceso
+        registry = get_asset_registry()
+        self.styles = registry.styles
+        self.colors = registry.colors
     
-    def _setup_custom_styles(self):
-        """Configura estilos personalizados para el reporte"""
-        # Título principal
-        self.styles.add(ParagraphStyle(
-            name='FMRETitle',
-            parent=self.styles['Heading1'],
-            fontSize=18,
-            fontName='Helvetica-Bold',
-            textColor=self.colors['fmre_green'],
-            spaceAfter=20,
-            alignment=1  # Center
-        ))
-        
-        # Subtítulos
-        self.styles.add(ParagraphStyle(
-            name='FMRESubtitle',
-            parent=self.styles['Heading2'],
-            fontSize=14,
-            fontName='Helvetica-Bold',
-            textColor=self.colors['fmre_blue'],
-            spaceAfter=12,
-            spaceBefore=8
-        ))
-        
-        # Texto de estadísticas
-        self.styles.add(ParagraphStyle(
-            name='StatText',
-            parent=self.styles['Normal'],
-            fontSize=11,
-            fontName='Helvetica',
-            textColor=self.colors['fmre_gray'],
-            spaceAfter=6
-        ))
-        
-        # Encabezado institucional
-        self.styles.add(ParagraphStyle(
-            name='InstitutionalHeader',
-            parent=self.styles['Normal'],
-            fontSize=14,
-            fontName='Helvetica-Bold',
-            textColor=self.colors['fmre_green'],
-            alignment=0,
-            spaceAfter=3
-        ))
-        
     def export_to_csv(self, df, filename=None):
         """Exporta DataFrame a CSV"""
         if filename is None:
@@ -79,16 +127,57 @@ class FMREExporter:
             filename = f"reportes_fmre_{now_mx.strftime('%Y%m%d_%H%M%S')}.csv"
         
         # Preparar datos para CSV
-        export_df = df.copy()
-        if 'timestamp' in export_df.columns:
-            export_df['timestamp'] = pd.to_datetime(export_df['timestamp']).dt.strftime('%d/%m/%Y %H:%M:%S')
+        export_df = prepare_csv_frame(df)
         
         csv_buffer = io.StringIO()
         export_df.to_csv(csv_buffer, index=False, encoding='utf-8')
         return csv_buffer.getvalue(), filename
     
-    def export_to_excel(self, df, filename=None):
-        """Exporta DataFrame a Excel"""
+    def export_stream(self, chunks, fmt='csv', compression=None, filename=None):
+        """Exporta bloques de reportes a CSV o NDJSON comprimiendo conforme se generan
+
+        chunks es un iterable de DataFrames (ver FMREDatabase.iter_reports_for_export);
+        cada bloque se formatea y se escribe al compresor de inmediato, así que de los
+        reportes solo se mantiene un bloque en memoria. La salida comprimida va a un
+        archivo temporal que pasa a disco al superar EXPORT_SPOOL_SIZE bytes; quien la
+        sirve (st.download_button) la lee completa, la descarga no es streaming.
+        Retorna (archivo binario al inicio, nombre de archivo, total de reportes).
+        """
+        if fmt not in STREAM_FORMATS:
+            raise ValueError(f"Formato de streaming no soportado: {fmt}")
+        if filename is None:
+            mexico_tz = pytz.timezone('America/Mexico_City')
+            now_mx = datetime.now(mexico_tz)
+            filename = f"reportes_fmre_{now_mx.strftime('%Y%m%d_%H%M%S')}.{STREAM_FORMATS[fmt][0]}"
+            if compression:
+                filename += f".{STREAM_COMPRESSIONS[compression][0]}"
+        
+        total_rows = 0
+        output = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_SIZE)
+        with _compressed_writer(output, compression) as writer:
+            for chunk in chunks:
+                if chunk.empty:
+                    continue
+                if fmt == 'csv':
+                    text = prepare_csv_frame(chunk).to_csv(index=False, header=(total_rows == 0))
+                else:
+                    text = prepare_ndjson_frame(chunk).to_json(orient='records', lines=True, force_ascii=False)
+                    if not text.endswith('\n'):
+                        text += '\n'
+                writer.write(text.encode('utf-8'))
+                total_rows += len(chunk)
+        
+        output.seek(0)
+        return output, filename, total_rows
+    
+    def stream_mime_type(self, fmt='csv', compression=None):
+        """Tipo MIME de una exportación en streaming"""
+        if compression:
+            return STREAM_COMPRESSIONS[compression][1]
+        return STREAM_FORMATS[fmt][1]
+    
+    def export_to_excel(self, df, filename=None, columns=None):
+        """Exporta DataFrame a Excel (columns define orden y proyección si se especifica)"""
         if filename is None:
             # Usar zona horaria de México
             mexico_tz = pytz.timezone('America/Mexico_City')
@@ -98,31 +187,15 @@ class FMREExporter:
         excel_buffer = io.BytesIO()
         
         with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
-            # Hoja principal con reportes
-            export_df = df.copy()
-            if 'timestamp' in export_df.columns:
-                export_df['timestamp'] = pd.to_datetime(export_df['timestamp'])
-            
-            # Reordenar columnas para mejor presentación incluyendo campos HF
-            column_order = ['call_sign', 'operator_name', 'qth', 'ciudad', 'zona', 'sistema', 'hf_frequency', 'hf_mode', 'hf_power', 'signal_report', 'grid_locator', 'observations', 'timestamp']
-            existing_columns = [col for col in column_order if col in export_df.columns]
-            export_df = export_df[existing_columns]
+            # Hoja principal con reportes, columnas reordenadas incluyendo campos HF
+            export_df = prepare_excel_frame(df, columns) if columns else prepare_excel_frame(df)
             
             export_df.to_excel(writer, sheet_name='Reportes', index=False)
             
-            # Formatear columnas
+            # Formatear columnas con anchos calculados sobre el DataFrame, no celda por celda
             worksheet = writer.sheets['Reportes']
-            for column in worksheet.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 50)
-                worksheet.column_dimensions[column_letter].width = adjusted_width
+            for position, width in enumerate(column_widths(export_df).values(), 1):
+                worksheet.column_dimensions[get_column_letter(position)].width = width
         
         excel_buffer.seek(0)
         return excel_buffer.getvalue(), filename
@@ -202,9 +275,10 @@ class FMREExporter:
         most_active = stats.get('most_active', pd.DataFrame())
         if not most_active.empty:
             top_5_calls = most_active.head(5)
-            indicativos_text = "📻 Top 5 Indicativos Más Activos\n"
-            for i, (_, row) in enumerate(top_5_calls.iterrows(), 1):
-                indicativos_text += f"{i}. {row['call_sign']} ({row['reports_count']} reportes)\n"
+            indicativos_text = "📻 Top 5 Indicativos Más Activos\n" + "".join(
+                f"{i}. {call_sign} ({count} reportes)\n"
+                for i, (call_sign, count) in enumerate(zip(top_5_calls['call_sign'], top_5_calls['reports_count']), 1)
+            )
         else:
             indicativos_text = "📻 Top 5 Indicativos Más Activos\nN/A"
         
@@ -241,9 +315,8 @@ class FMREExporter:
         # Estadísticas por zona
         if 'by_zona' in stats and not stats['by_zona'].empty:
             story.append(Paragraph("🌍 Participantes por Zona", self.styles['FMRESubtitle']))
-            zona_data = []
-            for _, row in stats['by_zona'].iterrows():
-                zona_data.append([f"Zona {row['zona']}", str(row['count'])])
+            by_zona = stats['by_zona']
+            zona_data = [[f"Zona {zona}", str(count)] for zona, count in zip(by_zona['zona'], by_zona['count'])]
             
             zona_table = Table(zona_data, colWidths=[2*inch, 1*inch])
             zona_table.setStyle(TableStyle([
@@ -267,9 +340,8 @@ class FMREExporter:
         # Estadísticas por sistema
         if 'by_sistema' in stats and not stats['by_sistema'].empty:
             story.append(Paragraph("📡 Participantes por Sistema", self.styles['FMRESubtitle']))
-            sistema_data = []
-            for _, row in stats['by_sistema'].iterrows():
-                sistema_data.append([f"{row['sistema']}", str(row['count'])])
+            by_sistema = stats['by_sistema']
+            sistema_data = [[f"{sistema}", str(count)] for sistema, count in zip(by_sistema['sistema'], by_sistema['count'])]
             
             sistema_table = Table(sistema_data, colWidths=[2*inch, 1*inch])
             sistema_table.setStyle(TableStyle([
@@ -305,27 +377,9 @@ class FMREExporter:
             story.append(Paragraph("📋 Anexo: Tabla Detalle", self.styles['FMRESubtitle']))
             story.append(Spacer(1, 12))
             
-            # Preparar datos para la tabla con campos HF y numeración
-            headers = ['#', 'Indicativo', 'Operador', 'Estado', 'Ciudad', 'Zona', 'Sistema', 'Frecuencia', 'Modo', 'Potencia', 'Señal', 'Grid', 'Observaciones', 'Fecha/Hora']
-            export_data = [headers]  # Agregar encabezados
-            
-            for idx, (_, row) in enumerate(df.iterrows(), 1):
-                export_data.append([
-                    str(idx),  # Número consecutivo
-                    row['call_sign'],
-                    row['operator_name'],
-                    row.get('region', 'N/A'),
-                    row.get('ciudad', 'N/A'),
-                    row['zona'],
-                    row['sistema'],
-                    row.get('hf_frequency', '-') or '-',
-                    row.get('hf_mode', '-') or '-',
-                    row.get('hf_power', '-') or '-',
-                    row['signal_report'],
-                    row.get('grid_locator', 'N/A') or 'N/A',
-                    row['observations'] or '-',
-                    pd.to_datetime(row['timestamp']).strftime('%d/%m/%Y %H:%M')
-                ])
+            # Preparar datos para la tabla con campos HF y numeración (operaciones por columna)
+            matrix = build_report_matrix(df)
+            export_data = [list(matrix.columns)] + matrix.values.tolist()
             
             # Crear tabla con estilo profesional y colores alternados - ajustada para landscape
             # Anchos de columna optimizados para orientación horizontal - ajustados para nombres largos
@@ -373,14 +427,14 @@ class FMREExporter:
                     table_style.append(('TEXTCOLOR', (1, i), (-1, i), self.colors['fmre_gray']))
             
             # Resaltar campos HF cuando están presentes
-            for i in range(1, num_rows):
+            hf_rows = np.flatnonzero(matrix['Frecuencia'].to_numpy() != '-') + 1
+            for i in hf_rows.tolist():
                 # Si hay frecuencia HF, resaltar esas columnas
-                if len(export_data[i]) > 7 and export_data[i][7] != '-':
-                    table_style.extend([
-                        ('BACKGROUND', (7, i), (9, i), HexColor('#E8F5E8')),  # Verde claro para HF
-                        ('TEXTCOLOR', (7, i), (9, i), self.colors['fmre_green']),
-                        ('FONTNAME', (7, i), (9, i), 'Helvetica-Bold'),
-                    ])
+                table_style.extend([
+                    ('BACKGROUND', (7, i), (9, i), HexColor('#E8F5E8')),  # Verde claro para HF
+                    ('TEXTCOLOR', (7, i), (9, i), self.colors['fmre_green']),
+                    ('FONTNAME', (7, i), (9, i), 'Helvetica-Bold'),
+                ])
             
             table.setStyle(TableStyle(table_style))
             
@@ -413,54 +467,6 @@ class FMREExporter:
     
     def _create_mixed_orientation_doc(self, buffer):
         """Crea documento con orientaciones mixtas"""
-        from reportlab.platypus.doctemplate import PageTemplate, BaseDocTemplate
-        from reportlab.platypus.frames import Frame
-        
-        class MixedOrientationDoc(BaseDocTemplate):
-            def __init__(self, filename, exporter_instance=None, **kwargs):
-                BaseDocTemplate.__init__(self, filename, **kwargs)
-                self.exporter = exporter_instance
-                
-                # Template para página vertical (primera página) - margen superior muy reducido
-                portrait_frame = Frame(0.75*inch, 0.75*inch, 
-                                     letter[0] - 1.5*inch, letter[1] - 1.0*inch,
-                                     topPadding=0.1*inch)
-                portrait_template = PageTemplate(id='portrait', frames=[portrait_frame],
-                                               onPage=self._add_page_number)
-                
-                # Template para página horizontal (segunda página)
-                landscape_frame = Frame(0.75*inch, 0.75*inch,
-                                      landscape(letter)[0] - 1.5*inch, 
-                                      landscape(letter)[1] - 1.5*inch)
-                landscape_template = PageTemplate(id='landscape', frames=[landscape_frame], 
-                                                pagesize=landscape(letter),
-                                                onPage=self._add_page_number)
-                
-                self.addPageTemplates([portrait_template, landscape_template])
-            
-            def _add_page_number(self, canvas, doc):
-                """Agrega numeración de páginas al pie"""
-                canvas.saveState()
-                
-                # Obtener número de página actual
-                page_num = canvas.getPageNumber()
-                
-                # Solo 1 página si no hay reportes, 2 si hay reportes
-                total_pages = 1 if not (hasattr(self.exporter, '_has_reports') and self.exporter._has_reports) else 2
-                
-                # Posición del número de página (centrado en la parte inferior)
-                canvas.setFont('Helvetica', 8)
-                canvas.setFillColor(colors.gray)
-                
-                # Calcular posición centrada
-                page_width = canvas._pagesize[0]
-                page_text = f"Página {page_num} de {total_pages}"
-                text_width = canvas.stringWidth(page_text, 'Helvetica', 8)
-                x_position = (page_width - text_width) / 2
-                
-                canvas.drawString(x_position, 0.5*inch, page_text)
-                canvas.restoreState()
-        
         return MixedOrientationDoc(buffer, exporter_instance=self)
     
     
@@ -471,40 +477,8 @@ class FMREExporter:
         # Crear tabla para el encabezado con logo y texto
         header_data = []
         
-        # Logo en tamaño original
-        logo_path = "assets/LogoFMRE_medium.png"
-        logo_cell = ""
-        if os.path.exists(logo_path):
-            logo = Image(logo_path)  # Sin forzar dimensiones
-            logo_cell = logo
-        
-        # Información institucional
-        org_style = ParagraphStyle(
-            'OrgStyle',
-            parent=self.styles['Normal'],
-            fontSize=14,
-            fontName='Helvetica-Bold',
-            alignment=0,  # Left
-            spaceAfter=3
-        )
-        
-        report_style = ParagraphStyle(
-            'ReportStyle',
-            parent=self.styles['Normal'],
-            fontSize=12,
-            fontName='Helvetica',
-            alignment=0,  # Left
-            spaceAfter=2
-        )
-        
-        date_style = ParagraphStyle(
-            'DateStyle',
-            parent=self.styles['Normal'],
-            fontSize=10,
-            fontName='Helvetica',
-            alignment=0,  # Left
-            spaceAfter=1
-        )
+        # Logo en tamaño original (decodificado una sola vez por el registro)
+        logo_cell = get_asset_registry().logo_flowable("LogoFMRE_medium.png") or ""
         
         # Formatear fechas y usuario
         report_date = session_date.strftime('%d/%m/%Y') if session_date else datetime.now().strftime('%d/%m/%Y')
@@ -561,6 +535,77 @@ class FMREExporter:
         story.append(HRFlowable(width="100%", thickness=1, lineCap='round', color=colors.grey))
         story.append(Spacer(1, 15))
     
+    def export_bundle(self, df, stats=None, filename=None, session_date=None, current_user=None):
+        """Exporta CSV, Excel y PDF en un ZIP con manifiesto a partir de una sola consulta
+
+        CSV y Excel se generan en hilos; el PDF (ReportLab, intensivo en CPU) en un
+        proceso aparte para no competir por el GIL. Si no se puede usar un proceso
+        el PDF se genera en un hilo más; el manifiesto indica en 'pdf_generado_en'
+        cuál de los dos se usó.
+        """
+        mexico_tz = pytz.timezone('America/Mexico_City')
+        now_mx = datetime.now(mexico_tz)
+        stamp = now_mx.strftime('%Y%m%d_%H%M%S')
+        if filename is None:
+            filename = f"paquete_fmre_{stamp}.zip"
+        
+        csv_name = f"reportes_fmre_{stamp}.csv"
+        excel_name = f"reportes_fmre_{stamp}.xlsx"
+        pdf_name = f"reporte_fmre_{stamp}.pdf"
+        
+        pdf_args = (df, stats, pdf_name, session_date, current_user)
+        with ThreadPoolExecutor(max_workers=3) as threads:
+            csv_future = threads.submit(self.export_to_csv, df, csv_name)
+            excel_future = threads.submit(self.export_to_excel, df, excel_name)
+            try:
+                pdf_future = _get_pdf_process_pool().submit(_render_pdf, *pdf_args)
+                pdf_data = pdf_future.result()
+                pdf_worker = 'proceso'
+            except (BrokenProcessPool, OSError, pickle.PicklingError) as e:
+                logger.warning("PDF en proceso separado no disponible, generando en hilo: %s", e)
+                _reset_pdf_process_pool()
+                pdf_data = threads.submit(_render_pdf, *pdf_args).result()
+                pdf_worker = 'hilo'
+            csv_data, _ = csv_future.result()
+            excel_data, _ = excel_future.result()
+        
+        files = [
+            (csv_name, csv_data.encode('utf-8'), 'text/csv'),
+            (excel_name, excel_data, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+            (pdf_name, pdf_data, 'application/pdf'),
+        ]
+        
+        user_name = None
+        if isinstance(current_user, dict):
+            user_name = current_user.get('full_name') or current_user.get('username')
+        
+        manifest = {
+            'sistema': 'SIGQ - Federación Mexicana de Radioexperimentadores A.C.',
+            'generado_el': now_mx.isoformat(),
+            'fecha_sesion': session_date.strftime('%Y-%m-%d') if session_date else None,
+            'generado_por': user_name,
+            'total_reportes': int(len(df)),
+            'total_participantes': int(stats.get('total_participants', 0)) if stats else None,
+            'pdf_generado_en': pdf_worker,
+            'archivos': [
+                {
+                    'nombre': name,
+                    'tipo': mime_type,
+                    'bytes': len(data),
+                    'sha256': hashlib.sha256(data).hexdigest()
+                }
+                for name, data, mime_type in files
+            ]
+        }
+        
+        zip_buffer = io.BytesIO()
+        with zipfile.ZipFile(zip_buffer, 'w', compression=zipfile.ZIP_DEFLATED) as bundle:
+            for name, data, _ in files:
+                bundle.writestr(name, data)
+            bundle.writestr('manifest.json', json.dumps(manifest, ensure_ascii=False, indent=2))
+        
+        return zip_buffer.getvalue(), filename
+    
     def create_session_summary(self, stats, session_date=None):
         """Crea un resumen de sesión"""
         summary = {
@@ -571,31 +616,20 @@ class FMREExporter:
             'calidad_señal': {}
         }
         
-        # Procesar participantes por región
-        if 'by_region' in stats and not stats['by_region'].empty:
-            for _, row in stats['by_region'].iterrows():
-                summary['participantes_por_region'][row['region']] = row['count']
-        
-        # Procesar participantes por zona
-        summary['participantes_por_zona'] = {}
-        if 'by_zona' in stats and not stats['by_zona'].empty:
-            for _, row in stats['by_zona'].iterrows():
-                summary['participantes_por_zona'][row['zona']] = row['count']
-        
-        # Procesar participantes por sistema
-        summary['participantes_por_sistema'] = {}
-        if 'by_sistema' in stats and not stats['by_sistema'].empty:
-            for _, row in stats['by_sistema'].iterrows():
-                summary['participantes_por_sistema'][row['sistema']] = row['count']
+        # Procesar participantes por región, zona y sistema
+        summary['participantes_por_region'] = series_to_dict(stats.get('by_region'), 'region', 'count')
+        summary['participantes_por_zona'] = series_to_dict(stats.get('by_zona'), 'zona', 'count')
+        summary['participantes_por_sistema'] = series_to_dict(stats.get('by_sistema'), 'sistema', 'count')
         
         # Procesar calidad de señal
         if 'signal_quality' in stats and not stats['signal_quality'].empty:
-            total_signals = stats['signal_quality']['count'].sum()
-            for _, row in stats['signal_quality'].iterrows():
-                quality_text = {1: 'Mala', 2: 'Regular', 3: 'Buena'}.get(row['signal_quality'], 'Desconocida')
-                percentage = (row['count'] / total_signals * 100) if total_signals > 0 else 0
+            quality_df = stats['signal_quality']
+            total_signals = quality_df['count'].sum()
+            quality_texts = quality_df['signal_quality'].map({1: 'Mala', 2: 'Regular', 3: 'Buena'}).fillna('Desconocida')
+            percentages = quality_df['count'] / total_signals * 100 if total_signals > 0 else quality_df['count'] * 0
+            for quality_text, count, percentage in zip(quality_texts, quality_df['count'], percentages):
                 summary['calidad_señal'][quality_text] = {
-                    'cantidad': row['count'],
+                    'cantidad': count,
                     'porcentaje': round(percentage, 1)
                 }
         
@@ -617,3 +651,35 @@ class FMREExporter:
         
         b64 = base64.b64encode(data).decode()
         return f'<a href="data:{mime_type};base64,{b64}" download="{filename}">Descargar {filename}</a>'
+
+
+_pdf_process_pool = None
+_pdf_process_pool_lock = threading.Lock()
+
+
+def _get_pdf_process_pool():
+    """Pool de un proceso reutilizado para generar PDFs (evita arrancar un proceso por exportación)
+
+    Se usa 'spawn' y no 'fork': el servidor de Streamlit tiene varios hilos y un fork
+    podría heredar locks tomados por otro hilo (logging, SQLite, ReportLab) y bloquearse.
+    """
+    global _pdf_process_pool
+    with _pdf_process_pool_lock:
+        if _pdf_process_pool is None:
+            _pdf_process_pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+        return _pdf_process_pool
+
+
+def _reset_pdf_process_pool():
+    """Descarta el pool de PDF tras un error para recrearlo en la siguiente exportación"""
+    global _pdf_process_pool
+    with _pdf_process_pool_lock:
+        if _pdf_process_pool is not None:
+            _pdf_process_pool.shutdown(wait=False, cancel_futures=True)
+        _pdf_process_pool = None
+
+
+def _render_pdf(df, stats, filename, session_date, current_user):
+    """Genera el PDF con un exportador propio (se ejecuta en el proceso del pool)"""
+    data, _ = FMREExporter().export_to_pdf(df, stats, filename=filename, session_date=session_date, current_user=current_user)
+    return data
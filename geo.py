@@ -0,0 +1,154 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Grid Locator de la estación de control de red (por defecto Ciudad de México)
+NET_CONTROL_GRID = os.getenv('NET_CONTROL_GRID', 'EK09')
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Pares del Maidenhead: (primer carácter válido, base, grados de longitud, grados de latitud)
+_LOCATOR_PAIRS = [
+    (ord('A'), 18, 20.0, 10.0),               # Campo (A-R)
+    (ord('0'), 10, 2.0, 1.0),                 # Cuadro (0-9)
+    (ord('A'), 24, 2.0 / 24, 1.0 / 24),       # Subcuadro (A-X)
+    (ord('0'), 10, 2.0 / 240, 1.0 / 240),     # Cuadro extendido (0-9)
+    (ord('A'), 24, 2.0 / 5760, 1.0 / 5760),   # Subcuadro extendido (A-X)
+]
+_MAX_LENGTH = 2 * len(_LOCATOR_PAIRS)
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _decode_unique(locators):
+    """Decodifica un arreglo de Grid Locators normalizados a (lat, lon) del centro del cuadro
+
+    Los caracteres se convierten a una matriz de bytes (n × 10) y cada par se
+    resuelve con operaciones de columna; los localizadores inválidos quedan en NaN.
+    """
+    n = len(locators)
+    lat = np.full(n, np.nan)
+    lon = np.full(n, np.nan)
+    if n == 0:
+        return lat, lon
+
+    lengths = np.fromiter((len(loc) for loc in locators), dtype=np.int64, count=n)
+    padded = np.array([loc.encode('ascii', 'replace')[:_MAX_LENGTH].ljust(_MAX_LENGTH) for loc in locators],
+                      dtype=f'S{_MAX_LENGTH}')
+    chars = padded.view(np.uint8).reshape(n, _MAX_LENGTH).astype(np.int64)
+
+    valid = np.isin(lengths, (4, 6, 8, 10))
+    lon_acc = np.full(n, -180.0)
+    lat_acc = np.full(n, -90.0)
+    lon_step = np.zeros(n)
+    lat_step = np.zeros(n)
+    for pair, (first, base, lon_size, lat_size) in enumerate(_LOCATOR_PAIRS):
+        used = lengths >= 2 * (pair + 1)
+        lon_digit = chars[:, 2 * pair] - first
+        lat_digit = chars[:, 2 * pair + 1] - first
+        in_range = (lon_digit >= 0) & (lon_digit < base) & (lat_digit >= 0) & (lat_digit < base)
+        valid &= ~used | in_range
+        lon_acc += np.where(used, lon_digit * lon_size, 0.0)
+        lat_acc += np.where(used, lat_digit * lat_size, 0.0)
+        lon_step = np.where(used, lon_size, lon_step)
+        lat_step = np.where(used, lat_size, lat_step)
+
+    lon[valid] = (lon_acc + lon_step / 2)[valid]
+    lat[valid] = (lat_acc + lat_step / 2)[valid]
+    return lat, lon
+
+
+def decode_locators(locators):
+    """Convierte Grid Locators (4, 6, 8 o 10 caracteres) a latitud y longitud del centro
+
+    Solo se decodifican los localizadores distintos que no estén en el caché del
+    proceso. Retorna dos arreglos NumPy (lat, lon) con NaN para vacíos o inválidos.
+    """
+    series = pd.Series(locators, dtype=object)
+    normalized = series.where(series.notna(), '').astype(str).str.strip().str.upper()
+    codes, uniques = pd.factorize(normalized)
+    uniques = np.asarray(uniques, dtype=object)
+
+    missing = [loc for loc in uniques if loc not in _cache]
+    if missing:
+        missing_lat, missing_lon = _decode_unique(missing)
+        with _cache_lock:
+            _cache.update(zip(missing, zip(missing_lat.tolist(), missing_lon.tolist())))
+
+    unique_coords = np.array([_cache[loc] for loc in uniques], dtype=float).reshape(-1, 2)
+    return unique_coords[codes, 0], unique_coords[codes, 1]
+
+
+def decode_locator(locator):
+    """Decodifica un solo Grid Locator; retorna (lat, lon) o None si es inválido"""
+    lat, lon = decode_locators([locator])
+    if np.isnan(lat[0]):
+        return None
+    return float(lat[0]), float(lon[0])
+
+
+def distance_bearing(lat, lon, origin_lat, origin_lon):
+    """Distancia de círculo máximo (km) y rumbo inicial (grados) desde un origen
+
+    Fórmulas de haversine y de rumbo inicial evaluadas sobre arreglos completos.
+    """
+    lat1, lon1 = np.radians(origin_lat), np.radians(origin_lon)
+    lat2, lon2 = np.radians(np.asarray(lat, dtype=float)), np.radians(np.asarray(lon, dtype=float))
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    distance = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+    y = np.sin(dlon) * np.cos(lat2)
+    x = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(dlon)
+    bearing = (np.degrees(np.arctan2(y, x)) + 360.0) % 360.0
+    return distance, bearing
+
+
+def add_distances(df, origin_grid=NET_CONTROL_GRID):
+    """Agrega lat, lon, distance_km y bearing (desde origin_grid) a un DataFrame con grid_locator"""
+    result = df.copy()
+    lat, lon = decode_locators(result['grid_locator'] if 'grid_locator' in result.columns else [None] * len(result))
+    result['lat'] = lat
+    result['lon'] = lon
+    origin = decode_locator(origin_grid)
+    if origin is None:
+        raise ValueError(f"Grid Locator de control de red inválido: {origin_grid}")
+    distance, bearing = distance_bearing(lat, lon, *origin)
+    result['distance_km'] = np.round(distance, 1)
+    result['bearing'] = np.round(bearing, 1)
+    return result
+
+
+def distance_statistics(df, origin_grid=NET_CONTROL_GRID, records=10):
+    """Récords de distancia y distancia promedio por banda
+
+    La banda es hf_band cuando existe; en otro caso se usa el sistema (ASL, DMR...).
+    Retorna (récords, por_banda): récords conserva el reporte más lejano de cada
+    indicativo ordenado por distancia.
+    """
+    located = add_distances(df, origin_grid)
+    located = located[located['distance_km'].notna()]
+    record_columns = ['call_sign', 'grid_locator', 'session_date', 'distance_km', 'bearing']
+    band_columns = ['band', 'reports', 'avg_distance_km', 'max_distance_km']
+    if located.empty:
+        return pd.DataFrame(columns=record_columns), pd.DataFrame(columns=band_columns)
+
+    top = (located.sort_values('distance_km', ascending=False)
+           .drop_duplicates('call_sign')
+           .head(records)[record_columns]
+           .reset_index(drop=True))
+
+    band = located['hf_band'] if 'hf_band' in located.columns else pd.Series(None, index=located.index)
+    band = band.where(band.notna() & (band.astype(str).str.strip() != ''), located.get('sistema'))
+    by_band = (located.assign(band=band.fillna('N/A'))
+               .groupby('band')['distance_km']
+               .agg(reports='count', avg_distance_km='mean', max_distance_km='max')
+               .round(1)
+               .sort_values('avg_distance_km', ascending=False)
+               .reset_index())
+    return top, by_band
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+# Bandas de radioaficionado de HF (IARU Región 2): (banda, inicio MHz, fin MHz), ordenadas por inicio
+HF_BANDS = [
+    ('160m', 1.8, 2.0),
+    ('80m', 3.5, 4.0),
+    ('60m', 5.3305, 5.4065),
+    ('40m', 7.0, 7.3),
+    ('30m', 10.1, 10.15),
+    ('20m', 14.0, 14.35),
+    ('17m', 18.068, 18.168),
+    ('15m', 21.0, 21.45),
+    ('12m', 24.89, 24.99),
+    ('10m', 28.0, 29.7),
+]
+
+_BAND_NAMES = np.array([name for name, _, _ in HF_BANDS], dtype=object)
+_BAND_STARTS = np.array([start for _, start, _ in HF_BANDS])
+_BAND_ENDS = np.array([end for _, _, end in HF_BANDS])
+_NUMBER_PATTERN = r'(\d+(?:[.,]\d+)?)'
+
+
+def parse_frequencies(values):
+    """Convierte frecuencias en texto ('14.230', '14,230', '14230 kHz') a MHz (NaN si no es válida)
+
+    Valores mayores a 1000 se interpretan como kHz.
+    """
+    text = pd.Series(values, dtype=object).astype(str)
+    numbers = pd.to_numeric(text.str.extract(_NUMBER_PATTERN)[0].str.replace(',', '.'), errors='coerce')
+    return numbers.where(numbers <= 1000, numbers / 1000).to_numpy(dtype=float)
+
+
+def parse_powers(values):
+    """Convierte potencias en texto ('100', '100W', '5 w') a watts (NaN si no es válida)"""
+    text = pd.Series(values, dtype=object).astype(str)
+    return pd.to_numeric(text.str.extract(_NUMBER_PATTERN)[0].str.replace(',', '.'), errors='coerce').to_numpy(dtype=float)
+
+
+def bands_for_frequencies(frequencies_mhz):
+    """Banda de cada frecuencia por búsqueda binaria sobre los inicios de banda
+
+    np.searchsorted ubica la banda candidata de todo el arreglo a la vez; si la
+    frecuencia supera el fin de esa banda queda fuera de banda (None).
+    """
+    frequencies = np.asarray(frequencies_mhz, dtype=float)
+    index = np.searchsorted(_BAND_STARTS, frequencies, side='right') - 1
+    safe_index = np.clip(index, 0, len(HF_BANDS) - 1)
+    in_band = (index >= 0) & (frequencies <= _BAND_ENDS[safe_index])
+    return np.where(in_band, _BAND_NAMES[safe_index], None)
+
+
+def hf_fields(hf_frequency, hf_power, hf_band=None):
+    """Obtiene (frequency_mhz, power_w, banda) de un reporte; la banda indicada tiene prioridad"""
+    frequency = parse_frequencies([hf_frequency])[0] if hf_frequency else np.nan
+    power = parse_powers([hf_power])[0] if hf_power else np.nan
+    band = hf_band or (bands_for_frequencies([frequency])[0] if not np.isnan(frequency) else None)
+    return (
+        None if np.isnan(frequency) else float(frequency),
+        None if np.isnan(power) else float(power),
+        band or None,
+    )
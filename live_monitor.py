@@ -0,0 +1,91 @@
+from datetime import date, datetime
+
+import pandas as pd
+
+
+class LiveSessionMonitor:
+    """Vista en vivo de una sesión que se actualiza por diferencias
+
+    Cada sondeo lee primero la revisión de la sesión (una fila de
+    report_revisions). Si cambió, solo se consultan los reportes con id mayor al
+    último visto y se agregan al DataFrame local, actualizando las métricas de
+    forma incremental. Cada INSERT incrementa la revisión en uno; si el cambio de
+    revisión no coincide con las filas nuevas hubo ediciones o eliminaciones y se
+    recarga la sesión completa.
+    """
+
+    def __init__(self, db, session_date):
+        self.db = db
+        if isinstance(session_date, (date, datetime)):
+            session_date = session_date.strftime('%Y-%m-%d')
+        self.session_date = session_date
+        self.reports = pd.DataFrame()
+        self.last_seen_id = 0
+        self.revision = None
+        self.polls = 0
+        self.full_reloads = 0
+        self.last_change = 0
+        self._call_signs = set()
+        self._quality_sum = 0
+        self._quality_count = 0
+
+    def _reset(self):
+        self.reports = pd.DataFrame()
+        self.last_seen_id = 0
+        self._call_signs = set()
+        self._quality_sum = 0
+        self._quality_count = 0
+
+    def _append(self, new_reports):
+        """Agrega reportes nuevos y actualiza métricas sin recorrer los ya cargados"""
+        if new_reports.empty:
+            return
+        self.reports = new_reports if self.reports.empty else pd.concat([self.reports, new_reports], ignore_index=True)
+        self.last_seen_id = int(new_reports['id'].max())
+        self._call_signs.update(new_reports['call_sign'].dropna())
+        quality = pd.to_numeric(new_reports['signal_quality'], errors='coerce').dropna()
+        self._quality_sum += float(quality.sum())
+        self._quality_count += int(quality.count())
+
+    def poll(self):
+        """Consulta cambios; retorna la variación en el total de reportes de la sesión"""
+        self.polls += 1
+        revision = self.db.get_data_revision(self.session_date)
+        if revision == self.revision:
+            self.last_change = 0
+            return 0
+
+        previous_total = self.total_reports
+
+        new_reports = self.db.get_reports_since(self.session_date, self.last_seen_id)
+        if self.revision is None or revision - self.revision != len(new_reports):
+            # Primera carga, o hubo ediciones/eliminaciones: recargar la sesión
+            self.full_reloads += 1
+            self._reset()
+            new_reports = self.db.get_reports_since(self.session_date, 0)
+
+        self._append(new_reports)
+        first_load = self.revision is None
+        self.revision = revision
+        self.last_change = 0 if first_load else self.total_reports - previous_total
+        return self.last_change
+
+    @property
+    def total_reports(self):
+        return len(self.reports)
+
+    @property
+    def unique_participants(self):
+        return len(self._call_signs)
+
+    @property
+    def average_quality(self):
+        """Calidad de señal promedio (None si no hay reportes con calidad)"""
+        if not self._quality_count:
+            return None
+        return self._quality_sum / self._quality_count
+
+    def latest(self, limit=None):
+        """Reportes más recientes primero"""
+        latest = self.reports.iloc[::-1]
+        return latest.head(limit) if limit else latest
@@ -0,0 +1,178 @@
+import html
+from datetime import datetime
+from string import Template
+
+
+class MailTemplate:
+    """Plantilla con campos $nombre o ${nombre} compilada una sola vez
+
+    El texto se divide al crearla en partes fijas y nombres de campo, así que
+    render() solo une cadenas: no vuelve a analizar la plantilla por cada
+    destinatario. Con escape=True los valores se escapan para HTML.
+    """
+
+    def __init__(self, source, escape=False):
+        self.escape = escape
+        self._literals = []
+        self._fields = []
+        literal = []
+        position = 0
+        for match in Template.pattern.finditer(source):
+            literal.append(source[position:match.start()])
+            position = match.end()
+            if match.group('escaped') is not None:
+                literal.append('$')
+                continue
+            name = match.group('named') or match.group('braced')
+            if name is None:
+                raise ValueError(f"Campo inválido en la plantilla, posición {match.start()}")
+            self._literals.append(''.join(literal))
+            self._fields.append(name)
+            literal = []
+        literal.append(source[position:])
+        self._literals.append(''.join(literal))
+
+    @property
+    def fields(self):
+        return set(self._fields)
+
+    def render(self, values):
+        """Sustituye los campos con los valores del diccionario (KeyError si falta alguno)"""
+        parts = [self._literals[0]]
+        for name, literal in zip(self._fields, self._literals[1:]):
+            value = str(values[name])
+            parts.append(html.escape(value) if self.escape else value)
+            parts.append(literal)
+        return ''.join(parts)
+
+
+SUMMARY_SUBJECT = MailTemplate("📻 Tu resumen del boletín FMRE del $session_date")
+
+SUMMARY_HTML = MailTemplate("""
+<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <style>
+        body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
+        .container { max-width: 600px; margin: 0 auto; padding: 20px; }
+        .header { background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 30px; text-align: center; border-radius: 10px 10px 0 0; }
+        .content { background: #f9f9f9; padding: 30px; border-radius: 0 0 10px 10px; }
+        .stats { background: white; padding: 20px; border-radius: 8px; border-left: 4px solid #667eea; margin: 20px 0; }
+        .footer { text-align: center; margin-top: 30px; color: #666; font-size: 12px; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>📻 Sistema FMRE</h1>
+            <p>Resumen de participación</p>
+        </div>
+        <div class="content">
+            <h2>¡Hola, $name ($call_sign)!</h2>
+            <p>$status_message</p>
+
+            <div class="stats">
+                <h3>📊 Tus estadísticas al $session_date</h3>
+                <p><strong>Sesiones con reporte:</strong> $check_ins de $total_sessions ($attendance_rate %)</p>
+                <p><strong>Racha actual:</strong> $current_streak sesiones consecutivas</p>
+                <p><strong>Racha más larga:</strong> $longest_streak sesiones</p>
+                <p><strong>Lugar:</strong> $rank de $participants participantes</p>
+            </div>
+
+            <p>¡Gracias por participar en el boletín! 73</p>
+        </div>
+        <div class="footer">
+            <p>Sistema FMRE - Control de Reportes de Boletín<br>
+            Generado automáticamente el $generated_at</p>
+        </div>
+    </div>
+</body>
+</html>
+""", escape=True)
+
+SUMMARY_TEXT = MailTemplate("""
+Sistema FMRE - Resumen de participación
+
+Hola $name ($call_sign),
+
+$status_message
+
+Tus estadísticas al $session_date:
+- Sesiones con reporte: $check_ins de $total_sessions ($attendance_rate %)
+- Racha actual: $current_streak sesiones consecutivas
+- Racha más larga: $longest_streak sesiones
+- Lugar: $rank de $participants participantes
+
+¡Gracias por participar en el boletín! 73
+
+Sistema FMRE - $generated_at
+""")
+
+
+class SessionSummaryMailer:
+    """Envía a cada participante con correo su resumen de participación tras el boletín
+
+    Las estadísticas de todos salen de una sola consulta
+    (get_participant_summaries) y cada mensaje se genera con las plantillas
+    precompiladas. Los mensajes se encolan en la bandeja de salida o, sin ella,
+    se entregan con EmailService.send_bulk.
+    """
+
+    def __init__(self, db, email_service, outbox=None,
+                 subject=SUMMARY_SUBJECT, html_template=SUMMARY_HTML, text_template=SUMMARY_TEXT):
+        self.db = db
+        self.email_service = email_service
+        self.outbox = outbox
+        self.subject = subject
+        self.html_template = html_template
+        self.text_template = text_template
+
+    @staticmethod
+    def _status_message(current_streak):
+        if current_streak > 1:
+            return f"Reportaste en esta sesión y llevas {current_streak} sesiones seguidas. ¡Sigue así!"
+        if current_streak == 1:
+            return "Reportaste en esta sesión. ¡Te esperamos en la próxima!"
+        return "Esta vez no recibimos tu reporte. ¡Te esperamos en la próxima sesión!"
+
+    def build_messages(self, session_date=None, attended_only=True):
+        """Genera los mensajes (to_email, subject, body_html, body_text) de los participantes
+
+        Por defecto solo de quienes reportaron en la sesión; con attended_only=False
+        también de los suscritos que no reportaron.
+        """
+        summaries = self.db.get_participant_summaries(session_date, attended_only)
+        generated_at = datetime.now().strftime('%d/%m/%Y a las %H:%M')
+        messages = []
+        for row in summaries.itertuples(index=False):
+            values = {
+                'call_sign': row.call_sign,
+                'name': row.name or row.call_sign,
+                'session_date': datetime.strptime(row.session_date, '%Y-%m-%d').strftime('%d/%m/%Y'),
+                'check_ins': row.check_ins,
+                'total_sessions': row.total_sessions,
+                'attendance_rate': round(100 * row.check_ins / row.total_sessions),
+                'current_streak': row.current_streak,
+                'longest_streak': row.longest_streak,
+                'rank': row.rank,
+                'participants': row.participants,
+                'status_message': self._status_message(row.current_streak),
+                'generated_at': generated_at,
+            }
+            messages.append({
+                'to_email': row.email,
+                'subject': self.subject.render(values),
+                'body_html': self.html_template.render(values),
+                'body_text': self.text_template.render(values),
+            })
+        return messages
+
+    def send(self, session_date=None, attended_only=True):
+        """Genera y entrega los resúmenes; retorna cuántos se encolaron o enviaron"""
+        messages = self.build_messages(session_date, attended_only)
+        if not messages:
+            return 0
+        if self.outbox is not None:
+            return len(self.outbox.enqueue_many(messages, kind='session_summary'))
+        return sum(success for success, _ in self.email_service.send_bulk(messages))
@@ -0,0 +1,136 @@
+import hashlib
+import hmac
+import os
+import secrets
+import string
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import bcrypt
+
+# Costo de bcrypt (2^rondas iteraciones); subirlo conforme el hardware lo permita
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', '12'))
+
+# Hilos dedicados a hashing y máximo de trabajos en espera por hilo. bcrypt libera
+# el GIL, así que varios hashes avanzan en paralelo sin detener a los demás scripts;
+# el script que pidió el hash sí espera su resultado (el pool acota la concurrencia)
+HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', str(min(4, os.cpu_count() or 1))))
+HASH_QUEUE_PER_WORKER = 8
+
+_LEGACY_HEX_LENGTH = 64
+
+# Caracteres especiales aceptados por utils.validate_password
+PASSWORD_SPECIALS = "!@#$%&*-_+=?"
+
+_executor = None
+_executor_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(HASH_WORKERS * HASH_QUEUE_PER_WORKER)
+
+
+def is_legacy_hash(password_hash):
+    """True si el hash es SHA-256 sin sal (formato anterior: 64 caracteres hexadecimales)"""
+    if not password_hash or len(password_hash) != _LEGACY_HEX_LENGTH:
+        return False
+    try:
+        int(password_hash, 16)
+    except ValueError:
+        return False
+    return True
+
+
+def token_digest(token):
+    """Huella SHA-256 de un token aleatorio de un solo uso (no se guarda el token en claro)
+
+    Los tokens tienen 256 bits de entropía, así que un hash rápido basta y permite
+    buscarlos por llave primaria.
+    """
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def hash_password(password, rounds=None):
+    """Genera un hash bcrypt con sal aleatoria y el costo indicado (BCRYPT_ROUNDS por defecto)"""
+    salt = bcrypt.gensalt(rounds=rounds or BCRYPT_ROUNDS)
+    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('ascii')
+
+
+def generate_password(length=14):
+    """Contraseña aleatoria con mayúscula, minúscula, número y carácter especial"""
+    alphabet = string.ascii_letters + string.digits + PASSWORD_SPECIALS
+    while True:
+        password = ''.join(secrets.choice(alphabet) for _ in range(length))
+        if (any(c.isupper() for c in password) and any(c.islower() for c in password)
+                and any(c.isdigit() for c in password) and any(c in PASSWORD_SPECIALS for c in password)):
+            return password
+
+
+def hash_many(passwords, workers=None, rounds=None):
+    """Genera hashes bcrypt de muchas contraseñas repartidos en un pool de procesos
+
+    Para altas masivas desde la línea de comandos; retorna los hashes en el
+    mismo orden. La aplicación web usa el pool de hilos de hash_password_async.
+    """
+    passwords = list(passwords)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(passwords) < 2:
+        return [hash_password(password, rounds) for password in passwords]
+    chunksize = max(1, len(passwords) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(hash_password, passwords, [rounds] * len(passwords), chunksize=chunksize))
+
+
+def verify_password(password, password_hash):
+    """Verifica una contraseña contra un hash bcrypt o SHA-256 heredado"""
+    if not password_hash:
+        return False
+    if is_legacy_hash(password_hash):
+        legacy = hashlib.sha256(password.encode()).hexdigest()
+        return hmac.compare_digest(legacy, password_hash.lower())
+    try:
+        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('ascii'))
+    except ValueError:
+        return False
+
+
+def needs_rehash(password_hash, rounds=None):
+    """True si el hash es heredado o su costo es menor al configurado"""
+    if is_legacy_hash(password_hash):
+        return True
+    try:
+        cost = int(password_hash.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return True
+    return cost < (rounds or BCRYPT_ROUNDS)
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix='password-hash')
+        return _executor
+
+
+def submit(func, *args):
+    """Envía un trabajo de hashing al pool acotado y retorna su Future
+
+    Si ya hay HASH_WORKERS × HASH_QUEUE_PER_WORKER trabajos pendientes, espera a
+    que se libere un lugar en vez de acumular trabajo sin límite.
+    """
+    _slots.acquire()
+    try:
+        future = _get_executor().submit(func, *args)
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    return future
+
+
+def hash_password_async(password, rounds=None):
+    """hash_password ejecutado en el pool de hashing"""
+    return submit(hash_password, password, rounds)
+
+
+def verify_password_async(password, password_hash):
+    """verify_password ejecutado en el pool de hashing"""
+    return submit(verify_password, password, password_hash)
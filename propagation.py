@@ -0,0 +1,148 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from hf_bands import HF_BANDS
+from utils import get_zonas
+
+HOURS = 24
+
+
+class PropagationAnalytics:
+    """Matriz de propagación HF banda × hora × zona con la calidad de señal reportada
+
+    Cada sesión se resume en dos arreglos (suma de calidad y número de reportes)
+    de forma (bandas, 24, zonas). Los totales se mantienen sumando y restando
+    esos resúmenes: refresh() compara las revisiones de report_revisions y solo
+    vuelve a leer las filas HF de las sesiones nuevas o modificadas.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.bands = [name for name, _, _ in HF_BANDS]
+        self.zonas = get_zonas()
+        self.shape = (len(self.bands), HOURS, len(self.zonas))
+        self._lock = threading.Lock()
+        self._revisions = {}
+        self._loaded = False
+        self._session_sums = {}
+        self._session_counts = {}
+        self._sums = np.zeros(self.shape)
+        self._counts = np.zeros(self.shape, dtype=np.int64)
+
+    def _aggregate(self, rows):
+        """Agrega filas HF a arreglos por sesión con un solo np.bincount
+
+        Retorna (sesiones, sumas, conteos) con sumas y conteos de forma
+        (sesiones, bandas, 24, zonas).
+        """
+        band_codes = pd.Categorical(rows['hf_band'], categories=self.bands).codes.astype(np.int64)
+        zona_codes = pd.Categorical(rows['zona'], categories=self.zonas).codes.astype(np.int64)
+        hours = pd.to_numeric(rows['hour'], errors='coerce').fillna(-1).to_numpy(dtype=np.int64)
+        quality = pd.to_numeric(rows['signal_quality'], errors='coerce').to_numpy(dtype=float)
+        valid = (band_codes >= 0) & (zona_codes >= 0) & (hours >= 0) & (hours < HOURS) & ~np.isnan(quality)
+
+        session_codes, sessions = pd.factorize(rows['session_date'].to_numpy()[valid])
+        cell_size = int(np.prod(self.shape))
+        cells = (band_codes[valid] * HOURS + hours[valid]) * len(self.zonas) + zona_codes[valid]
+        flat = session_codes * cell_size + cells
+        size = len(sessions) * cell_size
+        sums = np.bincount(flat, weights=quality[valid], minlength=size).reshape((len(sessions),) + self.shape)
+        counts = np.bincount(flat, minlength=size).reshape((len(sessions),) + self.shape)
+        return list(sessions), sums, counts
+
+    def refresh(self):
+        """Incorpora sesiones nuevas o modificadas; retorna True si hubo cambios"""
+        with self._lock:
+            revisions = self.db.get_session_revisions()
+            if not self._loaded:
+                changed = None  # Primera carga: todas las sesiones
+            else:
+                changed = [session for session, revision in revisions.items()
+                           if self._revisions.get(session) != revision]
+                if not changed:
+                    return False
+
+            rows = self.db.get_hf_quality_rows(changed)
+            for session in (changed or []):
+                if session in self._session_sums:
+                    self._sums -= self._session_sums.pop(session)
+                    self._counts -= self._session_counts.pop(session)
+
+            sessions, sums, counts = self._aggregate(rows)
+            for index, session in enumerate(sessions):
+                self._session_sums[session] = sums[index]
+                self._session_counts[session] = counts[index]
+            self._sums += sums.sum(axis=0)
+            self._counts += counts.sum(axis=0)
+
+            self._revisions = revisions
+            self._loaded = True
+            return True
+
+    def _totals(self, start_date=None, end_date=None):
+        """Suma y conteo del periodo; sin fechas se usan los totales acumulados"""
+        with self._lock:
+            if start_date is None and end_date is None:
+                return self._sums.copy(), self._counts.copy()
+            sums = np.zeros(self.shape)
+            counts = np.zeros(self.shape, dtype=np.int64)
+            for session, session_sums in self._session_sums.items():
+                if (start_date is None or session >= str(start_date)) and (end_date is None or session <= str(end_date)):
+                    sums += session_sums
+                    counts += self._session_counts[session]
+            return sums, counts
+
+    def matrix(self, start_date=None, end_date=None):
+        """Calidad promedio y reportes por banda × hora × zona (NaN donde no hay reportes)"""
+        sums, counts = self._totals(start_date, end_date)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            quality = sums / counts
+        return quality, counts
+
+    def to_frame(self, start_date=None, end_date=None):
+        """Matriz en formato largo: band, hour, zona, avg_quality, reports (solo celdas con reportes)"""
+        quality, counts = self.matrix(start_date, end_date)
+        band_index, hours, zona_index = np.nonzero(counts)
+        return pd.DataFrame({
+            'band': np.array(self.bands, dtype=object)[band_index],
+            'hour': hours,
+            'zona': np.array(self.zonas, dtype=object)[zona_index],
+            'avg_quality': np.round(quality[band_index, hours, zona_index], 2),
+            'reports': counts[band_index, hours, zona_index],
+        })
+
+    def band_heatmap(self, band, start_date=None, end_date=None):
+        """Calidad promedio zona × hora de una banda como DataFrame (zonas en filas, horas en columnas)"""
+        quality, _ = self.matrix(start_date, end_date)
+        return pd.DataFrame(quality[self.bands.index(band)].T, index=self.zonas, columns=range(HOURS))
+
+    def best_bands(self, start_date=None, end_date=None, min_reports=1):
+        """Mejor banda para cada zona y hora: mayor calidad promedio con al menos min_reports
+
+        Los empates se resuelven a favor de la banda con más reportes. Retorna un
+        DataFrame con zona, hour, band, avg_quality y reports.
+        """
+        quality, counts = self.matrix(start_date, end_date)
+        eligible = counts >= max(min_reports, 1)
+        candidate_quality = np.where(eligible, quality, -np.inf)
+        # Entre las bandas con la mejor calidad de la celda gana la de más reportes
+        tied = eligible & np.isclose(candidate_quality, candidate_quality.max(axis=0))
+        best = np.where(tied, counts, -1).argmax(axis=0)
+        hours, zona_index = np.nonzero(eligible.any(axis=0))
+        band_index = best[hours, zona_index]
+        return pd.DataFrame({
+            'zona': np.array(self.zonas, dtype=object)[zona_index],
+            'hour': hours,
+            'band': np.array(self.bands, dtype=object)[band_index],
+            'avg_quality': np.round(quality[band_index, hours, zona_index], 2),
+            'reports': counts[band_index, hours, zona_index],
+        }).sort_values(['zona', 'hour']).reset_index(drop=True)
+
+    @property
+    def active_bands(self):
+        """Bandas con al menos un reporte, en orden de frecuencia"""
+        with self._lock:
+            present = self._counts.sum(axis=(1, 2)) > 0
+        return [band for band, has_reports in zip(self.bands, present) if has_reports]
@@ -0,0 +1,114 @@
+from datetime import date, datetime, timedelta
+
+# Dimensiones que se pueden clasificar: dimensión -> título para mostrar
+RANKING_DIMENSIONS = {
+    'call_sign': 'Indicativo',
+    'zona': 'Zona',
+    'sistema': 'Sistema',
+    'region': 'Estado',
+}
+
+# Tipos de periodo disponibles: tipo -> título para mostrar
+PERIOD_KINDS = {
+    'session': 'Sesión',
+    'week': 'Semana',
+    'month': 'Mes',
+    'year': 'Año',
+    'custom': 'Rango personalizado',
+}
+
+
+def _as_date(value):
+    """Convierte texto 'YYYY-MM-DD' o datetime a date"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], '%Y-%m-%d').date()
+
+
+class RankingPeriod:
+    """Periodo de ranking expresado como rango cerrado de fechas de sesión
+
+    Se compila a comparaciones directas sobre session_date (texto ISO), que usan
+    el índice idx_reports_session_date en lugar de recorrer toda la tabla con
+    strftime().
+    """
+
+    def __init__(self, start_date=None, end_date=None, kind='custom', label=None):
+        self.start_date = _as_date(start_date) if start_date else None
+        self.end_date = _as_date(end_date) if end_date else None
+        if self.start_date and self.end_date and self.start_date > self.end_date:
+            raise ValueError("La fecha inicial del periodo es posterior a la final")
+        self.kind = kind
+        self.label = label or self._default_label()
+
+    @classmethod
+    def session(cls, day):
+        day = _as_date(day)
+        return cls(day, day, 'session', f"Sesión {day.strftime('%d/%m/%Y')}")
+
+    @classmethod
+    def week(cls, day):
+        """Semana de lunes a domingo que contiene la fecha"""
+        day = _as_date(day)
+        start = day - timedelta(days=day.weekday())
+        end = start + timedelta(days=6)
+        return cls(start, end, 'week', f"Semana del {start.strftime('%d/%m/%Y')} al {end.strftime('%d/%m/%Y')}")
+
+    @classmethod
+    def month(cls, day):
+        day = _as_date(day)
+        start = day.replace(day=1)
+        end = (start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        return cls(start, end, 'month', start.strftime('%m/%Y'))
+
+    @classmethod
+    def year(cls, day):
+        day = _as_date(day)
+        return cls(date(day.year, 1, 1), date(day.year, 12, 31), 'year', str(day.year))
+
+    @classmethod
+    def custom(cls, start_date, end_date):
+        return cls(start_date, end_date, 'custom')
+
+    @classmethod
+    def for_kind(cls, kind, day, end_date=None):
+        """Crea el periodo del tipo indicado (ver PERIOD_KINDS) que contiene la fecha"""
+        if kind == 'custom':
+            return cls.custom(day, end_date or day)
+        if kind not in PERIOD_KINDS:
+            raise ValueError(f"Tipo de periodo no válido: {kind}")
+        return getattr(cls, kind)(day)
+
+    def _default_label(self):
+        if self.start_date and self.end_date:
+            return f"{self.start_date.strftime('%d/%m/%Y')} - {self.end_date.strftime('%d/%m/%Y')}"
+        return "Todo el historial"
+
+    def conditions(self, column='session_date'):
+        """Compila el periodo a una lista de condiciones indexables sobre `column` y sus parámetros
+
+        column permite calificar la columna (p. ej. 'p.session_date') al
+        combinar las condiciones con otras en consultas con JOIN.
+        """
+        conditions = []
+        params = []
+        if self.start_date and self.start_date == self.end_date:
+            conditions.append(f"{column} = ?")
+            params.append(self.start_date.isoformat())
+        else:
+            if self.start_date:
+                conditions.append(f"{column} >= ?")
+                params.append(self.start_date.isoformat())
+            if self.end_date:
+                conditions.append(f"{column} <= ?")
+                params.append(self.end_date.isoformat())
+        return conditions, tuple(params)
+
+    def where_clause(self, column='session_date'):
+        """Compila el periodo a una cláusula WHERE indexable con parámetros"""
+        conditions, params = self.conditions(column)
+        if not conditions:
+            return "", ()
+        return " WHERE " + " AND ".join(conditions), params
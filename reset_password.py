@@ -5,13 +5,10 @@ Uso: python reset_password.py <username> <nueva_contraseña>
 """
 
 import sys
-import hashlib
 import sqlite3
 import os
 
-def hash_password(password):
-    """Genera hash SHA256 de la contraseña (mismo método que auth.py)"""
-    return hashlib.sha256(password.encode()).hexdigest()
+from passwords import hash_password
 
 def reset_user_password(username, new_password, db_path="fmre_reports.db"):
     """Resetea la contraseña de un usuario"""
@@ -32,7 +29,7 @@ def reset_user_password(username, new_password, db_path="fmre_reports.db"):
             conn.close()
             return False
         
-        # Generar nuevo hash
+        # Generar nuevo hash (bcrypt con sal, mismo método que auth.py)
         password_hash = hash_password(new_password)
         
         # Actualizar contraseña
@@ -89,6 +86,7 @@ def main():
         print("\nEjemplos:")
         print("  python reset_password.py admin admin123")
         print("  python reset_password.py --list")
+        print("\nAltas masivas, reseteo de varios usuarios y exportación: python admin_cli.py --help")
         return
     
     if sys.argv[1] == "--list":
@@ -0,0 +1,80 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# Reporte RST: legibilidad (1-5), intensidad (1-9) y tono opcional (1-9).
+# Acepta '59', '599', '5x9', '5/9', '5-9', '5 9' y sufijos como '59+20'.
+RST_PATTERN = r'^\s*([1-5])\s*[xX/\-]?\s*([1-9])(?:\s*[xX/\-]?\s*([1-9]))?\s*(?:\+.*)?$'
+_RST_REGEX = re.compile(RST_PATTERN)
+
+# Palabras usadas en lugar de RST y su calidad (1=mala, 2=regular, 3=buena)
+_WORD_QUALITY = [
+    (('buena', 'excelente', 'fuerte'), 3),
+    (('regular', 'media'), 2),
+]
+
+
+def parse_rst(signal_report):
+    """Obtiene (legibilidad, intensidad, tono) de un reporte; None en cada campo si no es RST"""
+    match = _RST_REGEX.match(signal_report or '')
+    if not match:
+        return None, None, None
+    readability, strength, tone = match.groups()
+    return int(readability), int(strength), int(tone) if tone else None
+
+
+def rst_quality(readability, strength):
+    """Calidad 1-3 a partir de RST: buena R4-5 S7-9, regular R3+ S4+, mala el resto"""
+    if readability >= 4 and strength >= 7:
+        return 3
+    if readability >= 3 and strength >= 4:
+        return 2
+    return 1
+
+
+def signal_quality(signal_report):
+    """Convierte el reporte de señal a calidad numérica (1=mala, 2=regular, 3=buena)
+
+    Si es RST se usan legibilidad e intensidad; si no, se buscan palabras clave.
+    """
+    readability, strength, _ = parse_rst(signal_report)
+    if readability is not None:
+        return rst_quality(readability, strength)
+    signal_lower = (signal_report or '').lower()
+    for words, quality in _WORD_QUALITY:
+        if any(word in signal_lower for word in words):
+            return quality
+    return 1
+
+
+def parse_rst_series(signal_reports):
+    """Versión vectorizada de parse_rst y signal_quality para una serie completa
+
+    Retorna un DataFrame con readability, strength, tone (Int64 con nulos) y
+    signal_quality, alineado con el índice de la serie.
+    """
+    signal_reports = pd.Series(signal_reports, dtype=object)
+    text = signal_reports.where(signal_reports.notna(), '').astype(str)
+    parts = text.str.extract(RST_PATTERN).apply(pd.to_numeric, errors='coerce')
+    parsed = pd.DataFrame({
+        'readability': parts[0].astype('Int64'),
+        'strength': parts[1].astype('Int64'),
+        'tone': parts[2].astype('Int64'),
+    }, index=signal_reports.index)
+
+    readability = parts[0].to_numpy()
+    strength = parts[1].to_numpy()
+    lower = text.str.lower()
+    word_quality = np.select(
+        [lower.str.contains('|'.join(words)).to_numpy() for words, _ in _WORD_QUALITY],
+        [quality for _, quality in _WORD_QUALITY],
+        default=1
+    )
+    rst_based = np.select(
+        [(readability >= 4) & (strength >= 7), (readability >= 3) & (strength >= 4)],
+        [3, 2],
+        default=1
+    )
+    parsed['signal_quality'] = np.where(np.isnan(readability), word_quality, rst_based)
+    return parsed
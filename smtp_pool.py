@@ -0,0 +1,254 @@
+import math
+import os
+import smtplib
+import ssl
+import threading
+import time
+from contextlib import contextmanager
+
+# Conexiones SMTP simultáneas por servidor y segundos de inactividad antes de descartarlas
+SMTP_MAX_CONNECTIONS = int(os.getenv('SMTP_MAX_CONNECTIONS', '2'))
+SMTP_IDLE_TIMEOUT = float(os.getenv('SMTP_IDLE_TIMEOUT', '60'))
+
+# Mensajes por segundo en todo el pool (0 = sin límite) y mensajes por conexión antes de reconectar
+SMTP_RATE_LIMIT = float(os.getenv('SMTP_RATE_LIMIT', '50'))
+SMTP_MESSAGES_PER_CONNECTION = int(os.getenv('SMTP_MESSAGES_PER_CONNECTION', '100'))
+
+# STARTTLS tras EHLO (desactivar solo para servidores locales de prueba)
+SMTP_STARTTLS = os.getenv('SMTP_STARTTLS', '1') != '0'
+
+# Errores que rechazan solo un mensaje; la sesión SMTP sigue siendo válida
+MESSAGE_REJECTED = (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError, smtplib.SMTPSenderRefused)
+
+
+class RateLimiter:
+    """Cubeta de fichas compartida entre hilos: a lo más `rate` envíos por segundo"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self._lock = threading.Lock()
+        self._next_slot = time.monotonic()
+
+    def wait(self):
+        if not self.rate:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + 1.0 / self.rate
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class _PooledConnection:
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.last_used = time.monotonic()
+        self.messages = 0
+
+
+class SMTPConnectionPool:
+    """Conexiones SMTP autenticadas reutilizables para un servidor
+
+    Cada conexión hace EHLO, STARTTLS y login una sola vez y se devuelve al pool
+    tras cada envío. Las conexiones inactivas más de idle_timeout segundos o
+    con max_messages envíos se cierran y se reemplazan; si el servidor cerró la
+    conexión, el envío se reintenta una vez con una conexión nueva.
+    """
+
+    def __init__(self, host, port, username, password, use_tls=SMTP_STARTTLS,
+                 max_connections=SMTP_MAX_CONNECTIONS, idle_timeout=SMTP_IDLE_TIMEOUT,
+                 rate_limit=SMTP_RATE_LIMIT, max_messages=SMTP_MESSAGES_PER_CONNECTION, timeout=30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.max_connections = max(1, max_connections)
+        self.idle_timeout = idle_timeout
+        self.max_messages = max_messages
+        self.timeout = timeout
+        self.rate_limiter = RateLimiter(rate_limit)
+        self.connects = 0
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_connections)
+
+    def _connect(self):
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            smtp.ehlo()
+            if self.use_tls:
+                smtp.starttls(context=ssl.create_default_context())
+                smtp.ehlo()
+            if self.username:
+                smtp.login(self.username, self.password)
+        except Exception:
+            self._close(smtp)
+            raise
+        with self._lock:
+            self.connects += 1
+        return _PooledConnection(smtp)
+
+    @staticmethod
+    def _close(smtp):
+        try:
+            smtp.quit()
+        except Exception:
+            try:
+                smtp.close()
+            except Exception:
+                pass
+
+    def _usable(self, connection):
+        return (time.monotonic() - connection.last_used < self.idle_timeout
+                and (not self.max_messages or connection.messages < self.max_messages))
+
+    @contextmanager
+    def connection(self):
+        """Presta una conexión autenticada (reutilizada si sigue vigente)"""
+        self._slots.acquire()
+        connection = None
+        stale = []
+        try:
+            with self._lock:
+                while self._idle and connection is None:
+                    candidate = self._idle.pop()
+                    if self._usable(candidate):
+                        connection = candidate
+                    else:
+                        stale.append(candidate)
+            # QUIT es una ida y vuelta por la red: fuera del candado
+            for candidate in stale:
+                self._close(candidate.smtp)
+            if connection is None:
+                connection = self._connect()
+            yield connection
+            connection.last_used = time.monotonic()
+            with self._lock:
+                self._idle.append(connection)
+        except Exception:
+            if connection is not None:
+                self._close(connection.smtp)
+            raise
+        finally:
+            self._slots.release()
+
+    def _send_on(self, connection, from_addr, to_addrs, message):
+        self.rate_limiter.wait()
+        connection.smtp.sendmail(from_addr, to_addrs, message)
+        connection.messages += 1
+
+    def send(self, from_addr, to_addrs, message):
+        """Envía un mensaje ya serializado; reconecta una vez si el servidor cerró la sesión"""
+        try:
+            with self.connection() as connection:
+                self._send_on(connection, from_addr, to_addrs, message)
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            with self.connection() as connection:
+                self._send_on(connection, from_addr, to_addrs, message)
+
+    def send_bulk(self, messages):
+        """Envía muchos mensajes (from_addr, to_addrs, message) repartidos en max_connections conexiones
+
+        Cada hilo mantiene su conexión durante todo el lote y la renueva cuando
+        alcanza max_messages o el servidor la cierra. Si tras reintentar sigue
+        sin haber conexión, el lote se detiene y los mensajes pendientes se
+        marcan fallidos sin intentar cada uno. Retorna una lista alineada con
+        los mensajes: None si se envió o el texto del error.
+        """
+        messages = list(messages)
+        results = [None] * len(messages)
+        next_index = [0]
+        aborted = []
+        index_lock = threading.Lock()
+
+        def take():
+            with index_lock:
+                if aborted:
+                    return None
+                index = next_index[0]
+                next_index[0] += 1
+            return index if index < len(messages) else None
+
+        def abort(error):
+            with index_lock:
+                if not aborted:
+                    aborted.append(error)
+
+        def worker():
+            index = take()
+            while index is not None:
+                try:
+                    with self.connection() as connection:
+                        while index is not None:
+                            from_addr, to_addrs, message = messages[index]
+                            try:
+                                self._send_on(connection, from_addr, to_addrs, message)
+                            except MESSAGE_REJECTED as e:
+                                # Rechazo de este mensaje; la sesión sigue siendo válida
+                                results[index] = str(e)
+                            index = take()
+                            if index is not None and not self._usable(connection):
+                                break
+                except Exception as e:
+                    # Error de conexión: se reintenta el mensaje actual una vez en otra conexión
+                    try:
+                        self.send(*messages[index])
+                    except MESSAGE_REJECTED as retry_error:
+                        results[index] = str(retry_error)
+                    except Exception as retry_error:
+                        # El servidor sigue inaccesible: no tiene caso esperar el timeout por cada mensaje
+                        results[index] = str(retry_error) or str(e)
+                        abort(results[index])
+                    index = take()
+
+        workers = [threading.Thread(target=worker, name='smtp-bulk', daemon=True)
+                   for _ in range(min(self.max_connections, len(messages)))]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        if aborted:
+            for index in range(next_index[0], len(messages)):
+                results[index] = f"No enviado: {aborted[0]}"
+        return results
+
+    def bulk_send_bound(self, count):
+        """Cota en segundos de lo que puede tardar send_bulk con `count` mensajes
+
+        Cada hilo envía su parte en serie; cada envío (y la conexión, con su
+        reintento) puede esperar hasta timeout segundos por operación.
+        """
+        per_connection = math.ceil(count / self.max_connections)
+        rate_seconds = count / self.rate_limiter.rate if self.rate_limiter.rate else 0
+        return 2 * self.timeout * (per_connection + 1) + rate_seconds
+
+    def close(self):
+        """Cierra las conexiones inactivas"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            self._close(connection.smtp)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_smtp_pool(host, port, username, password, use_tls=SMTP_STARTTLS):
+    """Pool del proceso para una configuración SMTP (compartido por todas las sesiones)"""
+    key = (host, int(port), username, password, use_tls)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = SMTPConnectionPool(host, int(port), username, password, use_tls)
+        return pool
+
+
+def discard_smtp_pool(host, port, username, password, use_tls=SMTP_STARTTLS):
+    """Cierra y olvida el pool de una configuración SMTP que ya no se usa"""
+    with _pools_lock:
+        pool = _pools.pop((host, int(port), username, password, use_tls), None)
+    if pool is not None:
+        pool.close()
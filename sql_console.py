@@ -0,0 +1,124 @@
+import os
+import re
+import sqlite3
+import time
+
+import pandas as pd
+
+# Tiempo máximo por consulta (segundos), filas máximas devueltas y tamaño de cada lectura
+SQL_CONSOLE_TIMEOUT = float(os.getenv('SQL_CONSOLE_TIMEOUT', '5'))
+SQL_CONSOLE_MAX_ROWS = int(os.getenv('SQL_CONSOLE_MAX_ROWS', '5000'))
+SQL_CONSOLE_FETCH_SIZE = 500
+
+# Instrucciones de la máquina virtual de SQLite entre revisiones del tiempo límite
+PROGRESS_INSTRUCTIONS = 10_000
+
+# PRAGMAs de solo consulta permitidos en la consola
+READ_ONLY_PRAGMAS = {
+    'table_info', 'table_xinfo', 'table_list', 'index_list', 'index_info', 'index_xinfo',
+    'foreign_key_list', 'collation_list', 'function_list', 'page_count', 'page_size',
+    'freelist_count', 'quick_check', 'integrity_check', 'user_version', 'schema_version',
+    'compile_options', 'database_list',
+}
+
+# Sentencias a las que no se antepone EXPLAIN QUERY PLAN
+NO_PLAN_STATEMENT = re.compile(r'\s*(EXPLAIN|PRAGMA)\b', re.IGNORECASE)
+
+
+class QueryTimeout(Exception):
+    """La consulta superó el tiempo límite de la consola y fue interrumpida"""
+
+
+class ReadOnlyConsole:
+    """Consola SQL de solo lectura para administradores
+
+    Cada consulta usa una conexión nueva abierta con mode=ro, así que no puede
+    escribir ni tomar bloqueos de escritura; ATTACH y los PRAGMAs que modifican
+    la conexión se rechazan con un autorizador. Un progress handler interrumpe
+    la consulta al pasar timeout segundos y el resultado se lee por bloques
+    hasta max_rows filas, sin materializar el resto.
+    """
+
+    def __init__(self, db_path, timeout=SQL_CONSOLE_TIMEOUT, max_rows=SQL_CONSOLE_MAX_ROWS):
+        self.db_path = db_path
+        self.timeout = timeout
+        self.max_rows = max_rows
+
+    @staticmethod
+    def _authorize(action, arg1, arg2, db_name, trigger):
+        if action in (sqlite3.SQLITE_ATTACH, sqlite3.SQLITE_DETACH):
+            return sqlite3.SQLITE_DENY
+        if action == sqlite3.SQLITE_PRAGMA and arg1.lower() not in READ_ONLY_PRAGMAS:
+            return sqlite3.SQLITE_DENY
+        return sqlite3.SQLITE_OK
+
+    def _connect(self, deadline):
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, timeout=self.timeout)
+        conn.execute("PRAGMA query_only = ON")
+        conn.set_authorizer(self._authorize)
+        conn.set_progress_handler(lambda: 1 if time.monotonic() > deadline else 0, PROGRESS_INSTRUCTIONS)
+        return conn
+
+    def run(self, sql, max_rows=None):
+        """Ejecuta una consulta; retorna dict con data, truncated, seconds y plan
+
+        data tiene a lo más max_rows filas; truncated indica que había más.
+        plan es None para EXPLAIN, PRAGMA o si no se pudo obtener.
+        Lanza QueryTimeout si se excede el tiempo límite.
+        """
+        max_rows = min(max_rows or self.max_rows, self.max_rows)
+        start = time.monotonic()
+        deadline = start + self.timeout
+        conn = self._connect(deadline)
+        try:
+            plan = None
+            # EXPLAIN y PRAGMA no tienen plan propio; un plan fallido no impide ejecutar la consulta
+            if not NO_PLAN_STATEMENT.match(sql):
+                try:
+                    plan = self._plan(conn, sql)
+                except sqlite3.Error:
+                    pass
+            cursor = conn.execute(sql)
+            columns = [column[0] for column in cursor.description or []]
+            rows = []
+            truncated = False
+            while columns:
+                batch = cursor.fetchmany(SQL_CONSOLE_FETCH_SIZE)
+                if not batch:
+                    break
+                rows.extend(batch)
+                if len(rows) > max_rows:
+                    truncated = True
+                    del rows[max_rows:]
+                    break
+            return {
+                'data': pd.DataFrame.from_records(rows, columns=columns),
+                'truncated': truncated,
+                'seconds': time.monotonic() - start,
+                'plan': plan,
+            }
+        except sqlite3.OperationalError as e:
+            if time.monotonic() > deadline and 'interrupt' in str(e):
+                raise QueryTimeout(f"La consulta superó el límite de {self.timeout:g} s y fue interrumpida") from e
+            raise
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _plan(conn, sql):
+        cursor = conn.execute(f"EXPLAIN QUERY PLAN {sql}")
+        depth = {0: -1}
+        lines = []
+        for node_id, parent, _, detail in cursor.fetchall():
+            depth[node_id] = depth.get(parent, -1) + 1
+            lines.append('   ' * depth[node_id] + ('└─ ' if depth[node_id] else '') + detail)
+        return '\n'.join(lines)
+
+    def explain(self, sql):
+        """Plan de ejecución (EXPLAIN QUERY PLAN) como árbol de texto, sin ejecutar la consulta"""
+        deadline = time.monotonic() + self.timeout
+        conn = self._connect(deadline)
+        try:
+            return self._plan(conn, sql)
+        finally:
+            conn.close()
@@ -0,0 +1,45 @@
+import socket
+
+import pytest
+
+from tests.smtp_standin import SMTPStandIn
+
+
+@pytest.fixture
+def smtp_standin():
+    """Servidor SMTP local sin retardos"""
+    with SMTPStandIn(handshake_delay=0, message_delay=0) as stand_in:
+        yield stand_in
+
+
+@pytest.fixture
+def unreachable_port():
+    """Puerto local en el que nadie escucha (la conexión se rechaza de inmediato)"""
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+@pytest.fixture
+def db(tmp_path):
+    """Base de datos vacía en un directorio temporal"""
+    from database import FMREDatabase
+
+    return FMREDatabase(str(tmp_path / 'sigq.db'))
+
+
+@pytest.fixture
+def email_service(smtp_standin, monkeypatch, db):
+    """EmailService que entrega al servidor local por un pool sin STARTTLS"""
+    import email_service as email_service_module
+    from smtp_pool import SMTPConnectionPool
+
+    pool = SMTPConnectionPool('127.0.0.1', smtp_standin.port, 'prueba', 'prueba',
+                              use_tls=False, rate_limit=0, timeout=5)
+    monkeypatch.setattr(email_service_module, 'get_smtp_pool', lambda *args, **kwargs: pool)
+    service = email_service_module.EmailService(db)
+    service.configure_smtp('127.0.0.1', smtp_standin.port, 'prueba', 'prueba', 'sigq@example.com')
+    yield service
+    pool.close()
@@ -0,0 +1,101 @@
+import socket
+import socketserver
+import threading
+import time
+
+
+class SMTPStandIn:
+    """Servidor SMTP local mínimo (sin TLS) para pruebas y benchmarks
+
+    handshake_delay simula el costo de STARTTLS y login en cada conexión nueva;
+    message_delay, el de aceptar cada mensaje. Registra las conexiones abiertas
+    y cada mensaje recibido (destinatarios y contenido); drop_sessions() corta
+    las sesiones abiertas como lo haría un servidor que cierra por inactividad.
+    """
+
+    def __init__(self, handshake_delay=0.15, message_delay=0.002):
+        stand_in = self
+        self.handshake_delay = handshake_delay
+        self.message_delay = message_delay
+        self.connections = 0
+        self.messages = []
+        self._sockets = set()
+        self._lock = threading.Lock()
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line):
+                self.wfile.write(line.encode() + b"\r\n")
+
+            def handle(self):
+                with stand_in._lock:
+                    stand_in.connections += 1
+                    stand_in._sockets.add(self.connection)
+                try:
+                    self.session()
+                except OSError:
+                    pass
+                finally:
+                    with stand_in._lock:
+                        stand_in._sockets.discard(self.connection)
+
+            def session(self):
+                recipients = []
+                self.reply("220 standin ESMTP")
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    command = line.decode(errors='replace').strip()
+                    verb = command.upper()
+                    if verb.startswith(("EHLO", "HELO")):
+                        self.wfile.write(b"250-standin\r\n250-AUTH PLAIN\r\n250 8BITMIME\r\n")
+                    elif verb.startswith("AUTH"):
+                        time.sleep(stand_in.handshake_delay)
+                        self.reply("235 OK")
+                    elif verb.startswith("MAIL"):
+                        recipients = []
+                        self.reply("250 OK")
+                    elif verb.startswith("RCPT"):
+                        recipients.append(command.split(':', 1)[1].strip().strip('<>'))
+                        self.reply("250 OK")
+                    elif verb.startswith("DATA"):
+                        self.reply("354 fin con .")
+                        body = []
+                        for data_line in iter(self.rfile.readline, b''):
+                            if data_line in (b".\r\n", b".\n"):
+                                break
+                            body.append(data_line)
+                        time.sleep(stand_in.message_delay)
+                        with stand_in._lock:
+                            stand_in.messages.append({'recipients': recipients, 'data': b"".join(body)})
+                        self.reply("250 OK")
+                    elif verb.startswith("QUIT"):
+                        self.reply("221 adios")
+                        return
+                    else:
+                        self.reply("250 OK")
+
+        class Server(socketserver.ThreadingTCPServer):
+            daemon_threads = True
+            allow_reuse_address = True
+
+        self.server = Server(('127.0.0.1', 0), Handler)
+        self.port = self.server.server_address[1]
+
+    def drop_sessions(self):
+        """Cierra del lado del servidor todas las sesiones abiertas"""
+        with self._lock:
+            sockets = list(self._sockets)
+        for sock in sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
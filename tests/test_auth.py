@@ -0,0 +1,58 @@
+import hashlib
+import time
+
+import pytest
+
+import passwords
+from auth import AuthManager
+
+PASSWORD = 'Clave-Segura1'
+
+
+@pytest.fixture
+def auth(db, monkeypatch):
+    # Costo mínimo de bcrypt para que las pruebas sean rápidas
+    monkeypatch.setattr(passwords, 'BCRYPT_ROUNDS', 4)
+    legacy_hash = hashlib.sha256(PASSWORD.encode()).hexdigest()
+    db.create_user('xe1abc', legacy_hash, 'Operador Prueba', None, 'operator')
+    return AuthManager(db)
+
+
+def wait_for_hash(db, username, predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        password_hash = db.get_password_hash(username)
+        if predicate(password_hash):
+            return password_hash
+        time.sleep(0.02)
+    return db.get_password_hash(username)
+
+
+def test_wrong_password_does_not_rehash(auth, db):
+    legacy_hash = db.get_password_hash('xe1abc')
+    assert auth.authenticate_user('xe1abc', 'otra-clave') is None
+    time.sleep(0.2)
+    assert db.get_password_hash('xe1abc') == legacy_hash
+
+
+def test_legacy_hash_becomes_bcrypt_after_login(auth, db):
+    user = auth.authenticate_user('xe1abc', PASSWORD)
+    assert user['username'] == 'xe1abc'
+
+    new_hash = wait_for_hash(db, 'xe1abc', lambda password_hash: not passwords.is_legacy_hash(password_hash))
+    assert new_hash.startswith('$2b$')
+    assert not passwords.needs_rehash(new_hash)
+
+    # La contraseña sigue funcionando con el hash nuevo y ya no se vuelve a rehacer
+    assert auth.authenticate_user('xe1abc', PASSWORD)['username'] == 'xe1abc'
+    assert auth.authenticate_user('xe1abc', 'otra-clave') is None
+    time.sleep(0.2)
+    assert db.get_password_hash('xe1abc') == new_hash
+
+
+def test_low_cost_hash_is_upgraded(auth, db, monkeypatch):
+    db.change_password('xe1abc', passwords.hash_password(PASSWORD, rounds=4))
+    monkeypatch.setattr(passwords, 'BCRYPT_ROUNDS', 5)
+    assert auth.authenticate_user('xe1abc', PASSWORD) is not None
+    new_hash = wait_for_hash(db, 'xe1abc', lambda password_hash: password_hash.startswith('$2b$05$'))
+    assert new_hash.startswith('$2b$05$')
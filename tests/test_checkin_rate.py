@@ -0,0 +1,36 @@
+import sqlite3
+
+
+def add_checkin(db, call_sign, timestamp, session_date='2026-09-21'):
+    db.add_report(call_sign, 'Operador', 'JALISCO', 'Guadalajara', '59', 'XE1', 'ASL', session_date=session_date)
+    conn = sqlite3.connect(db.db_path)
+    conn.execute("UPDATE reports SET timestamp = ? WHERE call_sign = ?", (timestamp, call_sign))
+    conn.commit()
+    conn.close()
+
+
+def test_checkin_rate_counts_from_first_checkin(db):
+    # Boletín nocturno: los minutos del día empiezan en 1200, el desfase en 0
+    add_checkin(db, 'XE1AAA', '2026-09-21 20:00:10')
+    add_checkin(db, 'XE1BBB', '2026-09-21 20:00:50')
+    add_checkin(db, 'XE1CCC', '2026-09-21 20:03:05')
+    rate = db.get_checkin_rate('2026-09-21')
+    assert rate['minute'].tolist() == [0, 1, 2, 3]
+    assert rate['clock'].tolist() == ['20:00', '20:01', '20:02', '20:03']
+    assert rate['checkins'].tolist() == [2, 0, 0, 1]
+    assert rate['cumulative'].tolist() == [2, 2, 2, 3]
+
+
+def test_checkin_rate_crosses_midnight(db):
+    add_checkin(db, 'XE1AAA', '2026-09-21 23:59:00')
+    add_checkin(db, 'XE1BBB', '2026-09-22 00:01:00')
+    rate = db.get_checkin_rate('2026-09-21')
+    assert rate['minute'].tolist() == [0, 1, 2]
+    assert rate['clock'].tolist() == ['23:59', '00:00', '00:01']
+
+
+def test_minute_of_day_column(db):
+    add_checkin(db, 'XE1AAA', '2026-09-21 20:07:00')
+    conn = sqlite3.connect(db.db_path)
+    assert conn.execute("SELECT minute_of_day FROM reports").fetchone() == (20 * 60 + 7,)
+    conn.close()
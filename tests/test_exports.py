@@ -0,0 +1,93 @@
+import gzip
+import io
+
+import pandas as pd
+import pytest
+
+from exports import FMREExporter, available_compressions
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def chunks():
+    for start in (0, 3):
+        yield pd.DataFrame({
+            'id': range(start + 1, start + 4),
+            'call_sign': [f'XE1A{index}' for index in range(start, start + 3)],
+            'operator_name': 'Operador',
+            'session_date': '2026-09-21',
+            'timestamp': '2026-09-21 20:05:00',
+        })
+    yield pd.DataFrame()
+
+
+def decompress(data, compression):
+    if compression == 'gzip':
+        return gzip.decompress(data)
+    if compression == 'zstd':
+        return zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data)).read()
+    return data
+
+
+@pytest.mark.parametrize('compression', [None] + available_compressions())
+def test_export_stream_writes_every_chunk_once(compression):
+    output, filename, total_rows = FMREExporter().export_stream(chunks(), 'csv', compression)
+    with output:
+        text = decompress(output.read(), compression).decode('utf-8')
+    assert total_rows == 6
+    assert filename.endswith('.csv' + {None: '', 'gzip': '.gz', 'zstd': '.zst'}[compression])
+    lines = text.strip().splitlines()
+    # Un solo encabezado y una línea por reporte
+    assert len(lines) == 7
+    assert sum('XE1A' in line for line in lines) == 6
+
+
+def test_export_stream_ndjson():
+    output, filename, total_rows = FMREExporter().export_stream(chunks(), 'ndjson')
+    with output:
+        lines = output.read().decode('utf-8').strip().splitlines()
+    assert filename.endswith('.ndjson')
+    assert total_rows == len(lines) == 6
+
+
+def bundle(db):
+    import zipfile
+    import json
+    from datetime import date
+
+    session_date = date(2026, 9, 21)
+    db.add_report('XE1ABC', 'Operador Prueba', 'Ciudad de México', 'CDMX', '59', 'XE1', 'ASL', session_date=session_date)
+    db.add_report('XE2DEF', 'Otro Operador', 'Monterrey', 'Nuevo León', '57', 'XE2', 'HF', session_date=session_date)
+    data, _ = FMREExporter().export_bundle(db.get_all_reports(session_date), db.get_statistics(session_date),
+                                           session_date=session_date)
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        manifest = json.loads(archive.read('manifest.json'))
+        pdf_name = next(name for name in archive.namelist() if name.endswith('.pdf'))
+        assert archive.read(pdf_name).startswith(b'%PDF')
+    return manifest
+
+
+def test_export_bundle_renders_pdf_in_spawned_process(db):
+    import exports
+
+    manifest = bundle(db)
+    assert manifest['pdf_generado_en'] == 'proceso'
+    assert manifest['total_reportes'] == 2
+    assert exports._get_pdf_process_pool()._mp_context.get_start_method() == 'spawn'
+
+
+def test_export_bundle_falls_back_to_thread(db, monkeypatch, caplog):
+    import exports
+
+    class BrokenPool:
+        def submit(self, *args):
+            raise exports.BrokenProcessPool("sin procesos")
+
+    monkeypatch.setattr(exports, '_get_pdf_process_pool', BrokenPool)
+    with caplog.at_level('WARNING', logger='exports'):
+        manifest = bundle(db)
+    assert manifest['pdf_generado_en'] == 'hilo'
+    assert any('generando en hilo' in record.getMessage() for record in caplog.records)
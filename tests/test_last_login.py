@@ -0,0 +1,40 @@
+import sqlite3
+import time
+
+import database
+
+# Conexión propia de la prueba, sin el fallo simulado
+_connect = sqlite3.connect
+
+
+def last_login(db, username):
+    conn = _connect(db.db_path)
+    row = conn.execute("SELECT last_login FROM users WHERE username = ?", (username,)).fetchone()
+    conn.close()
+    return row[0]
+
+
+def test_failed_flush_is_retried(db, monkeypatch, caplog):
+    monkeypatch.setattr(database, 'LAST_LOGIN_FLUSH_INTERVAL', 0.05)
+    db.create_user('xe1abc', 'x' * 60, 'Operador Prueba', None, 'operator')
+
+    failures = []
+
+    def failing_connect(*args, **kwargs):
+        if not failures:
+            failures.append(1)
+            raise sqlite3.OperationalError("unable to open database file")
+        return _connect(*args, **kwargs)
+
+    monkeypatch.setattr(database.sqlite3, 'connect', failing_connect)
+    db.update_last_login('xe1abc')
+    with caplog.at_level('WARNING', logger='database'):
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline and last_login(db, 'xe1abc') is None:
+            time.sleep(0.02)
+
+    # El primer intento falló y el temporizador se volvió a programar sin otro login
+    assert failures
+    assert last_login(db, 'xe1abc') is not None
+    assert not db._pending_logins
+    assert any('se reintentará' in record.getMessage() for record in caplog.records)
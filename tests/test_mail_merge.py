@@ -0,0 +1,85 @@
+import email
+
+import pytest
+
+from email_outbox import EmailOutboxWorker
+from mail_merge import MailTemplate, SessionSummaryMailer
+
+SESSIONS = ['2026-09-07', '2026-09-14', '2026-09-21']
+
+
+@pytest.fixture
+def mailer(db, email_service):
+    attendance = {
+        'XE1AAA': SESSIONS,
+        'XE1BBB': SESSIONS[1:],
+        'XE1CCC': SESSIONS[:1],
+        'XE1DDD': SESSIONS[2:],
+    }
+    for call_sign, sessions in attendance.items():
+        for session_date in sessions:
+            db.add_report(call_sign, 'Operador', 'JALISCO', 'Guadalajara', '59', 'XE1', 'ASL',
+                          session_date=session_date)
+    db.upsert_participant_contacts([
+        {'call_sign': 'XE1AAA', 'email': 'aaa@example.com', 'name': 'Ana <b>& Co'},
+        {'call_sign': 'XE1BBB', 'email': 'bbb@example.com'},
+        {'call_sign': 'XE1CCC', 'email': 'ccc@example.com'},
+        {'call_sign': 'XE1DDD', 'email': 'ddd@example.com', 'subscribed': False},
+    ])
+    outbox = EmailOutboxWorker(db, email_service)
+    return SessionSummaryMailer(db, email_service, outbox)
+
+
+def delivered(smtp_standin):
+    """Mensajes recibidos por destinatario: {email: (html, texto)}"""
+    result = {}
+    for received in smtp_standin.messages:
+        message = email.message_from_bytes(received['data'])
+        parts = {part.get_content_type(): part.get_payload(decode=True).decode('utf-8')
+                 for part in message.walk() if not part.is_multipart()}
+        result[received['recipients'][0]] = (parts['text/html'], parts['text/plain'])
+    return result
+
+
+def test_summaries_go_through_outbox_to_attendees_only(mailer, smtp_standin):
+    assert mailer.send(SESSIONS[-1]) == 2
+    assert mailer.outbox.deliver_once() == (2, 0)
+
+    messages = delivered(smtp_standin)
+    # XE1CCC no reportó en la sesión y XE1DDD no está suscrito
+    assert sorted(messages) == ['aaa@example.com', 'bbb@example.com']
+
+    html, text = messages['aaa@example.com']
+    assert 'Sesiones con reporte: 3 de 3 (100 %)' in text
+    assert 'Racha actual: 3 sesiones consecutivas' in text
+    assert 'Lugar: 1 de 4 participantes' in text
+    assert 'Ana &lt;b&gt;&amp; Co' in html
+    assert 'Ana <b>' not in html
+    assert 'Hola Ana <b>& Co (XE1AAA)' in text
+
+    _, text = messages['bbb@example.com']
+    assert 'Sesiones con reporte: 2 de 3 (67 %)' in text
+    assert 'Racha actual: 2 sesiones consecutivas' in text
+    assert 'Lugar: 2 de 4 participantes' in text
+    assert mailer.db.get_outbox_stats()['sent'] == 2
+
+
+def test_absent_participants_only_on_request(mailer):
+    messages = mailer.build_messages(SESSIONS[-1], attended_only=False)
+    assert sorted(message['to_email'] for message in messages) == \
+        ['aaa@example.com', 'bbb@example.com', 'ccc@example.com']
+    absent = next(message for message in messages if message['to_email'] == 'ccc@example.com')
+    assert 'Racha actual: 0 sesiones' in absent['body_text']
+
+
+def test_earlier_session_uses_its_own_attendance(mailer):
+    messages = mailer.build_messages(SESSIONS[0])
+    assert [message['to_email'] for message in messages] == ['aaa@example.com', 'ccc@example.com']
+    assert 'Sesiones con reporte: 1 de 1 (100 %)' in messages[0]['body_text']
+
+
+def test_template_escapes_only_when_requested():
+    values = {'name': '<i>x</i>'}
+    assert MailTemplate("Hola $name").render(values) == "Hola <i>x</i>"
+    assert MailTemplate("Hola ${name}!", escape=True).render(values) == "Hola &lt;i&gt;x&lt;/i&gt;!"
+    assert MailTemplate("$$ $name").fields == {'name'}
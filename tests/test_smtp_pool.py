@@ -0,0 +1,103 @@
+import time
+
+from smtp_pool import RateLimiter, SMTPConnectionPool
+
+FROM = 'sigq@example.com'
+
+
+def make_pool(port, **kwargs):
+    kwargs.setdefault('rate_limit', 0)
+    return SMTPConnectionPool('127.0.0.1', port, 'prueba', 'prueba', use_tls=False, timeout=5, **kwargs)
+
+
+def bulk(count):
+    return [(FROM, [f'operador{index}@example.com'], f'Subject: {index}\r\n\r\nmensaje {index}')
+            for index in range(count)]
+
+
+def test_send_reuses_one_connection(smtp_standin):
+    pool = make_pool(smtp_standin.port)
+    for from_addr, to_addrs, message in bulk(5):
+        pool.send(from_addr, to_addrs, message)
+    assert smtp_standin.connections == 1
+    assert len(smtp_standin.messages) == 5
+    pool.close()
+
+
+def test_send_bulk_opens_at_most_max_connections(smtp_standin):
+    pool = make_pool(smtp_standin.port, max_connections=2)
+    results = pool.send_bulk(bulk(40))
+    assert results == [None] * 40
+    assert 1 <= smtp_standin.connections <= 2
+    assert pool.connects == smtp_standin.connections
+    assert sorted(m['recipients'][0] for m in smtp_standin.messages) == \
+        sorted(f'operador{index}@example.com' for index in range(40))
+    pool.close()
+
+
+def test_send_bulk_recycles_after_max_messages(smtp_standin):
+    pool = make_pool(smtp_standin.port, max_connections=1, max_messages=5)
+    assert pool.send_bulk(bulk(20)) == [None] * 20
+    assert smtp_standin.connections == 4
+    pool.close()
+
+
+def test_idle_connection_is_replaced(smtp_standin):
+    pool = make_pool(smtp_standin.port, idle_timeout=0.05)
+    pool.send(*bulk(1)[0])
+    time.sleep(0.1)
+    pool.send(*bulk(1)[0])
+    assert smtp_standin.connections == 2
+    assert len(smtp_standin.messages) == 2
+    pool.close()
+
+
+def test_send_reconnects_once_after_server_drops_session(smtp_standin):
+    pool = make_pool(smtp_standin.port)
+    pool.send(*bulk(1)[0])
+    smtp_standin.drop_sessions()
+    time.sleep(0.05)
+    pool.send(*bulk(1)[0])
+    assert smtp_standin.connections == 2
+    assert len(smtp_standin.messages) == 2
+    pool.close()
+
+
+def test_send_bulk_recovers_after_server_drops_session(smtp_standin):
+    pool = make_pool(smtp_standin.port, max_connections=1)
+    pool.send(*bulk(1)[0])
+    smtp_standin.drop_sessions()
+    time.sleep(0.05)
+    assert pool.send_bulk(bulk(10)) == [None] * 10
+    assert len(smtp_standin.messages) == 11
+    pool.close()
+
+
+def test_send_bulk_stops_when_server_is_unreachable(unreachable_port):
+    pool = make_pool(unreachable_port, max_connections=2)
+    start = time.monotonic()
+    results = pool.send_bulk(bulk(50))
+    assert time.monotonic() - start < 5
+    assert all(error is not None for error in results)
+    assert sum(error.startswith("No enviado:") for error in results) >= 40
+    assert pool.connects == 0
+
+
+def test_rate_limiter_spaces_calls():
+    limiter = RateLimiter(20)
+    stamps = []
+    for _ in range(6):
+        limiter.wait()
+        stamps.append(time.monotonic())
+    # Cada llamada ocupa su propio intervalo de 1/20 s contado desde la primera
+    for index, stamp in enumerate(stamps):
+        assert stamp - stamps[0] >= index * 0.05 - 0.002
+
+
+def test_send_bulk_honours_rate_limit(smtp_standin):
+    pool = make_pool(smtp_standin.port, max_connections=2, rate_limit=20)
+    start = time.monotonic()
+    assert pool.send_bulk(bulk(6)) == [None] * 6
+    # 6 mensajes a 20/s: el último sale al menos 5 intervalos (0.25 s) después del primero
+    assert time.monotonic() - start >= 0.24
+    pool.close()
@@ -0,0 +1,47 @@
+import smtp_pool
+from email_outbox import EmailOutboxWorker
+from email_service import EmailService
+
+
+def test_saved_settings_are_shared_across_services(db):
+    EmailService(db).configure_smtp('smtp.example.com', 2525, 'sigq', 'secreto',
+                                    'sigq@example.com', 'SIGQ', updated_by='admin')
+
+    # Otro proceso (otra instancia sobre la misma base) arranca con la configuración guardada
+    other = EmailService(db)
+    assert other.is_configured()
+    assert (other.smtp_server, other.smtp_port, other.smtp_username) == ('smtp.example.com', 2525, 'sigq')
+    assert other.from_email == 'sigq@example.com'
+    assert other.updated_by == 'admin'
+
+
+def test_empty_password_keeps_the_saved_one(db):
+    service = EmailService(db)
+    service.configure_smtp('smtp.example.com', 587, 'sigq', 'secreto')
+    service.configure_smtp('smtp.example.com', 587, 'sigq', '', from_name='Otro nombre')
+    assert service.smtp_password == 'secreto'
+    assert db.get_smtp_settings()['password'] == 'secreto'
+    assert EmailService(db).from_name == 'Otro nombre'
+
+
+def test_reconfiguring_discards_the_previous_pool(db):
+    service = EmailService(db)
+    service.configure_smtp('smtp-a.example.com', 587, 'sigq', 'secreto')
+    old_pool = service._pool()
+    service.configure_smtp('smtp-b.example.com', 587, 'sigq', 'secreto')
+    assert old_pool not in smtp_pool._pools.values()
+    assert service._pool() is not old_pool
+    smtp_pool.discard_smtp_pool('smtp-b.example.com', 587, 'sigq', 'secreto')
+
+
+def test_outbox_picks_up_settings_saved_elsewhere(db, email_service, smtp_standin):
+    # El hilo de la bandeja de salida tiene su propia instancia, aún con la configuración anterior
+    worker_service = EmailService(db)
+    email_service.configure_smtp('127.0.0.1', smtp_standin.port, 'prueba', 'prueba', 'nuevo@example.com')
+    worker_service._pool = email_service._pool
+    worker = EmailOutboxWorker(db, worker_service)
+    worker.enqueue('xe1abc@example.com', 'Prueba', '<p>Hola</p>')
+
+    assert worker.deliver_once() == (1, 0)
+    assert worker_service.from_email == 'nuevo@example.com'
+    assert smtp_standin.messages[0]['recipients'] == ['xe1abc@example.com']